@@ -0,0 +1,104 @@
+"""Pre-aggregated dashboard statistics.
+
+Risk counts and per-feature histograms split by risk label, computed once
+per data version.  Histogram bin edges are fixed up front, so aggregates of
+newly added patients can simply be added to the existing counts.
+"""
+
+import numpy as np
+import pandas as pd
+
+from config import HIGH_RISK_LABEL, LOW_RISK_LABEL
+
+RISK_LABELS = [HIGH_RISK_LABEL, LOW_RISK_LABEL]
+
+# Fixed histogram edges spanning the valid range of each raw lab value.
+HISTOGRAM_EDGES = {
+    "age": np.linspace(0, 90, 19),
+    "bmi": np.linspace(10, 50, 17),
+    "cholesterol": np.linspace(100, 350, 11),
+    "blood_sugar": np.linspace(60, 300, 13),
+    "hemoglobin": np.linspace(5, 18, 14),
+    "glucose": np.linspace(70, 250, 10),
+    "tumor_size": np.linspace(0, 15, 16),
+    "tumor_grade": np.arange(0.5, 5.5),
+    "stage": np.arange(0.5, 5.5),
+    "lymph_nodes": np.arange(-0.5, 21.5, 2),
+}
+
+
+def _label_codes(df):
+    # Checked up front: pandas is deprecating silent NaN codes for values outside the categories.
+    if not df["risk_label"].isin(RISK_LABELS).all():
+        raise ValueError("risk_label contains values outside RISK_LABELS")
+    return pd.Categorical(df["risk_label"], categories=RISK_LABELS).codes.astype(np.int64)
+
+
+class RiskAggregates:
+    def __init__(self, version=None):
+        self.version = version
+        self.label_counts = np.zeros(len(RISK_LABELS), dtype=np.int64)
+        self.histograms = {
+            col: np.zeros((len(RISK_LABELS), len(edges) - 1), dtype=np.int64)
+            for col, edges in HISTOGRAM_EDGES.items()
+        }
+
+    @classmethod
+    def from_frame(cls, df, version=None):
+        return cls(version).update(df, version)
+
+    def update(self, df, version=None):
+        """Add the statistics of ``df`` (e.g. newly scored patients) in place."""
+        codes = _label_codes(df)
+        self.label_counts += np.bincount(codes, minlength=len(RISK_LABELS))
+        for col, edges in HISTOGRAM_EDGES.items():
+            if col not in df.columns:
+                continue
+            n_bins = len(edges) - 1
+            bins = np.clip(np.searchsorted(edges, df[col].to_numpy(), side="right") - 1, 0, n_bins - 1)
+            self.histograms[col] += np.bincount(
+                codes * n_bins + bins, minlength=len(RISK_LABELS) * n_bins
+            ).reshape(len(RISK_LABELS), n_bins)
+        if version is not None:
+            self.version = version
+        return self
+
+    @property
+    def total(self):
+        return int(self.label_counts.sum())
+
+    def count(self, label):
+        return int(self.label_counts[RISK_LABELS.index(label)])
+
+    def pct(self, label):
+        return self.count(label) / self.total * 100 if self.total else 0.0
+
+    def counts_frame(self):
+        """Risk levels present in the data, largest first (like ``value_counts``)."""
+        counts = pd.DataFrame({"Risk Level": RISK_LABELS, "Patient Count": self.label_counts})
+        counts = counts[counts["Patient Count"] > 0]
+        return counts.sort_values("Patient Count", ascending=False, kind="stable").reset_index(drop=True)
+
+    def risk_rate_frame(self, col):
+        """Patients and share of them at high risk in each histogram bin of ``col``."""
+        edges = HISTOGRAM_EDGES[col]
+        counts = self.histograms[col]
+        patients = counts.sum(axis=0)
+        high = counts[RISK_LABELS.index(HIGH_RISK_LABEL)]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            rate = np.where(patients > 0, high / patients, np.nan)
+        if np.all(edges % 1 == 0.5):
+            # Integer-valued columns (grade, stage, node counts): name the integers in each bin.
+            bins = [f"{lo + 0.5:g}" if hi - lo == 1 else f"{lo + 0.5:g}–{hi - 0.5:g}"
+                    for lo, hi in zip(edges[:-1], edges[1:])]
+        else:
+            bins = [f"{lo:g}–{hi:g}" for lo, hi in zip(edges[:-1], edges[1:])]
+        return pd.DataFrame({
+            "bin": bins,
+            "patients": patients, "high_risk": high, "risk_rate": rate,
+        })
+
+    def histogram_frame(self, col):
+        edges = HISTOGRAM_EDGES[col]
+        centers = (edges[:-1] + edges[1:]) / 2
+        return pd.DataFrame(self.histograms[col].T, index=centers, columns=RISK_LABELS)
@@ -1,11 +1,45 @@
+import time
+_imports_started = time.perf_counter()
+
 import streamlit as st
 import pandas as pd
-import joblib
-import json
+import numpy as np
 import os
-import plotly.graph_objects as go
 from datetime import datetime
-import time
+import html
+import io
+import json
+import math
+import subprocess
+import sys
+import threading
+from concurrent.futures.process import BrokenProcessPool
+from config import (
+    MODEL_PATH, FEATURE_PIPELINE_PATH, MODEL_MANIFEST_PATH, TRAIN_PATH, INFER_PATH,
+    PLAN_TXT_PATH, PLAN_STORE_PATH, PLAN_PAGE_SIZE, PATIENT_TABLE_PAGE_SIZES,
+    PREDICTION_CACHE_PATH, PREDICTION_CACHE_MAX_ENTRIES, STARTUP_BUDGET_SECONDS,
+    HIGH_RISK_LABEL, LOW_RISK_LABEL, RISK_COLORS, INFERENCE_ENGINE,
+    UPLOAD_SCORING_WORKERS, UPLOAD_CHUNK_ROWS, UPLOAD_POLL_SECONDS,
+    SHARED_ARTIFACTS, SHARED_ARTIFACTS_DIR, ADMIN_PANEL, METRICS_LOG_PATH, PATIENT_STORE_DIR,
+    EVALUATION_REPORT_PATH, DRIFT_REPORT_PATH, DRIVER_REPORT_PATH
+)
+from diet_matching import DietMatcher, NO_CONDITION, plan_basis
+from fast_inference import InferenceEngine
+from explanations import contributions, drivers_fingerprint, model_version, patient_explanation, risk_probability
+from evaluation import drift_fingerprint, evaluation_fingerprint, live_data_version, load_report
+from export import ChunkStream, iter_csv_chunks, cohort_zip_stream, patient_plan_pdf, pdf_worker_pool
+from prediction_cache import PredictionCache, artifact_fingerprint
+from scoring import load_model, load_feature_pipeline, load_feature_columns, risk_labels, score_frame
+from aggregates import RiskAggregates, RISK_LABELS, HISTOGRAM_EDGES
+from features import RAW_COLUMNS
+from patient_store import PatientStore, ScoredCohort, scoring_fingerprint
+from patient_table import read_patient_table, filter_mask, sort_positions, page_positions
+from plan_store import load_plan_store
+from scoring_jobs import ScoringQueue, FAILED
+from shared_artifacts import attach_shared_artifacts
+from timings import PhaseTimer, StageMetrics
+
+_imports_seconds = time.perf_counter() - _imports_started
 
 # ================= STREAMLIT CONFIG =================
 st.set_page_config(
@@ -166,95 +200,569 @@ st.markdown("""
         color: #4a90e2;
         font-weight: 600;
     }
+    .plan-details summary {
+        background: rgba(74, 144, 226, 0.08);
+        border-radius: 10px;
+        color: #4a90e2;
+        font-weight: 600;
+        padding: 10px 15px;
+        cursor: pointer;
+    }
     #MainMenu {visibility: hidden;}
     footer {visibility: hidden;}
     header {visibility: hidden;}
 </style>
 """, unsafe_allow_html=True)
 
-# ================= PATHS =================
-MODEL_PATH = "diet_app/best_model_LightGBM.pkl"
-TRAIN_PATH = "diet_app/train_data.csv"
-INFER_PATH = "diet_app/final_unique_range_valid_medical_data.csv"
-DIET_PATH = "diets/Actionable_Diet_Guidelines_from_TXT.json"
+# ================= OPTIMIZED DATA LOADING =================
+@st.cache_resource(show_spinner=False)
+def get_startup_timer():
+    return PhaseTimer(STARTUP_BUDGET_SECONDS)
+
+startup = get_startup_timer()
+startup.record("imports", _imports_seconds)
 
-TARGET_COLUMN = "binary_diet"
-LEAKAGE_COLUMNS = [
-    "blood_sugar", "cholesterol", "hemoglobin", "alkaline_phosphatase",
-    "cancer_severity_score", "diet_risk_score", "continuous_risk_score",
-    "liver_risk_score"
-]
+# Hot-path stage timings and cache hit counts, shared by all sessions.
+@st.cache_resource(show_spinner=False)
+def get_stage_metrics():
+    return StageMetrics(log_path=METRICS_LOG_PATH)
+
+metrics = get_stage_metrics()
 
-# ================= OPTIMIZED DATA LOADING =================
 @st.cache_resource(show_spinner=False)
 def load_model_and_data():
     try:
         with st.spinner("🚀 Loading AI models and patient data..."):
-            model = joblib.load(MODEL_PATH)
-            train_df = pd.read_csv(TRAIN_PATH)
-            X_train = train_df.drop(columns=LEAKAGE_COLUMNS + [TARGET_COLUMN], errors="ignore")
-            feature_columns = X_train.columns.tolist()
-            infer_df = pd.read_csv(INFER_PATH)
+            with startup.phase("feature pipeline"):
+                feature_pipeline = load_feature_pipeline(FEATURE_PIPELINE_PATH)
+            
+            if SHARED_ARTIFACTS:
+                # Patient table, features, plans and model are mapped from files shared by all replicas.
+                with startup.phase("shared artifacts"):
+                    shared = attach_shared_artifacts(SHARED_ARTIFACTS_DIR)
+                    diet_matcher = DietMatcher(shared.plan_store)
+                return feature_pipeline, shared.feature_columns, shared.raw_frame(), diet_matcher, shared, None
+            
+            with startup.phase("feature schema"):
+                feature_columns = load_feature_columns(MODEL_MANIFEST_PATH, TRAIN_PATH)
             
-            with open(DIET_PATH) as f:
-                diet_data = json.load(f)
+            with startup.phase("plan store"):
+                plan_store = load_plan_store(PLAN_TXT_PATH, PLAN_STORE_PATH)
+                diet_matcher = DietMatcher(plan_store)
             
-            if isinstance(diet_data, list):
-                if len(diet_data) >= 2:
-                    diet_data = {"high_risk": diet_data[0], "low_risk": diet_data[1]}
-                else:
-                    st.error("❌ Diet JSON list must have at least 2 items.")
-                    st.stop()
+            # Patients come already scored from the append-only store (see get_scored_cohort).
+            with startup.phase("patient store"):
+                patient_store = PatientStore(PATIENT_STORE_DIR)
             
-            return model, feature_columns, infer_df, diet_data
+            return feature_pipeline, feature_columns, None, diet_matcher, None, patient_store
     except Exception as e:
         st.error(f"❌ Error loading data: {str(e)}")
         st.stop()
 
 try:
-    model, FEATURE_COLUMNS, infer_df, diet_data = load_model_and_data()
+    feature_pipeline, FEATURE_COLUMNS, infer_df, diet_matcher, shared, patient_store = load_model_and_data()
 except Exception as e:
     st.error(f"❌ Failed to initialize application: {str(e)}")
     st.stop()
 
+@st.cache_resource(show_spinner=False)
+def load_prediction_cache():
+    with startup.phase("prediction cache"):
+        return PredictionCache(PREDICTION_CACHE_PATH, PREDICTION_CACHE_MAX_ENTRIES)
+
+# The model (and lightgbm) is only loaded once a row misses the prediction cache.
+@st.cache_resource(show_spinner=False)
+def get_model():
+    with startup.phase("model load"):
+        if shared is not None:
+            return InferenceEngine(None, "compiled", shared.forest)
+        return InferenceEngine(load_model(MODEL_PATH), INFERENCE_ENGINE)
+
+prediction_cache = load_prediction_cache()
+
 # ================= OPTIMIZED HELPER FUNCTIONS =================
-@st.cache_data(show_spinner=False)
 def prepare_features(df, feature_columns):
-    return df.reindex(columns=feature_columns, fill_value=0)
+    with metrics.stage("prepare_features", rows=len(df)):
+        return feature_pipeline.transform(df, feature_columns)
+
+def predict_classes(model, X):
+    with metrics.stage("model.predict", rows=len(X)):
+        return model.predict(X)
 
-@st.cache_data(show_spinner=False)
 def predict_risk(df):
-    X = prepare_features(df, FEATURE_COLUMNS)
-    preds = model.predict(X)
-    df_copy = df.copy()
-    df_copy["risk_label"] = ["HIGH DIET RISK" if p==1 else "LOW DIET RISK" for p in preds]
-    return df_copy
+    # Rows are looked up by content hash, so only new or edited patients reach the model.
+    fingerprint = artifact_fingerprint(MODEL_PATH, FEATURE_PIPELINE_PATH)
+    
+    def score_rows(rows):
+        if shared is not None and df is infer_df:
+            # Shared patient rows are already transformed in the mapped feature matrix.
+            return predict_classes(get_model(), shared.features[rows.index.to_numpy()])
+        return predict_classes(get_model(), prepare_features(rows, FEATURE_COLUMNS))
+    
+    with metrics.stage("risk scoring", rows=len(df)):
+        preds = prediction_cache.predict(df, fingerprint, score_rows)
+    metrics.set_cache_counts("predictions", prediction_cache.hits, prediction_cache.misses)
+    # join shares the lab columns with df (copy-on-write) instead of duplicating them.
+    scored = pd.DataFrame({"risk_label": risk_labels(preds)}, index=df.index)
+    return df.join(scored.join(diet_matcher.match(df, preds)))
+
+def score_new_patients(rows, engine=None):
+    # Store seeding, re-scores and uploads all go through the prediction cache.
+    with metrics.stage("risk scoring", rows=len(rows)):
+        scored = score_frame(engine or get_model(), rows, feature_pipeline, FEATURE_COLUMNS, diet_matcher,
+                             prediction_cache, artifact_fingerprint(MODEL_PATH, FEATURE_PIPELINE_PATH))
+    metrics.set_cache_counts("predictions", prediction_cache.hits, prediction_cache.misses)
+    return scored
+
+# Seeded from INFER_PATH on the very first start; afterwards patients are never re-scored
+# unless the model, feature pipeline or plans change.
+@st.cache_resource(show_spinner=False)
+def get_scored_cohort():
+    with startup.phase("patient store seed"):
+        fingerprint = scoring_fingerprint()
+        if not patient_store.seed(lambda: read_patient_table(INFER_PATH, columns=RAW_COLUMNS),
+                                  score_new_patients, fingerprint, source=os.path.basename(INFER_PATH)):
+            patient_store.rescore_stale(score_new_patients, fingerprint)
+        return ScoredCohort(patient_store)
 
 try:
-    df_with_risk = predict_risk(infer_df)
+    if shared is None:
+        cohort = get_scored_cohort()
+        # Each rerun reads only the segments appended since the last one.
+        started = time.perf_counter()
+        new_rows = cohort.sync()
+        if new_rows:
+            metrics.record("patient store sync", time.perf_counter() - started, rows=new_rows)
+        df_with_risk = cohort.frame
+        infer_df = df_with_risk[RAW_COLUMNS]
+    else:
+        with startup.phase("risk scoring"):
+            df_with_risk = predict_risk(infer_df)
 except Exception as e:
     st.error(f"❌ Error in risk prediction: {str(e)}")
     st.stop()
 
-# Calculate metrics once
-total_patients = len(df_with_risk)
-high_risk = sum(df_with_risk["risk_label"] == "HIGH DIET RISK")
-low_risk = sum(df_with_risk["risk_label"] == "LOW DIET RISK")
-high_risk_pct = (high_risk / total_patients * 100) if total_patients > 0 else 0
-low_risk_pct = 100 - high_risk_pct
+# Evaluation and drift statistics come from reports written by evaluation.py; a rerun only reads them.
+@st.cache_data(show_spinner=False, max_entries=4)
+def read_report(path, mtime_ns):
+    return load_report(path)
+
+def current_report(path, fingerprint):
+    """The saved report if it was computed for ``fingerprint``, else None."""
+    if not os.path.exists(path):
+        return None
+    report = read_report(path, os.stat(path).st_mtime_ns)
+    return report if report and report.get("fingerprint") == fingerprint else None
+
+# Missing or stale reports are recomputed in the background by one process per job script for the whole server.
+@st.cache_resource(show_spinner=False)
+def get_report_job(script):
+    return {"process": None, "lock": threading.Lock()}
+
+def refresh_reports(script, current):
+    """Start ``script`` unless its reports are ``current`` or a run of it is still going.
+
+    A run that crashed, or finished without producing current reports (its
+    inputs changed meanwhile), is started again; it skips any report that
+    is already current.
+    """
+    job = get_report_job(script)
+    with job["lock"]:
+        process = job["process"]
+        if process is not None and process.poll() is None:
+            return  # still running; if it was started for older inputs it is relaunched once it exits
+        if current:
+            return
+        args = [sys.executable, script, "--stale-only"]
+        if shared is not None:
+            args += ["--data", INFER_PATH]
+        job["process"] = subprocess.Popen(args, cwd=os.path.dirname(os.path.abspath(__file__)),
+                                          stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+live_version = live_data_version(INFER_PATH if shared is not None else None, PATIENT_STORE_DIR)
+evaluation_report = current_report(EVALUATION_REPORT_PATH, evaluation_fingerprint())
+drift = current_report(DRIFT_REPORT_PATH, drift_fingerprint(live_version))
+refresh_reports("evaluation.py", evaluation_report is not None and drift is not None)
+# Cohort feature contributions: explained segment by segment by explanations.py, summarised in a report.
+drivers_report = current_report(DRIVER_REPORT_PATH, drivers_fingerprint(live_version))
+refresh_reports("explanations.py", drivers_report is not None)
+accuracy_text = f"{evaluation_report['accuracy']:.1%}" if evaluation_report else "–"
+
+@st.cache_data(show_spinner=False)
+def plan_html(plan_id):
+    metrics.cache_miss("plan html")
+    parts = [
+        '<div class="diet-card">',
+        "<h3>🎯 Recommended Diet Plan</h3>",
+        f"<p><i>🩺 Rule based {html.escape(diet_matcher.template_conditions[plan_id])} plan</i></p>",
+    ]
+    for day, meals in diet_matcher.plan(plan_id).items():
+        parts.append(f"<h4>📅 {html.escape(day)}</h4>")
+        if isinstance(meals, dict):
+            parts.extend(f"<p><b>{html.escape(meal)}:</b> {html.escape(value)}</p>" for meal, value in meals.items())
+        elif isinstance(meals, list):
+            parts.extend(f"<p>• {html.escape(item)}</p>" for item in meals)
+        else:
+            parts.append(f"<p>{html.escape(str(meals))}</p>")
+        parts.append("<hr>")
+    parts.append("</div>")
+    return "".join(parts)
+
+def patient_card_html(patient_no, pred, plan_id, condition, open_plan=False):
+    risk_class = "risk-badge-high" if pred == "HIGH DIET RISK" else "risk-badge-low"
+    served = diet_matcher.template_conditions[int(plan_id)]
+    served_note = ""
+    if condition not in (served, NO_CONDITION):
+        served_note = f" · served the {html.escape(served)} plan"
+    return f"""
+    <div class="content-container">
+        <h3 style="color: #4a90e2;">👤 Patient {patient_no}</h3>
+        <span class="{risk_class}">{pred}</span>
+        <span style="margin-left: 10px; color: #666;">🩺 {html.escape(condition.title())}{served_note}</span>
+        <details class="plan-details"{" open" if open_plan else ""}>
+            <summary>📋 View Detailed Diet Plan for Patient {patient_no}</summary>
+            <p style="color: #666;"><i>{html.escape(plan_basis(condition))}</i></p>
+            {plan_html(int(plan_id))}
+        </details>
+    </div>
+    """
+
+def plan_export_frame(df):
+    return df.assign(patient_no=df.index + 1)
+
+def patient_pdf(patient_no):
+    row = df_with_risk.iloc[patient_no - 1]
+    with metrics.stage("pdf export", rows=1):
+        return patient_plan_pdf(patient_no, row["risk_label"], row[RAW_COLUMNS].to_dict(),
+                                diet_matcher.plan(row["plan_id"]), basis=plan_basis(row["condition"]))
+
+# One set of PDF worker processes for all sessions and clicks, started by the first cohort export.
+@st.cache_resource(show_spinner=False)
+def get_pdf_pool():
+    return pdf_worker_pool(diet_matcher.plans)
+
+def cohort_zip(df):
+    with metrics.stage("cohort pdf export", rows=len(df)):
+        try:
+            return cohort_zip_stream(plan_export_frame(df), diet_matcher.plans, RAW_COLUMNS, pool=get_pdf_pool())
+        except BrokenProcessPool:
+            # A worker died; the next export starts a fresh pool.
+            get_pdf_pool.clear()
+            raise
+
+def csv_download(df):
+    # Streamed in chunks; the stage is recorded once the last chunk has been produced.
+    return io.BufferedReader(ChunkStream(metrics.timed_chunks("csv export", iter_csv_chunks(df), rows=len(df))))
+
+# One queue for all sessions: uploads are scored in background threads, never in the script run.
+@st.cache_resource(show_spinner=False)
+def get_scoring_queue():
+    engine = get_model()
+    return ScoringQueue(lambda rows: score_new_patients(rows, engine), UPLOAD_SCORING_WORKERS, UPLOAD_CHUNK_ROWS)
+
+def render_upload_jobs(job_ids, polling):
+    jobs = get_scoring_queue().jobs(job_ids)
+    for job in jobs:
+        status = f"{job.rows_scored:,} rows scored"
+        if job.rows_rejected:
+            status += f", {job.rows_rejected:,} rejected (missing or non-numeric values)"
+        st.progress(job.progress, text=f"📄 {job.name} · {job.status} · {status}")
+        if job.status == FAILED:
+            st.error(f"❌ {job.name}: {job.error}")
+        results = job.results()
+        if results.empty:
+            continue
+        with st.expander(f"🔍 Results for {job.name}" + (" (partial)" if job.active else ""), expanded=job.active):
+            counts = results["risk_label"].value_counts()
+            st.markdown(" · ".join(f"**{label}:** {counts.get(label, 0):,}" for label in RISK_LABELS))
+            st.dataframe(results.head(1000), width="stretch", height=300)
+            st.download_button(
+                label="📥 Download scored rows (CSV)",
+                data=lambda df=results: csv_download(df),
+                file_name=f"scored_{os.path.splitext(job.name)[0]}.csv",
+                mime="text/csv",
+                key=f"upload_download_{job.id}"
+            )
+            if patient_store is not None and not job.active:
+                stored = st.session_state.setdefault("stored_jobs", {})
+                if job.id in stored:
+                    st.caption(f"✅ Added to the patient records as patients {stored[job.id]}")
+                elif st.button(f"➕ Add {len(results):,} patients to the patient records", key=f"store_{job.id}"):
+                    # Already scored by the queue: appended as a new segment without scoring again.
+                    segment = patient_store.append(results, scoring_fingerprint(), source=job.name)
+                    stored[job.id] = f"#{segment.index[0] + 1:,}–#{segment.index[-1] + 1:,}"
+                    st.rerun()
+    # Stop polling with a full rerun once every job has finished.
+    if polling and not any(job.active for job in jobs):
+        st.rerun()
+
+def slider_bounds(values):
+    # float32 columns: widen to 2 decimals so the bounds read cleanly and still include every row
+    return math.floor(float(values.min()) * 100) / 100, math.ceil(float(values.max()) * 100) / 100
+
+# Sort orders are computed once per data version and column; pages are cut from them on every rerun.
+@st.cache_resource(show_spinner=False, max_entries=16)
+def get_sort_order(version, column, descending, _values):
+    metrics.cache_miss("sort orders")
+    with metrics.stage("table sort", rows=len(_values)):
+        return sort_positions(_values, descending)
+
+def render_patient_table(df, key, mask=None):
+    """A server-side sorted and paged view of ``df`` (rows where ``mask``); the browser only gets one page."""
+    col1, col2, col3, col4, col5 = st.columns([2, 1, 1, 1, 1])
+    with col1:
+        sort_by = st.selectbox("↕️ Sort by", ["Patient #", *df.columns], key=f"{key}_sort",
+                               format_func=lambda col: col.replace("_", " ").title())
+    with col2:
+        descending = st.toggle("Descending", key=f"{key}_desc")
+    with col3:
+        page_size = st.selectbox("Rows per page", PATIENT_TABLE_PAGE_SIZES, key=f"{key}_size")
+    if sort_by == "Patient #":
+        order = np.arange(len(df))[::-1] if descending else np.arange(len(df))
+    else:
+        metrics.cache_request("sort orders")
+        order = get_sort_order(aggregates.version, sort_by, descending, df[sort_by])
+    n_selected = len(df) if mask is None else int(mask.sum())
+    pages = max(1, math.ceil(n_selected / page_size))
+    if st.session_state.get(f"{key}_page", 1) > pages:
+        st.session_state[f"{key}_page"] = pages  # the filter shrank the table
+    with col4:
+        page = st.number_input(f"Page (1–{pages:,})", min_value=1, max_value=pages, step=1, key=f"{key}_page")
+    with col5:
+        with st.popover("🧩 Columns", width="stretch"):
+            columns = [col for col in df.columns if st.checkbox(col.replace("_", " ").title(), value=True,
+                                                                  key=f"{key}_col_{col}")]
+    started = time.perf_counter()
+    positions, n_selected, pages = page_positions(order, mask, page, page_size)
+    page_df = df.iloc[positions][columns]
+    page_df.index = pd.Index(page_df.index + 1, name="Patient #")
+    metrics.record("table page", time.perf_counter() - started, rows=len(positions))
+    st.dataframe(page_df, width="stretch", height=min(400, 38 + 35 * max(len(page_df), 1)))
+    first = (page - 1) * page_size
+    st.caption(f"Patients {first + 1 if n_selected else 0:,}–{first + len(page_df):,} of {n_selected:,}"
+               + (f" (filtered from {len(df):,})" if n_selected < len(df) else ""))
+
+def jump_to_patient():
+    patient_no = st.session_state.get("plan_jump")
+    if patient_no:
+        st.session_state.plan_page = (int(patient_no) - 1) // PLAN_PAGE_SIZE + 1
+
+# Aggregates are computed once per data version and shared by every rerun and session.
+@st.cache_resource(show_spinner=False, max_entries=8)
+def get_aggregates(version, _df):
+    metrics.cache_miss("aggregates")
+    with metrics.stage("aggregates", rows=len(_df)):
+        return RiskAggregates.from_frame(_df, version)
+
+@st.cache_resource(show_spinner=False, max_entries=8)
+def build_risk_figures(version, _aggregates):
+    metrics.cache_miss("risk figures")
+    started = time.perf_counter()
+    import plotly.graph_objects as go  # only the Dashboard needs plotly
+    
+    risk_counts = _aggregates.counts_frame()
+    colors = [RISK_COLORS[label] for label in risk_counts["Risk Level"]]
+    
+    fig_pie = go.Figure(data=[go.Pie(
+        labels=risk_counts["Risk Level"],
+        values=risk_counts["Patient Count"],
+        marker=dict(
+            colors=colors,
+            line=dict(color='white', width=3)
+        ),
+        hole=0.5,
+        textinfo='label+percent+value',
+        textfont=dict(size=16, color='white'),
+        hovertemplate='<b>%{label}</b><br>Patients: %{value}<br>Percentage: %{percent}<extra></extra>'
+    )])
+    
+    fig_pie.update_layout(
+        title_text="<b>Risk Distribution Overview</b>",
+        title_x=0.5,
+        showlegend=True,
+        paper_bgcolor='rgba(255,255,255,0.95)',
+        plot_bgcolor='rgba(255,255,255,0.95)',
+        height=400
+    )
+    
+    fig_bar = go.Figure(data=[
+        go.Bar(
+            x=risk_counts["Risk Level"],
+            y=risk_counts["Patient Count"],
+            marker_color=colors,
+            marker_line_color='white',
+            marker_line_width=2,
+            marker_opacity=0.85,
+            text=risk_counts["Patient Count"],
+            textposition='outside',
+            textfont=dict(size=16, color='#333'),
+            hovertemplate='<b>%{x}</b><br>Patient Count: %{y}<extra></extra>'
+        )
+    ])
+    
+    fig_bar.update_layout(
+        title_text="<b>Patient Risk Comparison</b>",
+        title_x=0.5,
+        xaxis_title="Risk Level",
+        yaxis_title="Number of Patients",
+        paper_bgcolor='rgba(255,255,255,0.95)',
+        plot_bgcolor='rgba(255,255,255,0.95)',
+        height=400
+    )
+    metrics.record("chart building", time.perf_counter() - started)
+    return fig_pie, fig_bar
+
+@st.cache_resource(show_spinner=False, max_entries=16)
+def build_risk_rate_figure(version, feature, _aggregates):
+    metrics.cache_miss("risk rate figures")
+    started = time.perf_counter()
+    import plotly.graph_objects as go
+    
+    rates = _aggregates.risk_rate_frame(feature)
+    fig = go.Figure(data=[go.Bar(
+        x=rates["bin"], y=rates["risk_rate"], marker_color=RISK_COLORS[HIGH_RISK_LABEL], marker_opacity=0.85,
+        customdata=rates[["patients", "high_risk"]].to_numpy(),
+        hovertemplate="<b>%{x}</b><br>High risk: %{y:.1%}<br>%{customdata[1]:,} of %{customdata[0]:,} patients"
+                      "<extra></extra>"
+    )])
+    fig.update_layout(
+        title_text=f"<b>High Diet Risk Rate by {feature.replace('_', ' ').title()}</b>",
+        title_x=0.5,
+        xaxis_title=feature.replace("_", " ").title(),
+        yaxis_title="Share of patients at high risk",
+        yaxis_tickformat=".0%",
+        paper_bgcolor='rgba(255,255,255,0.95)',
+        plot_bgcolor='rgba(255,255,255,0.95)',
+        height=400
+    )
+    metrics.record("chart building", time.perf_counter() - started)
+    return fig
+
+@st.cache_resource(show_spinner=False, max_entries=32)
+def build_histogram_figure(version, feature, _aggregates):
+    metrics.cache_miss("histogram figures")
+    started = time.perf_counter()
+    import plotly.graph_objects as go
+    
+    hist = _aggregates.histogram_frame(feature)
+    fig = go.Figure(data=[
+        go.Bar(x=hist.index, y=hist[label], name=label, marker_color=RISK_COLORS[label], marker_opacity=0.85)
+        for label in RISK_LABELS
+    ])
+    fig.update_layout(
+        title_text=f"<b>{feature.replace('_', ' ').title()} Distribution by Risk Level</b>",
+        title_x=0.5,
+        barmode="stack",
+        xaxis_title=feature.replace("_", " ").title(),
+        yaxis_title="Number of Patients",
+        paper_bgcolor='rgba(255,255,255,0.95)',
+        plot_bgcolor='rgba(255,255,255,0.95)',
+        height=400
+    )
+    metrics.record("chart building", time.perf_counter() - started)
+    return fig
+
+@st.cache_resource(show_spinner=False, max_entries=4)
+def build_calibration_figure(version, _report):
+    metrics.cache_miss("calibration figures")
+    started = time.perf_counter()
+    import plotly.graph_objects as go
+    
+    bins = [b for b in _report["calibration"] if b["count"]]
+    fig = go.Figure(data=[
+        go.Scatter(x=[0, 1], y=[0, 1], mode="lines", name="Perfect calibration",
+                   line=dict(color="#adb5bd", dash="dash")),
+        go.Scatter(x=[b["mean_predicted"] for b in bins], y=[b["observed_rate"] for b in bins],
+                   mode="lines+markers", name="Model", marker=dict(size=9, color="#4a90e2"),
+                   customdata=[b["count"] for b in bins],
+                   hovertemplate="Predicted %{x:.2f}<br>Observed %{y:.2f}<br>%{customdata} patients<extra></extra>"),
+    ])
+    fig.update_layout(
+        title_text="<b>Calibration on Held-out Test Data</b>",
+        title_x=0.5,
+        xaxis_title="Mean predicted probability of high risk",
+        yaxis_title="Observed high-risk rate",
+        paper_bgcolor='rgba(255,255,255,0.95)',
+        plot_bgcolor='rgba(255,255,255,0.95)',
+        height=400
+    )
+    metrics.record("chart building", time.perf_counter() - started)
+    return fig
+
+def get_booster():
+    engine = get_model()
+    # The compiled forest of the shared artifacts has no booster to compute contributions with.
+    return engine.booster if engine.booster is not None else load_model(MODEL_PATH).booster_
+
+# Only the patient being looked at is explained in the app; the cohort summary comes from explanations.py.
+@st.cache_data(show_spinner=False, max_entries=256)
+def patient_contributions(version, patient_no):
+    metrics.cache_miss("patient contributions")
+    rows = df_with_risk.iloc[[patient_no - 1]]
+    with metrics.stage("contributions", rows=1):
+        if shared is not None:
+            X = shared.features[rows.index.to_numpy()]
+        else:
+            X = prepare_features(rows[RAW_COLUMNS], FEATURE_COLUMNS)
+        return contributions(get_booster(), X)[0]
+
+@st.cache_resource(show_spinner=False, max_entries=8)
+def build_driver_figure(version, _report):
+    metrics.cache_miss("driver figures")
+    started = time.perf_counter()
+    import plotly.graph_objects as go
+    
+    drivers = pd.DataFrame(_report["drivers"])
+    top = drivers.head(10).iloc[::-1]
+    fig = go.Figure(data=[go.Bar(
+        x=top["Mean |contribution|"], y=top["Feature"], orientation="h",
+        marker_color="#7b68ee", marker_opacity=0.85,
+        hovertemplate="<b>%{y}</b><br>Mean |contribution|: %{x:.3f}<extra></extra>"
+    )])
+    fig.update_layout(
+        title_text="<b>Top Risk Drivers (mean |SHAP| in log-odds)</b>",
+        title_x=0.5,
+        xaxis_title="Mean absolute contribution",
+        paper_bgcolor='rgba(255,255,255,0.95)',
+        plot_bgcolor='rgba(255,255,255,0.95)',
+        height=400
+    )
+    metrics.record("chart building", time.perf_counter() - started)
+    return fig, drivers
+
+if shared is None:
+    aggregates = cohort.aggregates  # updated in place from each synced delta
+else:
+    metrics.cache_request("aggregates")
+    aggregates = get_aggregates(prediction_cache.last_version, df_with_risk)
+total_patients = aggregates.total
+high_risk = aggregates.count(HIGH_RISK_LABEL)
+low_risk = aggregates.count(LOW_RISK_LABEL)
+high_risk_pct = aggregates.pct(HIGH_RISK_LABEL)
+low_risk_pct = aggregates.pct(LOW_RISK_LABEL)
 
 # ================= SIDEBAR NAVIGATION =================
 with st.sidebar:
     st.markdown("### 🏥 Navigation Menu")
     st.markdown("---")
-    page = st.radio("Select Page", ["🏠 Home", "📊 Dashboard"], label_visibility="collapsed")
+    page = st.radio("Select Page", ["🏠 Home", "📊 Dashboard", "📤 Upload & Score"], label_visibility="collapsed")
     
     st.markdown("---")
     st.markdown("### 📊 Quick Stats")
     st.metric("👥 Total Patients", f"{total_patients:,}")
-    st.metric("🎯 Model Accuracy", "98.5%")
+    st.metric("🎯 Model Accuracy", accuracy_text, help="On the held-out test_data.csv, from the offline evaluation report")
     st.markdown(f"**🔍 Features Analyzed:** {len(FEATURE_COLUMNS)}")
     st.markdown("**🤖 Model:** LightGBM")
+    
+    startup.log_once()
+    with st.expander("⏱️ Startup Report", expanded=startup.over_budget):
+        for row in startup.rows():
+            st.markdown(f"- {row['phase']}: **{row['ms']:,.0f} ms**")
+        budget_text = f"{startup.total_seconds:.2f}s of {STARTUP_BUDGET_SECONDS:.1f}s budget"
+        if startup.over_budget:
+            st.warning(f"⚠️ Cold start over budget: {budget_text}")
+        else:
+            st.caption(f"✅ Cold start {budget_text}")
 
 # ================= HOME PAGE =================
 if page == "🏠 Home":
@@ -269,12 +777,12 @@ if page == "🏠 Home":
     col1, col2, col3 = st.columns(3, gap="large")
     
     with col1:
-        st.markdown("""
+        st.markdown(f"""
         <div class="feature-card">
             <div style="font-size: 4em; margin-bottom: 20px;">🤖</div>
             <h3 style="color: #4a90e2; margin-bottom: 15px;">AI-Powered Analysis</h3>
             <p style="font-size: 16px; color: #666; line-height: 1.6;">
-                Advanced machine learning algorithms analyze medical data to predict diet risks with 98.5% accuracy
+                Advanced machine learning algorithms analyze medical data to predict diet risks with {accuracy_text} accuracy
             </p>
         </div>
         """, unsafe_allow_html=True)
@@ -332,11 +840,11 @@ if page == "🏠 Home":
         """, unsafe_allow_html=True)
     
     with col4:
-        st.markdown("""
+        st.markdown(f"""
         <div class="metric-card">
             <p>🎯 Accuracy</p>
-            <h3>98.5%</h3>
-            <p style="color: #51cf66; font-size: 0.85em; font-weight: 600;">High Performance</p>
+            <h3>{accuracy_text}</h3>
+            <p style="color: #51cf66; font-size: 0.85em; font-weight: 600;">On held-out test data</p>
         </div>
         """, unsafe_allow_html=True)
     
@@ -350,8 +858,10 @@ if page == "🏠 Home":
         with col2:
             show_all = st.checkbox("Show all data", value=False)
         
-        display_df = infer_df if show_all else infer_df.head(10)
-        st.dataframe(display_df, width="stretch", height=300)
+        if show_all:
+            render_patient_table(infer_df, key="home_table")
+        else:
+            st.dataframe(infer_df.head(10), width="stretch", height=300)
         st.markdown('</div>', unsafe_allow_html=True)
     
     st.markdown('<div class="section-header">🔍 Generate Personalized Diet Plans</div>', unsafe_allow_html=True)
@@ -359,47 +869,62 @@ if page == "🏠 Home":
     col1, col2 = st.columns([2, 1])
     with col1:
         if st.button("🚀 Generate Diet Plans for All Patients"):
-            with st.spinner("🧠 AI is analyzing patient data and generating personalized diet plans..."):
-                progress_bar = st.progress(0)
-                progress_text = st.empty()
-                
-                for i, pred in enumerate(df_with_risk["risk_label"]):
-                    progress_bar.progress((i + 1) / len(df_with_risk))
-                    progress_text.text(f"Processing Patient {i+1}/{len(df_with_risk)}")
-                    
-                    diet_key = "high_risk" if pred == "HIGH DIET RISK" else "low_risk"
-                    diet_plan = diet_data[diet_key]
-                    
-                    risk_class = "risk-badge-high" if pred == "HIGH DIET RISK" else "risk-badge-low"
-                    
-                    st.markdown(f"""
-                    <div class="content-container">
-                        <h3 style="color: #4a90e2;">👤 Patient {i+1}</h3>
-                        <span class="{risk_class}">{pred}</span>
-                    </div>
-                    """, unsafe_allow_html=True)
-                    
-                    with st.expander(f"📋 View Detailed Diet Plan for Patient {i+1}", expanded=False):
-                        st.markdown('<div class="diet-card">', unsafe_allow_html=True)
-                        st.markdown(f"### 🎯 Recommended Diet Plan - {pred}")
-                        
-                        for day, meals in diet_plan.items():
-                            st.markdown(f"#### 📅 {day}")
-                            if isinstance(meals, dict):
-                                for meal, value in meals.items():
-                                    st.markdown(f"**{meal}:** {value}")
-                            elif isinstance(meals, list):
-                                for item in meals:
-                                    st.markdown(f"• {item}")
-                            else:
-                                st.markdown(f"{meals}")
-                            st.markdown("---")
-                        st.markdown('</div>', unsafe_allow_html=True)
-                
-                progress_text.text("✅ All diet plans generated successfully!")
-                time.sleep(1)
-                progress_text.empty()
-                progress_bar.empty()
+            st.session_state.show_plans = True
+        
+        if st.session_state.get("show_plans"):
+            total_pages = max(1, math.ceil(total_patients / PLAN_PAGE_SIZE))
+            
+            nav1, nav2 = st.columns(2)
+            with nav1:
+                st.number_input(
+                    "🔎 Jump to patient #", min_value=1, max_value=max(1, total_patients),
+                    value=None, step=1, key="plan_jump", on_change=jump_to_patient
+                )
+            with nav2:
+                page_no = st.number_input(
+                    f"📄 Page (1–{total_pages:,})", min_value=1, max_value=total_pages,
+                    step=1, key="plan_page"
+                )
+            
+            start = (page_no - 1) * PLAN_PAGE_SIZE
+            page_df = df_with_risk.iloc[start:start + PLAN_PAGE_SIZE]
+            focus = st.session_state.get("plan_jump")
+            with metrics.stage("plan rendering", rows=len(page_df)):
+                cards = [
+                    patient_card_html(i, pred, plan_id, condition, open_plan=(i == focus))
+                    for i, (pred, plan_id, condition) in enumerate(
+                        zip(page_df["risk_label"], page_df["plan_id"], page_df["condition"]), start + 1
+                    )
+                ]
+            metrics.cache_request("plan html", len(cards))
+            st.caption(f"Showing patients {start + 1:,}–{start + len(cards):,} of {total_patients:,}")
+            st.markdown("".join(cards), unsafe_allow_html=True)
+            
+            pdf_col1, pdf_col2 = st.columns([2, 1])
+            with pdf_col1:
+                pdf_patient = st.selectbox(
+                    "📄 Printable plan for patient #", range(start + 1, start + len(cards) + 1),
+                    index=(focus - start - 1) if focus and start < focus <= start + len(cards) else 0
+                )
+            with pdf_col2:
+                st.download_button(
+                    label="📥 Download PDF",
+                    data=lambda patient_no=pdf_patient: patient_pdf(patient_no),
+                    file_name=f"diet_plan_patient_{pdf_patient}.pdf",
+                    mime="application/pdf",
+                    width="stretch"
+                )
+            
+            # Only the selected patient's explanation is rendered.
+            if st.toggle(f"🧠 Why is patient {pdf_patient} at this risk level?", key="explain_patient"):
+                metrics.cache_request("patient contributions")
+                with st.spinner("🧠 Computing feature contributions..."):
+                    contrib = patient_contributions(f"{model_version()}:{aggregates.version}", pdf_patient)
+                row = df_with_risk.iloc[pdf_patient - 1]
+                st.markdown(f"**{row['risk_label']}** · predicted probability of high diet risk: "
+                            f"**{risk_probability(contrib):.1%}**")
+                st.dataframe(patient_explanation(contrib, FEATURE_COLUMNS, row), width="stretch", hide_index=True)
+                st.caption("Contributions are SHAP values in log-odds; positive values push toward high diet risk.")
     
     with col2:
         st.markdown("""
@@ -451,113 +976,205 @@ elif page == "📊 Dashboard":
         """, unsafe_allow_html=True)
     
     with col4:
-        st.markdown("""
+        scoring_rate = metrics.last_rate("risk scoring")
+        if scoring_rate is None and patient_store is not None:
+            scoring_rate = patient_store.scoring_rate()  # nothing scored since start: the store's last run
+        st.markdown(f"""
         <div class="metric-card">
             <p>⚡ Processing Speed</p>
-            <h3>< 1s</h3>
-            <p style="color: #999; font-size: 0.85em;">Per patient</p>
+            <h3>{f"{scoring_rate:,.0f}" if scoring_rate else "–"}</h3>
+            <p style="color: #999; font-size: 0.85em;">Patients scored per second</p>
         </div>
         """, unsafe_allow_html=True)
     
     st.markdown('<div class="section-header">📈 Advanced Risk Analytics & Visualizations</div>', unsafe_allow_html=True)
     
     col1, col2 = st.columns(2, gap="large")
+    metrics.cache_request("risk figures")
+    fig_pie, fig_bar = build_risk_figures(aggregates.version, aggregates)
     
     with col1:
-        risk_counts = df_with_risk["risk_label"].value_counts().reset_index()
-        risk_counts.columns = ["Risk Level", "Patient Count"]
-        
-        fig_pie = go.Figure(data=[go.Pie(
-            labels=risk_counts["Risk Level"],
-            values=risk_counts["Patient Count"],
-            marker=dict(
-                colors=['#ff6b6b', '#51cf66'],
-                line=dict(color='white', width=3)
-            ),
-            hole=0.5,
-            textinfo='label+percent+value',
-            textfont=dict(size=16, color='white'),
-            hovertemplate='<b>%{label}</b><br>Patients: %{value}<br>Percentage: %{percent}<extra></extra>'
-        )])
-        
-        fig_pie.update_layout(
-            title_text="<b>Risk Distribution Overview</b>",
-            title_x=0.5,
-            showlegend=True,
-            paper_bgcolor='rgba(255,255,255,0.95)',
-            plot_bgcolor='rgba(255,255,255,0.95)',
-            height=400
-        )
-        
         st.plotly_chart(fig_pie, width="stretch")
     
     with col2:
-        fig_bar = go.Figure(data=[
-            go.Bar(
-                x=risk_counts["Risk Level"],
-                y=risk_counts["Patient Count"],
-                marker_color=['#ff6b6b', '#51cf66'],
-                marker_line_color='white',
-                marker_line_width=2,
-                marker_opacity=0.85,
-                text=risk_counts["Patient Count"],
-                textposition='outside',
-                textfont=dict(size=16, color='#333'),
-                hovertemplate='<b>%{x}</b><br>Patient Count: %{y}<extra></extra>'
-            )
-        ])
-        
-        fig_bar.update_layout(
-            title_text="<b>Patient Risk Comparison</b>",
-            title_x=0.5,
-            xaxis_title="Risk Level",
-            yaxis_title="Number of Patients",
-            paper_bgcolor='rgba(255,255,255,0.95)',
-            plot_bgcolor='rgba(255,255,255,0.95)',
-            height=400
-        )
-        
         st.plotly_chart(fig_bar, width="stretch")
     
+    feature = st.selectbox(
+        "📊 Feature distribution by risk level:", list(HISTOGRAM_EDGES),
+        format_func=lambda col: col.replace("_", " ").title()
+    )
+    metrics.cache_request("histogram figures")
+    st.plotly_chart(build_histogram_figure(aggregates.version, feature, aggregates), width="stretch")
+    
+    # Binned from the aggregates, so the charts carry one point per bin however many patients there are.
+    rate_tabs = st.tabs(["🎂 Risk rate by age", "⚖️ Risk rate by BMI", "🎗️ Risk rate by stage"])
+    for tab, rate_feature in zip(rate_tabs, ["age", "bmi", "stage"]):
+        with tab:
+            metrics.cache_request("risk rate figures")
+            st.plotly_chart(build_risk_rate_figure(aggregates.version, rate_feature, aggregates), width="stretch")
+    
+    st.markdown('<div class="section-header">🧠 What Drives Patient Risk</div>', unsafe_allow_html=True)
+    
+    if drivers_report is None:
+        st.info("⏳ Feature contributions for the current patients are being computed in the background "
+                "(explanations.py).")
+    else:
+        metrics.cache_request("driver figures")
+        fig_drivers, drivers = build_driver_figure(drivers_report["fingerprint"], drivers_report)
+        col1, col2 = st.columns([3, 2], gap="large")
+        with col1:
+            st.plotly_chart(fig_drivers, width="stretch")
+        with col2:
+            st.dataframe(drivers.round(3), width="stretch", hide_index=True, height=400)
+        st.caption(f"{drivers_report['rows']:,} patients explained · computed {drivers_report['created_at']}")
+    
+    st.markdown('<div class="section-header">🧪 Model Evaluation & Data Drift</div>', unsafe_allow_html=True)
+    
+    if evaluation_report is None:
+        st.info("⏳ The evaluation report for this model is being computed in the background (evaluation.py).")
+    else:
+        col1, col2, col3, col4 = st.columns(4)
+        col1.metric("🎯 Accuracy", f"{evaluation_report['accuracy']:.1%}")
+        col2.metric("📈 ROC AUC", f"{evaluation_report['auc']:.3f}")
+        col3.metric("🎚️ Brier Score", f"{evaluation_report['brier']:.3f}")
+        col4.metric("🔁 Recall (high risk)", f"{evaluation_report['recall']:.1%}")
+        col1, col2 = st.columns([3, 2], gap="large")
+        with col1:
+            metrics.cache_request("calibration figures")
+            st.plotly_chart(build_calibration_figure(evaluation_report["fingerprint"], evaluation_report),
+                            width="stretch")
+        with col2:
+            (tn, fp), (fn, tp) = evaluation_report["confusion_matrix"]["rows_actual_columns_predicted"]
+            st.markdown("**Confusion matrix** (rows: actual, columns: predicted)")
+            st.dataframe(pd.DataFrame([[tn, fp], [fn, tp]], index=["Actual low", "Actual high"],
+                                      columns=["Predicted low", "Predicted high"]), width="stretch")
+            st.caption(f"{evaluation_report['rows']:,} held-out test patients · "
+                       f"evaluated {evaluation_report['created_at']}")
+    
+    if drift is None:
+        st.info("⏳ The drift report for the current patients is being computed in the background (evaluation.py).")
+    else:
+        drifted = [f for f in drift["features"] if f["status"] != "stable"]
+        st.markdown(f"**Input drift against the training data:** {len(drifted)} of {len(drift['features'])} "
+                    f"model features drifted (PSI ≥ 0.1) over {drift['rows']:,} patients")
+        st.dataframe(
+            pd.DataFrame(drift["features"]).rename(columns={
+                "feature": "Feature", "psi": "PSI", "ks": "KS statistic", "reference_mean": "Training mean",
+                "live_mean": "Current mean", "status": "Status"
+            }).round(4),
+            width="stretch", hide_index=True, height=250
+        )
+    
     st.markdown('<div class="section-header">📋 Detailed Patient Risk Analysis</div>', unsafe_allow_html=True)
     
     with st.container():
         st.markdown('<div class="content-container">', unsafe_allow_html=True)
         
-        col1, col2 = st.columns(2)
+        col1, col2, col3, col4 = st.columns(4)
         with col1:
+            risk_options = aggregates.counts_frame()["Risk Level"].tolist()
             risk_filter = st.multiselect(
                 "🔍 Filter by Risk Level:",
-                options=df_with_risk["risk_label"].unique(),
-                default=df_with_risk["risk_label"].unique()
+                options=risk_options,
+                default=risk_options
             )
+        with col2:
+            condition_options = df_with_risk["condition"].cat.categories.tolist()
+            condition_filter = st.multiselect(
+                "🩺 Filter by Condition:",
+                options=condition_options,
+                default=condition_options,
+                format_func=str.title
+            )
+        with col3:
+            age_min, age_max = slider_bounds(df_with_risk["age"])
+            age_range = st.slider("🎂 Age range:", age_min, age_max, (age_min, age_max))
+        with col4:
+            bmi_min, bmi_max = slider_bounds(df_with_risk["bmi"])
+            bmi_range = st.slider("⚖️ BMI range:", bmi_min, bmi_max, (bmi_min, bmi_max))
         
-        filtered_df = df_with_risk[df_with_risk["risk_label"].isin(risk_filter)]
-        
-        st.dataframe(filtered_df, width="stretch", height=400)
+        mask = filter_mask(df_with_risk, risk_filter, age_range, bmi_range, condition_filter)
+        n_filtered = int(mask.sum())
+        render_patient_table(df_with_risk, key="risk_table", mask=mask)
         
+        # Export payloads are only built when a download button is clicked.
         col1, col2, col3 = st.columns([1, 1, 1])
-        with col2:
-            csv = filtered_df.to_csv(index=False)
+        with col1:
             st.download_button(
                 label="📥 Download Patient Data (CSV)",
-                data=csv,
+                data=lambda mask=mask: csv_download(df_with_risk[mask]),
                 file_name=f"patient_risk_data_{datetime.now().strftime('%Y%m%d')}.csv",
                 mime="text/csv",
                 width="stretch"
             )
+        with col2:
+            st.download_button(
+                label=f"📦 Download {n_filtered:,} PDF Plans (ZIP)",
+                data=lambda mask=mask: cohort_zip(df_with_risk[mask]),
+                file_name=f"diet_plans_{datetime.now().strftime('%Y%m%d')}.zip",
+                mime="application/zip",
+                width="stretch",
+                disabled=not n_filtered
+            )
         
         st.markdown('</div>', unsafe_allow_html=True)
 
+elif page == "📤 Upload & Score":
+    st.markdown("""
+    <div class="main-header">
+        <h1 style="font-size: 3em; margin-bottom: 0;">📤 Upload & Score</h1>
+        <h3 style="font-size: 1.5em; margin: 10px 0;">Risk Assessment and Diet Plans for New Lab Reports</h3>
+    </div>
+    """, unsafe_allow_html=True)
+    
+    with st.container():
+        st.markdown('<div class="content-container">', unsafe_allow_html=True)
+        uploads = st.file_uploader(
+            f"Lab report CSVs with the columns: {', '.join(RAW_COLUMNS)}",
+            type="csv", accept_multiple_files=True
+        )
+        if st.button("🚀 Score Uploaded Files", disabled=not uploads):
+            queue = get_scoring_queue()
+            new_ids = [queue.submit(upload.name, upload.getvalue()) for upload in uploads]
+            st.session_state.upload_jobs = new_ids + st.session_state.get("upload_jobs", [])
+        
+        job_ids = st.session_state.get("upload_jobs", [])
+        if job_ids:
+            polling = any(job.active for job in get_scoring_queue().jobs(job_ids))
+            # Only this fragment reruns while jobs are in progress.
+            st.fragment(run_every=UPLOAD_POLL_SECONDS if polling else None)(render_upload_jobs)(job_ids, polling)
+        else:
+            st.caption("Uploaded files are validated and scored in the background; results appear as chunks finish.")
+        st.markdown('</div>', unsafe_allow_html=True)
+
+# ================= PERFORMANCE PANEL =================
+if ADMIN_PANEL or st.query_params.get("admin") == "1":
+    with st.expander("🛠️ Performance Panel", expanded=True):
+        snapshot = metrics.snapshot()
+        st.caption(f"Process RSS {snapshot['rss_mb']:,.0f} MB · stage timings cover all sessions of this server process")
+        st.markdown("**Pipeline stages** (latency over the last runs, rows/sec across them)")
+        st.dataframe(pd.DataFrame(snapshot["stages"]), width="stretch", hide_index=True)
+        st.markdown("**Caches**")
+        st.dataframe(pd.DataFrame(snapshot["caches"]), width="stretch", hide_index=True)
+        st.markdown("**Cold start** (model load, patient table parse, …)")
+        st.dataframe(pd.DataFrame(startup.rows()), width="stretch", hide_index=True)
+        snapshot["startup"] = startup.rows()
+        st.download_button(
+            label="📥 Download metrics (JSON)",
+            data=json.dumps(snapshot, indent=2),
+            file_name=f"diet_planner_metrics_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json",
+            mime="application/json"
+        )
+
 st.markdown("---")
-st.markdown("""
+st.markdown(f"""
 <div style="text-align: center; padding: 30px; background: rgba(255, 255, 255, 0.9); border-radius: 15px; margin-top: 30px;">
     <h3 style="color: #4a90e2; margin-bottom: 15px;">🏥 AI Diet Planner</h3>
     <p style="color: #666; font-size: 16px; margin-bottom: 10px;">
         © 2025 AI Diet Planner | Powered by Machine Learning | Built with Streamlit
     </p>
     <p style="color: #999; font-size: 14px;">
-        Version 3.0 | Last Updated: January 2025 | Accuracy: 98.5%
+        Version 3.0 | Last Updated: January 2025 | Accuracy: {accuracy_text}
     </p>
     <div style="margin-top: 20px;">
         <span style="color: #4a90e2; margin: 0 10px;">📧 support@aidietplanner.com</span>
@@ -0,0 +1,84 @@
+"""Latency and throughput benchmark for the model inference paths.
+
+Compares the sklearn wrapper used by ``predict_risk`` (``model.predict`` on a
+DataFrame) with the direct booster and compiled forest engines on
+``test_data.csv``: single-row p50/p99 latency and batch rows/second.
+
+    python bench_inference.py --single-rows 1000 --batch-repeats 20 --json bench.json
+"""
+
+import argparse
+import json
+import time
+
+import numpy as np
+import pandas as pd
+
+from config import TEST_PATH
+from fast_inference import ENGINES, InferenceEngine, as_matrix
+from scoring import load_model, load_feature_columns
+
+
+def single_row_latencies(predict, rows):
+    latencies = np.empty(len(rows))
+    for i, row in enumerate(rows):
+        started = time.perf_counter()
+        predict(row)
+        latencies[i] = time.perf_counter() - started
+    return latencies * 1e6
+
+
+def batch_throughput(predict, X, repeats):
+    predict(X)  # warm-up
+    started = time.perf_counter()
+    for _ in range(repeats):
+        predict(X)
+    return len(X) * repeats / (time.perf_counter() - started)
+
+
+def run(test_path, single_rows, batch_repeats):
+    model = load_model()
+    X_df = pd.read_csv(test_path)[load_feature_columns()]
+    X32 = as_matrix(X_df)
+    baseline = model.predict(X_df)
+    results = []
+    for name in ENGINES:
+        engine = InferenceEngine(model, name)
+        # The sklearn path is measured exactly as predict_risk calls it: on DataFrames.
+        if name == "sklearn":
+            rows = [X_df.iloc[[i]] for i in range(min(single_rows, len(X_df)))]
+            batch = X_df
+        else:
+            rows = [X32[i:i + 1] for i in range(min(single_rows, len(X32)))]
+            batch = X32
+        latencies = single_row_latencies(engine.predict, rows)
+        results.append({
+            "engine": name,
+            "agreement": float((engine.predict(batch) == baseline).mean()),
+            "single_row_p50_us": float(np.percentile(latencies, 50)),
+            "single_row_p99_us": float(np.percentile(latencies, 99)),
+            "batch_rows_per_s": float(batch_throughput(engine.predict, batch, batch_repeats)),
+        })
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark model inference paths on test_data.csv.")
+    parser.add_argument("--test-data", default=TEST_PATH)
+    parser.add_argument("--single-rows", type=int, default=1000, help="rows timed one at a time")
+    parser.add_argument("--batch-repeats", type=int, default=20, help="passes over the full test set")
+    parser.add_argument("--json", help="also write results to this JSON file")
+    args = parser.parse_args(argv)
+
+    results = run(args.test_data, args.single_rows, args.batch_repeats)
+    print(f"{'engine':<10} {'agree':>7} {'p50 µs':>10} {'p99 µs':>10} {'batch rows/s':>14}")
+    for r in results:
+        print(f"{r['engine']:<10} {r['agreement']:>7.2%} {r['single_row_p50_us']:>10,.0f} "
+              f"{r['single_row_p99_us']:>10,.0f} {r['batch_rows_per_s']:>14,.0f}")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
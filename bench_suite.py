@@ -0,0 +1,277 @@
+"""Scaling benchmark over synthetic patient cohorts.
+
+Generates reproducible synthetic cohorts whose columns follow the value
+distributions of the inference CSV, then times every pipeline stage at each
+cohort size: table load (CSV and Parquet), feature preparation,
+``model.predict``, diet assignment, risk aggregation, dashboard data prep
+and CSV export.  Each size runs in a fresh process, so peak RSS (sampled
+while each stage runs) is not inflated by earlier, smaller runs.
+
+Results are written as JSON together with the environment they were
+measured in; pass a previous results file as ``--baseline`` to flag
+throughput or memory regressions (non-zero exit status).
+
+    python bench_suite.py --sizes 10000 100000 1000000 10000000 --json bench_suite.json
+    python bench_suite.py --baseline bench_suite.json --json new.json
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import numpy as np
+import pandas as pd
+
+from config import INFER_PATH, MODEL_PATH, FEATURE_PIPELINE_PATH, PLAN_TXT_PATH, PLAN_STORE_PATH, INFERENCE_ENGINE
+from fast_inference import ENGINES
+from features import RAW_COLUMNS
+from patient_table import INT8_COLUMNS, downcast, read_patient_table
+from timings import rss_mb
+
+DEFAULT_SIZES = [10_000, 100_000, 1_000_000, 10_000_000]
+GENERATE_CHUNK_ROWS = 1_000_000
+MIN_COMPARABLE_SECONDS = 0.05  # shorter stages are too noisy to flag as regressions
+
+
+# ================= SYNTHETIC COHORTS =================
+def column_quantiles(source_path=INFER_PATH):
+    """Sorted values of each raw column; sampling them reproduces the source's marginal distributions."""
+    source = pd.read_csv(source_path, usecols=RAW_COLUMNS)
+    return {col: np.sort(source[col].to_numpy(dtype=np.float64)) for col in RAW_COLUMNS}
+
+
+def synthetic_chunk(quantiles, rows, seed, chunk_no):
+    rng = np.random.default_rng([seed, chunk_no])
+    columns = {}
+    for col in RAW_COLUMNS:
+        values = quantiles[col]
+        # Inverse-CDF sampling with interpolation between observed values.
+        sampled = np.interp(rng.random(rows) * (len(values) - 1), np.arange(len(values)), values)
+        columns[col] = np.rint(sampled).astype(np.int64) if col in INT8_COLUMNS else np.round(sampled, 2)
+    return pd.DataFrame(columns)
+
+
+def write_cohort(path, rows, seed, quantiles):
+    """Write a cohort of ``rows`` synthetic patients in bounded-memory chunks (CSV or Parquet)."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    tmp = f"{path}.tmp"
+    writer = None
+    for chunk_no, start in enumerate(range(0, rows, GENERATE_CHUNK_ROWS)):
+        chunk = synthetic_chunk(quantiles, min(GENERATE_CHUNK_ROWS, rows - start), seed, chunk_no)
+        if path.endswith(".parquet"):
+            table = pa.Table.from_pandas(chunk, preserve_index=False)
+            writer = writer or pq.ParquetWriter(tmp, table.schema)
+            writer.write_table(table)
+        else:
+            chunk.to_csv(tmp, mode="a" if start else "w", header=not start, index=False)
+    if writer is not None:
+        writer.close()
+    os.replace(tmp, path)
+
+
+def cohort_path(work_dir, rows, seed, fmt):
+    return os.path.join(work_dir, f"cohort_{rows}_seed{seed}.{fmt}")
+
+
+# ================= MEASUREMENT =================
+class PeakRss:
+    """Samples RSS in a background thread while a stage runs."""
+
+    def __init__(self, interval=0.005):
+        self.interval = interval
+        self.peak = 0.0
+        self._stop = threading.Event()
+
+    def _sample(self):
+        while not self._stop.is_set():
+            self.peak = max(self.peak, rss_mb())
+            self._stop.wait(self.interval)
+
+    def __enter__(self):
+        self.peak = rss_mb()
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.peak = max(self.peak, rss_mb())
+
+
+def run_size(size, cohort_files, engine, results_path):
+    """All stages for one cohort size; runs in its own process.
+
+    Each stage result is appended to ``results_path`` as soon as it is
+    measured, so the stages before an out-of-memory kill are still reported.
+    """
+    from aggregates import HISTOGRAM_EDGES, RiskAggregates
+    from diet_matching import DietMatcher
+    from export import write_csv
+    from fast_inference import InferenceEngine
+    from patient_table import filter_mask
+    from plan_store import load_plan_store
+    from scoring import load_model, load_feature_pipeline, load_feature_columns, risk_labels
+
+    def measure(stage, fn, rows=None):
+        with PeakRss() as peak:
+            started = time.perf_counter()
+            value = fn()
+            seconds = time.perf_counter() - started
+        result = {
+            "size": size, "stage": stage, "seconds": round(seconds, 4),
+            "rows_per_s": round(rows / seconds) if rows and seconds else None,
+            "peak_rss_mb": round(peak.peak, 1), "rss_mb": round(rss_mb(), 1),
+        }
+        with open(results_path, "a") as f:
+            f.write(json.dumps(result) + "\n")
+        return value
+
+    model = measure("model load", lambda: InferenceEngine(load_model(MODEL_PATH), engine))
+    pipeline = load_feature_pipeline(FEATURE_PIPELINE_PATH)
+    feature_columns = load_feature_columns()
+    matcher = DietMatcher(load_plan_store(PLAN_TXT_PATH, PLAN_STORE_PATH))
+
+    df = None
+    for fmt, path in cohort_files.items():
+        df = None  # release the previous copy before measuring the next load
+        df = measure(f"load {fmt}", lambda: downcast(read_patient_table(path, columns=RAW_COLUMNS)), size)
+
+    X = measure("feature prep", lambda: pipeline.transform(df, feature_columns), size)
+    preds = measure("model.predict", lambda: model.predict(X), size)
+    del X
+    matched = measure("diet assignment", lambda: matcher.match(df, preds), size)
+
+    def aggregate():
+        scored = df.join(pd.DataFrame({"risk_label": risk_labels(preds)}, index=df.index).join(matched))
+        return scored, RiskAggregates.from_frame(scored, "bench")
+
+    scored, aggregates = measure("risk aggregation", aggregate, size)
+
+    def dashboard_prep():
+        # What a Dashboard rerun computes: counts, every histogram and a filtered patient table.
+        aggregates.counts_frame()
+        for col in HISTOGRAM_EDGES:
+            aggregates.histogram_frame(col)
+        age, bmi = scored["age"].to_numpy(), scored["bmi"].to_numpy()
+        mask = filter_mask(scored, aggregates.counts_frame()["Risk Level"].tolist(),
+                           (float(np.percentile(age, 10)), float(np.percentile(age, 90))),
+                           (float(np.percentile(bmi, 10)), float(np.percentile(bmi, 90))))
+        return scored[mask]
+
+    filtered = measure("dashboard prep", dashboard_prep, size)
+    del filtered
+
+    with tempfile.TemporaryDirectory() as tmp:
+        measure("csv export", lambda: write_csv(scored, os.path.join(tmp, "export.csv")), size)
+
+
+# ================= REPORTING =================
+def environment():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    import lightgbm
+    return {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "git_commit": commit,
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "lightgbm": lightgbm.__version__,
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+    }
+
+
+def compare(results, baseline, tolerance):
+    """Stages whose throughput fell or peak RSS grew by more than ``tolerance`` versus ``baseline``."""
+    previous = {(r["size"], r["stage"]): r for r in baseline["results"]}
+    regressions = []
+    for r in results:
+        old = previous.get((r["size"], r["stage"]))
+        if old is None or "error" in r or "error" in old or old["seconds"] < MIN_COMPARABLE_SECONDS:
+            continue
+        if r["rows_per_s"] and old["rows_per_s"] and r["rows_per_s"] < old["rows_per_s"] * (1 - tolerance):
+            regressions.append((r, "rows_per_s", old["rows_per_s"], r["rows_per_s"]))
+        if r["peak_rss_mb"] > old["peak_rss_mb"] * (1 + tolerance):
+            regressions.append((r, "peak_rss_mb", old["peak_rss_mb"], r["peak_rss_mb"]))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark pipeline stages on synthetic cohorts.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="cohort sizes (rows)")
+    parser.add_argument("--formats", nargs="+", choices=["csv", "parquet"], default=["csv", "parquet"],
+                        help="input formats whose load time is measured")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--engine", choices=ENGINES, default=INFERENCE_ENGINE)
+    parser.add_argument("--work-dir", default=".cache/bench", help="where generated cohorts are kept")
+    parser.add_argument("--json", help="write results to this JSON file")
+    parser.add_argument("--baseline", help="previous results JSON to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed relative regression (default: 0.2)")
+    args = parser.parse_args(argv)
+
+    os.makedirs(args.work_dir, exist_ok=True)
+    quantiles = column_quantiles()
+    results = []
+    print(f"{'size':>11} {'stage':<18} {'seconds':>9} {'rows/s':>13} {'peak MB':>9}")
+    for size in args.sizes:
+        cohort_files = {}
+        for fmt in args.formats:
+            path = cohort_path(args.work_dir, size, args.seed, fmt)
+            if not os.path.exists(path):
+                write_cohort(path, size, args.seed, quantiles)
+            cohort_files[fmt] = path
+        # A fresh process per size keeps peak RSS attributable to that size.
+        results_path = os.path.join(args.work_dir, f"results_{size}.jsonl")
+        open(results_path, "w").close()
+        error = None
+        with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as pool:
+            try:
+                pool.submit(run_size, size, cohort_files, args.engine, results_path).result()
+            except BrokenProcessPool:
+                error = "benchmark process died, most likely out of memory"
+        with open(results_path) as f:
+            size_results = [json.loads(line) for line in f]
+        if error:
+            size_results.append({"size": size, "stage": "aborted", "error": error})
+        for r in size_results:
+            if "error" in r:
+                print(f"{r['size']:>11,} {r['stage']:<18} ❌ {r['error']}")
+                continue
+            rate = f"{r['rows_per_s']:,}" if r["rows_per_s"] else "–"
+            print(f"{r['size']:>11,} {r['stage']:<18} {r['seconds']:>9.3f} {rate:>13} {r['peak_rss_mb']:>9,.0f}")
+        results.extend(size_results)
+
+    report = {"environment": environment(), "engine": args.engine, "seed": args.seed, "results": results}
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for r, metric, old, new in regressions:
+            print(f"⚠️  {r['size']:,} rows / {r['stage']}: {metric} {old:,} -> {new:,}")
+        if regressions:
+            return 1
+        print(f"✅ No regressions beyond {args.tolerance:.0%} against {args.baseline}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
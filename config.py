@@ -0,0 +1,75 @@
+# ================= PATHS =================
+MODEL_PATH = "diet_app/best_model_LightGBM.pkl"
+FEATURE_PIPELINE_PATH = "diet_app/feature_pipeline.json"
+TRAIN_PATH = "diet_app/train_data.csv"
+TEST_PATH = "diet_app/test_data.csv"
+INFER_PATH = "diet_app/final_unique_range_valid_medical_data.csv"
+PLAN_TXT_PATH = "diets/RuleBased_Diet_Plans.txt"
+PLAN_STORE_PATH = "diets/RuleBased_Diet_Plans.planstore"
+
+# Rule based plan served at each predicted risk level when no lab flag points
+# to a specific condition (see diet_matching.py).
+RISK_PLAN_CONDITIONS = {"high_risk": "diabetes", "low_risk": "hypertension"}
+
+TARGET_COLUMN = "binary_diet"
+LEAKAGE_COLUMNS = [
+    "blood_sugar", "cholesterol", "hemoglobin", "alkaline_phosphatase",
+    "cancer_severity_score", "diet_risk_score", "continuous_risk_score",
+    "liver_risk_score"
+]
+
+# Patients rendered per page in the diet plan viewer.
+PLAN_PAGE_SIZE = 20
+# Page sizes offered by the server-side paged patient tables; the largest bounds what a rerun sends.
+PATIENT_TABLE_PAGE_SIZES = [25, 50, 100, 250]
+
+HIGH_RISK_LABEL = "HIGH DIET RISK"
+LOW_RISK_LABEL = "LOW DIET RISK"
+RISK_COLORS = {HIGH_RISK_LABEL: "#ff6b6b", LOW_RISK_LABEL: "#51cf66"}
+
+# Per-row prediction cache (see prediction_cache.py)
+PREDICTION_CACHE_PATH = ".cache/predictions.sqlite3"
+PREDICTION_CACHE_MAX_ENTRIES = 1_000_000
+
+MODEL_MANIFEST_PATH = "diet_app/model_manifest.json"
+
+# Cold-start budget for app.py, checked against the startup report.
+STARTUP_BUDGET_SECONDS = 3.0
+
+# Model scoring path: "sklearn" (model.predict), "booster" or "compiled" (see fast_inference.py)
+INFERENCE_ENGINE = "booster"
+
+# Background scoring of uploaded lab reports (see scoring_jobs.py)
+UPLOAD_SCORING_WORKERS = 2
+UPLOAD_CHUNK_ROWS = 5_000
+UPLOAD_POLL_SECONDS = 1.0
+
+# Local HTTP scoring service (see serve.py)
+SERVICE_HOST = "127.0.0.1"
+SERVICE_PORT = 8765
+MICRO_BATCH_MAX_ROWS = 1024
+MICRO_BATCH_MAX_WAIT_MS = 5.0
+
+# Serve the patient table, features, plans and model from memory-mapped files
+# shared by all app replicas on the host (see shared_artifacts.py).
+SHARED_ARTIFACTS = False
+SHARED_ARTIFACTS_DIR = ".cache/shared"  # e.g. "/dev/shm/diet_planner" to keep them in RAM
+
+# Hot-path stage metrics (see timings.StageMetrics).  The performance panel is
+# also shown for ?admin=1; set a path to append every stage run as JSON lines.
+ADMIN_PANEL = False
+METRICS_LOG_PATH = None  # e.g. ".cache/metrics.jsonl"
+
+# Reports written by the offline evaluation job (see evaluation.py) and read by the app.
+EVALUATION_REPORT_PATH = ".cache/reports/evaluation.json"
+DRIFT_REPORT_PATH = ".cache/reports/drift.json"
+
+# Append-only store of scored patients (see patient_store.py).  It is seeded
+# from INFER_PATH on first start; new lab reports are appended with
+# `python patient_store.py ingest <file>` or from the Upload & Score page.
+PATIENT_STORE_DIR = "diet_app/patient_store"
+
+# Per-patient feature contributions, one directory per model version, and the
+# cohort's risk drivers summarised from them by the background job (see explanations.py).
+CONTRIBUTION_CACHE_DIR = ".cache/contributions"
+DRIVER_REPORT_PATH = ".cache/reports/drivers.json"
@@ -0,0 +1,81 @@
+"""Condition-aware diet plan assignment.
+
+Each patient gets a condition from their lab flags (first matching rule
+wins).  A flagged condition alone picks the plan template; only patients with
+no flag fall back to a template chosen by the model's predicted risk.
+Templates are the distinct plans of the rule based plan store, so assigning
+plans to a whole cohort is a pair of array lookups.  Plan dicts are the store's shared templates, so
+rendering and export can be memoized per plan id rather than per patient.
+"""
+
+import numpy as np
+import pandas as pd
+
+from config import RISK_PLAN_CONDITIONS
+from features import derived_columns
+
+# (condition shown for the patient, lab flag that indicates it, plan store condition whose plan is served),
+# in priority order.  The lab panel has no blood pressure, so high cholesterol is served the heart-healthy
+# hypertension plan under its own name; nor does it have a thyroid test, so the store's thyroid plans are
+# never served and stay out of the index.
+CONDITION_RULES = [
+    ("diabetes", "high_blood_sugar_flag", "diabetes"),
+    ("high cholesterol", "high_cholesterol_flag", "hypertension"),
+    ("vitamin deficiency", "anemia_flag", "vitamin deficiency"),
+]
+NO_CONDITION = "general"
+RISK_KEYS = ["low_risk", "high_risk"]  # indexed by the model's class prediction
+
+
+class DietMatcher:
+    def __init__(self, plan_store, condition_rules=CONDITION_RULES, risk_plan_conditions=RISK_PLAN_CONDITIONS):
+        self.condition_rules = list(condition_rules)
+        self.conditions = [condition for condition, _, _ in self.condition_rules] + [NO_CONDITION]
+        plan_conditions = [plan_condition for _, _, plan_condition in self.condition_rules]
+        self.plans = []                 # plan id -> plan
+        self.template_conditions = []   # plan id -> plan store condition it came from
+        self.store_templates = []       # plan id -> template id in the plan store
+        plan_ids = {}
+
+        def template_for(condition):
+            # The store already hashed identical plans into templates; only the ones in use get a plan id.
+            tid = plan_store.condition_template(condition)
+            if tid not in plan_ids:
+                plan_ids[tid] = len(self.plans)
+                self.plans.append(plan_store.template(tid))
+                self.template_conditions.append(condition)
+                self.store_templates.append(tid)
+            return plan_ids[tid]
+
+        # condition code -> plan id for flagged conditions; the trailing NO_CONDITION slot is unused.
+        self.condition_plans = np.array([template_for(c) for c in plan_conditions] + [-1], dtype=np.int16)
+        # predicted class -> plan id, for NO_CONDITION only.
+        self.risk_plans = np.array([template_for(risk_plan_conditions[key]) for key in RISK_KEYS], dtype=np.int16)
+
+    def condition_codes(self, raw_df):
+        flags = derived_columns(raw_df)
+        return np.select(
+            [flags[flag] for _, flag, _ in self.condition_rules],
+            np.arange(len(self.condition_rules)),
+            default=len(self.condition_rules),
+        )
+
+    def match(self, raw_df, preds):
+        """``condition`` and ``plan_id`` for every row, aligned with ``raw_df``."""
+        codes = self.condition_codes(raw_df)
+        general = codes == len(self.condition_rules)
+        plan_ids = np.where(general, self.risk_plans[np.asarray(preds, dtype=np.int64)], self.condition_plans[codes])
+        return pd.DataFrame({
+            "condition": pd.Categorical.from_codes(codes, categories=self.conditions),
+            "plan_id": plan_ids,
+        }, index=raw_df.index)
+
+    def plan(self, plan_id):
+        return self.plans[int(plan_id)]
+
+
+def plan_basis(condition):
+    """One line saying why a patient with ``condition`` got their plan."""
+    if condition == NO_CONDITION:
+        return "No lab flag: plan chosen by predicted diet risk"
+    return f"Plan chosen for the {condition} lab flag, the same at either risk level"
@@ -0,0 +1,283 @@
+"""Offline model evaluation and data-drift reports.
+
+Both reports are computed by this batch job, never by the app, and saved
+as small JSON files that the app only has to read:
+
+* **Evaluation**: accuracy, ROC AUC, Brier score, log loss, the confusion
+  matrix and a calibration table for the held-out ``test_data.csv``.  The
+  file is streamed in chunks and every statistic is accumulated from
+  fixed-size counters (AUC from a fine histogram of predicted
+  probabilities), so memory does not grow with the test set.
+* **Drift**: per-feature population stability index (PSI) and
+  Kolmogorov-Smirnov statistic of the live patients' model inputs against
+  ``train_data.csv``.  Bins are the training data's quantiles; live patients
+  are streamed through the feature pipeline and counted per bin.
+
+Each report records a fingerprint of its inputs, so the app can tell when
+it is stale and rerun this job in the background.
+
+    python evaluation.py                 # both reports, live data from the patient store
+    python evaluation.py --data patients.parquet --skip-evaluation
+    python evaluation.py --stale-only    # only reports whose inputs changed (what the app runs)
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from config import (
+    MODEL_PATH, FEATURE_PIPELINE_PATH, MODEL_MANIFEST_PATH, TRAIN_PATH, TEST_PATH, TARGET_COLUMN,
+    INFERENCE_ENGINE, PATIENT_STORE_DIR, EVALUATION_REPORT_PATH, DRIFT_REPORT_PATH
+)
+from features import RAW_COLUMNS
+from prediction_cache import artifact_fingerprint
+
+EVALUATION_CHUNK_ROWS = 50_000
+AUC_BINS = 10_000           # probability histogram resolution for the streaming AUC
+CALIBRATION_BINS = 10
+PSI_BINS = 10               # training deciles
+KS_GRID = 1_000             # training quantiles the KS statistic is evaluated at
+PSI_WARNING, PSI_ALERT = 0.1, 0.25
+
+
+# ================= FINGERPRINTS =================
+def evaluation_fingerprint(model_path=MODEL_PATH, test_path=TEST_PATH):
+    return artifact_fingerprint(model_path, test_path)
+
+
+def live_data_version(data_path=None, store_dir=PATIENT_STORE_DIR):
+    """Identifies the live patients a drift report was computed on."""
+    if data_path is not None:
+        return f"file:{artifact_fingerprint(data_path)}"
+    from patient_store import PatientStore
+    store = PatientStore(store_dir)
+    return f"store:{os.path.abspath(store_dir)}:g{store.generation}:{store.watermark}"
+
+
+def drift_fingerprint(data_version, pipeline_path=FEATURE_PIPELINE_PATH, train_path=TRAIN_PATH):
+    digest = hashlib.sha256(artifact_fingerprint(pipeline_path, train_path).encode() + data_version.encode())
+    return digest.hexdigest()[:32]
+
+
+# ================= EVALUATION =================
+class EvaluationAccumulator:
+    """Classification statistics accumulated chunk by chunk."""
+
+    def __init__(self):
+        self.confusion = np.zeros((2, 2), dtype=np.int64)       # [actual, predicted]
+        self.score_hist = np.zeros((2, AUC_BINS), dtype=np.int64)
+        self.calibration = np.zeros((3, CALIBRATION_BINS))     # count, sum of predictions, positives
+        self.brier_sum = 0.0
+        self.log_loss_sum = 0.0
+
+    def update(self, y, proba):
+        y = np.asarray(y, dtype=np.int64)
+        proba = np.asarray(proba, dtype=np.float64)
+        preds = (proba > 0.5).astype(np.int64)
+        self.confusion += np.bincount(y * 2 + preds, minlength=4).reshape(2, 2)
+        bins = np.minimum((proba * AUC_BINS).astype(np.int64), AUC_BINS - 1)
+        self.score_hist += np.bincount(y * AUC_BINS + bins, minlength=2 * AUC_BINS).reshape(2, AUC_BINS)
+        cal = np.minimum((proba * CALIBRATION_BINS).astype(np.int64), CALIBRATION_BINS - 1)
+        self.calibration[0] += np.bincount(cal, minlength=CALIBRATION_BINS)
+        self.calibration[1] += np.bincount(cal, weights=proba, minlength=CALIBRATION_BINS)
+        self.calibration[2] += np.bincount(cal, weights=y, minlength=CALIBRATION_BINS)
+        self.brier_sum += float(((proba - y) ** 2).sum())
+        clipped = np.clip(proba, 1e-15, 1 - 1e-15)
+        self.log_loss_sum -= float((y * np.log(clipped) + (1 - y) * np.log(1 - clipped)).sum())
+
+    @property
+    def rows(self):
+        return int(self.confusion.sum())
+
+    def auc(self):
+        """Probability that a positive outranks a negative; ties within a histogram bin count half."""
+        negatives, positives = self.score_hist
+        if not positives.sum() or not negatives.sum():
+            return None
+        negatives_below = np.cumsum(negatives) - negatives
+        wins = (positives * (negatives_below + negatives / 2)).sum()
+        return float(wins / (positives.sum() * negatives.sum()))
+
+    def report(self):
+        (tn, fp), (fn, tp) = self.confusion.tolist()
+        count, predicted, observed = self.calibration
+        edges = np.linspace(0, 1, CALIBRATION_BINS + 1)
+        return {
+            "rows": self.rows,
+            "accuracy": (tn + tp) / self.rows if self.rows else None,
+            "auc": self.auc(),
+            "precision": tp / (tp + fp) if tp + fp else None,
+            "recall": tp / (tp + fn) if tp + fn else None,
+            "brier": self.brier_sum / self.rows if self.rows else None,
+            "log_loss": self.log_loss_sum / self.rows if self.rows else None,
+            "confusion_matrix": {"labels": ["low_risk", "high_risk"], "rows_actual_columns_predicted": [[tn, fp], [fn, tp]]},
+            "calibration": [
+                {"bin": f"{lo:.1f}–{hi:.1f}", "count": int(n),
+                 "mean_predicted": p / n if n else None, "observed_rate": o / n if n else None}
+                for lo, hi, n, p, o in zip(edges[:-1], edges[1:], count, predicted, observed)
+            ],
+        }
+
+
+def evaluate_model(engine, feature_columns, test_path=TEST_PATH, chunk_rows=EVALUATION_CHUNK_ROWS):
+    """Evaluation report for the test split (stored with features already engineered)."""
+    accumulator = EvaluationAccumulator()
+    for chunk in pd.read_csv(test_path, usecols=list(feature_columns) + [TARGET_COLUMN], chunksize=chunk_rows):
+        accumulator.update(chunk[TARGET_COLUMN].to_numpy(), engine.predict_proba(chunk[list(feature_columns)]))
+    return accumulator.report()
+
+
+# ================= DRIFT =================
+class DriftAccumulator:
+    """Per-feature bin counts of live data against bins fixed from the reference (training) data."""
+
+    def __init__(self, reference, feature_columns):
+        self.feature_columns = list(feature_columns)
+        self.psi_edges, self.ks_grid, self.reference_psi, self.reference_cdf = [], [], [], []
+        self.reference_means = reference[self.feature_columns].mean().to_numpy()
+        for col in self.feature_columns:
+            values = np.sort(reference[col].to_numpy(dtype=np.float64))
+            # Interior decile edges; repeated quantiles of discrete features collapse into one bin.
+            psi_edges = np.unique(np.quantile(values, np.linspace(0, 1, PSI_BINS + 1)[1:-1]))
+            grid = np.unique(np.quantile(values, np.linspace(0, 1, KS_GRID + 1)))
+            self.psi_edges.append(psi_edges)
+            self.ks_grid.append(grid)
+            self.reference_psi.append(np.bincount(np.searchsorted(psi_edges, values, side="right"),
+                                                  minlength=len(psi_edges) + 1))
+            self.reference_cdf.append(np.searchsorted(values, grid, side="right") / len(values))
+        self.current_psi = [np.zeros(len(edges) + 1, dtype=np.int64) for edges in self.psi_edges]
+        self.current_grid = [np.zeros(len(grid) + 1, dtype=np.int64) for grid in self.ks_grid]
+        self.current_sums = np.zeros(len(self.feature_columns))
+        self.rows = 0
+
+    def update(self, X):
+        values = X[self.feature_columns].to_numpy(dtype=np.float64)
+        self.rows += len(values)
+        self.current_sums += values.sum(axis=0)
+        for j in range(len(self.feature_columns)):
+            column = values[:, j]
+            self.current_psi[j] += np.bincount(np.searchsorted(self.psi_edges[j], column, side="right"),
+                                               minlength=len(self.psi_edges[j]) + 1)
+            # Values up to each grid point, so the live ECDF can be read off at the same points.
+            self.current_grid[j] += np.bincount(np.searchsorted(self.ks_grid[j], column, side="left"),
+                                                minlength=len(self.ks_grid[j]) + 1)
+
+    def report(self):
+        features = []
+        for j, col in enumerate(self.feature_columns):
+            expected = self.reference_psi[j] / self.reference_psi[j].sum()
+            actual = self.current_psi[j] / max(self.rows, 1)
+            expected, actual = np.maximum(expected, 1e-6), np.maximum(actual, 1e-6)
+            psi = float(((actual - expected) * np.log(actual / expected)).sum())
+            # ECDF at each grid point: live values <= that point.
+            current_cdf = np.cumsum(self.current_grid[j])[:-1] / max(self.rows, 1)
+            ks = float(np.abs(current_cdf - self.reference_cdf[j]).max())
+            features.append({
+                "feature": col, "psi": psi, "ks": ks,
+                "reference_mean": float(self.reference_means[j]),
+                "live_mean": float(self.current_sums[j] / self.rows) if self.rows else None,
+                "status": "major" if psi >= PSI_ALERT else "moderate" if psi >= PSI_WARNING else "stable",
+            })
+        features.sort(key=lambda f: f["psi"], reverse=True)
+        return {"rows": self.rows, "features": features}
+
+
+def iter_live_chunks(data_path=None, store_dir=PATIENT_STORE_DIR, chunk_rows=EVALUATION_CHUNK_ROWS):
+    """Raw lab columns of the live patients: a patient file, or the segments of the patient store."""
+    if data_path is not None:
+        from score_batch import iter_chunks
+        for chunk in iter_chunks(data_path, chunk_rows):
+            yield chunk[RAW_COLUMNS]
+        return
+    from patient_store import PatientStore
+    yield from PatientStore(store_dir).iter_segments(columns=RAW_COLUMNS)
+
+
+def drift_report(pipeline, feature_columns, chunks, train_path=TRAIN_PATH):
+    accumulator = DriftAccumulator(pd.read_csv(train_path, usecols=list(feature_columns)), feature_columns)
+    for chunk in chunks:
+        accumulator.update(pipeline.transform(chunk, feature_columns))
+    return accumulator.report()
+
+
+# ================= ARTIFACTS =================
+def write_report(report, path):
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    # A private temporary file, so concurrent jobs never write into each other's output.
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w") as f:
+            json.dump(report, f, indent=2)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def load_report(path):
+    """Saved report, or None if the job has not written it yet."""
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+
+def is_current(path, fingerprint):
+    report = load_report(path)
+    return report is not None and report.get("fingerprint") == fingerprint
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Evaluate the model on the test split and measure data drift.")
+    parser.add_argument("--data", help="live patient table (CSV/Parquet); default: the patient store")
+    parser.add_argument("--store", default=PATIENT_STORE_DIR)
+    parser.add_argument("--skip-evaluation", action="store_true")
+    parser.add_argument("--skip-drift", action="store_true")
+    parser.add_argument("--stale-only", action="store_true", help="skip reports already computed for these inputs")
+    parser.add_argument("--evaluation-report", default=EVALUATION_REPORT_PATH)
+    parser.add_argument("--drift-report", default=DRIFT_REPORT_PATH)
+    args = parser.parse_args(argv)
+
+    from scoring import load_model, load_feature_pipeline, load_feature_columns
+    from fast_inference import InferenceEngine
+
+    feature_columns = load_feature_columns(MODEL_MANIFEST_PATH, TRAIN_PATH)
+    created = time.strftime("%Y-%m-%dT%H:%M:%S%z")
+
+    if args.stale_only and is_current(args.evaluation_report, evaluation_fingerprint()):
+        args.skip_evaluation = True
+    if not args.skip_evaluation:
+        started = time.perf_counter()
+        engine = InferenceEngine(load_model(MODEL_PATH), INFERENCE_ENGINE)
+        report = evaluate_model(engine, feature_columns)
+        report.update(fingerprint=evaluation_fingerprint(), created_at=created, test_path=TEST_PATH,
+                      seconds=round(time.perf_counter() - started, 3))
+        write_report(report, args.evaluation_report)
+        print(f"✅ Evaluation on {report['rows']:,} test rows: accuracy {report['accuracy']:.1%}, "
+              f"AUC {report['auc']:.3f} -> {args.evaluation_report}")
+
+    data_version = live_data_version(args.data, args.store)
+    if args.stale_only and is_current(args.drift_report, drift_fingerprint(data_version)):
+        args.skip_drift = True
+    if not args.skip_drift:
+        started = time.perf_counter()
+        report = drift_report(load_feature_pipeline(FEATURE_PIPELINE_PATH), feature_columns,
+                              iter_live_chunks(args.data, args.store))
+        report.update(fingerprint=drift_fingerprint(data_version), created_at=created, reference=TRAIN_PATH,
+                      live_data=args.data or args.store, seconds=round(time.perf_counter() - started, 3))
+        write_report(report, args.drift_report)
+        drifted = [f["feature"] for f in report["features"] if f["status"] != "stable"]
+        print(f"✅ Drift over {report['rows']:,} live patients: "
+              f"{len(drifted)} of {len(report['features'])} features drifted -> {args.drift_report}")
+
+
+if __name__ == "__main__":
+    main()
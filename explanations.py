@@ -0,0 +1,211 @@
+"""Per-patient feature contributions (SHAP values) for the diet risk model.
+
+LightGBM computes exact TreeSHAP contributions natively with
+``booster.predict(..., pred_contrib=True)``: one column per model feature
+plus the expected value, summing to each patient's raw score (log-odds of
+high diet risk).  They cost about a millisecond per patient, so they are
+computed for whole batches of patients at a time and kept as float32
+``.npy`` files in a directory per model version, keyed by the content of
+the rows they explain.  Patients the current model has already explained
+are never computed again.
+
+The cohort summary (which features drive risk) is computed by this module
+as a batch job, never by the app: it explains the live patients segment
+by segment and saves the summary as a small JSON report with a
+fingerprint of the model and the live data, which the app only reads.  A
+single patient's explanation is cheap and computed on demand.
+
+    python explanations.py                # cohort drivers for the patient store
+    python explanations.py --stale-only   # only if the model or the patients changed (what the app runs)
+"""
+
+import argparse
+import hashlib
+import os
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from config import (
+    MODEL_PATH, FEATURE_PIPELINE_PATH, MODEL_MANIFEST_PATH, TRAIN_PATH, PATIENT_STORE_DIR, CONTRIBUTION_CACHE_DIR,
+    DRIVER_REPORT_PATH
+)
+from evaluation import is_current, iter_live_chunks, live_data_version, write_report
+from fast_inference import as_matrix
+from prediction_cache import artifact_fingerprint, row_hashes
+
+CONTRIBUTION_CHUNK_ROWS = 20_000
+
+# Raw lab value behind each engineered feature, shown next to its contribution.
+FEATURE_SOURCES = {
+    "bmi_category": "bmi",
+    "anemia_flag": "hemoglobin",
+    "high_cholesterol_flag": "cholesterol",
+    "high_blood_sugar_flag": "blood_sugar",
+}
+
+
+def feature_source(feature):
+    return FEATURE_SOURCES.get(feature, feature.removesuffix("_log"))
+
+
+def feature_label(feature):
+    label = feature.removesuffix("_log").replace("_", " ").title()
+    return f"{label} (log)" if feature.endswith("_log") else label
+
+
+def model_version(model_path=MODEL_PATH, pipeline_path=FEATURE_PIPELINE_PATH):
+    return artifact_fingerprint(model_path, pipeline_path)
+
+
+def drivers_fingerprint(data_version, model_path=MODEL_PATH, pipeline_path=FEATURE_PIPELINE_PATH):
+    digest = hashlib.sha256(model_version(model_path, pipeline_path).encode() + data_version.encode())
+    return digest.hexdigest()[:32]
+
+
+def contributions(booster, X, chunk_rows=CONTRIBUTION_CHUNK_ROWS):
+    """(rows, features + 1) float32 matrix; the last column is the model's expected value."""
+    X = as_matrix(X)
+    out = np.empty((len(X), booster.num_feature() + 1), dtype=np.float32)
+    for start in range(0, len(X), chunk_rows):
+        out[start:start + chunk_rows] = booster.predict(
+            X[start:start + chunk_rows], pred_contrib=True, validate_features=False
+        )
+    return out
+
+
+class ContributionCache:
+    def __init__(self, directory=CONTRIBUTION_CACHE_DIR, version=None):
+        self.path = os.path.join(directory, version or model_version())
+        self.hits = 0
+        self.misses = 0
+
+    def matrix(self, raw, features_fn, booster_fn):
+        """Contributions for the patients in ``raw``, computed (and stored) only on a miss.
+
+        ``features_fn(raw)`` gives the model inputs and ``booster_fn()`` the
+        LightGBM booster; neither is called when the rows are cached.
+        """
+        key = hashlib.sha1(row_hashes(raw).tobytes()).hexdigest()[:24]
+        path = os.path.join(self.path, f"{key}.npy")
+        if os.path.exists(path):
+            self.hits += 1
+            return np.load(path, mmap_mode="r")
+        self.misses += 1
+        matrix = contributions(booster_fn(), features_fn(raw))
+        os.makedirs(self.path, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.path, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                np.save(f, matrix)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+        return matrix
+
+
+def patient_explanation(contrib, feature_columns, raw_row, top=8):
+    """Largest contributions of one patient, most influential first."""
+    values = np.asarray(contrib[:-1], dtype=np.float64)
+    order = np.argsort(-np.abs(values))[:top]
+    return pd.DataFrame({
+        "Feature": [feature_label(feature_columns[i]) for i in order],
+        "Lab value": [round(float(raw_row[feature_source(feature_columns[i])]), 2) for i in order],
+        "Contribution": values[order].round(3),
+        "Effect": ["↑ raises risk" if values[i] > 0 else "↓ lowers risk" for i in order],
+    })
+
+
+def risk_probability(contrib):
+    """Predicted probability of high diet risk from a row of contributions (they sum to the log-odds)."""
+    return float(1 / (1 + np.exp(-np.asarray(contrib, dtype=np.float64).sum())))
+
+
+class DriverAccumulator:
+    """Cohort driver statistics accumulated batch by batch of contributions."""
+
+    def __init__(self, n_features):
+        self.rows = 0
+        self.high_risk_rows = 0
+        self.abs_sums = np.zeros(n_features)
+        self.high_risk_sums = np.zeros(n_features)
+        self.high_risk_raises = np.zeros(n_features, dtype=np.int64)
+
+    def update(self, matrix, high_risk=None):
+        """Add a batch; ``high_risk`` defaults to the model's own call (log-odds above 0)."""
+        values = np.asarray(matrix[:, :-1], dtype=np.float32)
+        if high_risk is None:
+            high_risk = np.asarray(matrix, dtype=np.float64).sum(axis=1) > 0
+        flagged = values[np.asarray(high_risk, dtype=bool)]
+        self.rows += len(values)
+        self.high_risk_rows += len(flagged)
+        self.abs_sums += np.abs(values).sum(axis=0, dtype=np.float64)
+        self.high_risk_sums += flagged.sum(axis=0, dtype=np.float64)
+        self.high_risk_raises += (flagged > 0).sum(axis=0)
+
+    def summary(self, feature_columns):
+        """Mean absolute contribution per feature, largest first, with the mean contribution
+        among high-risk patients and how often the feature pushed them up."""
+        summary = pd.DataFrame({
+            "Feature": [feature_label(col) for col in feature_columns],
+            "Mean |contribution|": self.abs_sums / self.rows if self.rows else 0.0,
+        })
+        if self.high_risk_rows:
+            summary["Mean contribution (high risk)"] = self.high_risk_sums / self.high_risk_rows
+            summary["Raises risk (share of high risk)"] = self.high_risk_raises / self.high_risk_rows
+        return summary.sort_values("Mean |contribution|", ascending=False, kind="stable").reset_index(drop=True)
+
+
+def top_drivers(matrix, feature_columns, high_risk=None):
+    """Cohort summary of one contribution matrix (see ``DriverAccumulator``)."""
+    accumulator = DriverAccumulator(len(feature_columns))
+    accumulator.update(matrix, high_risk)
+    return accumulator.summary(feature_columns)
+
+
+def main(argv=None):
+    from scoring import load_model, load_feature_pipeline, load_feature_columns
+
+    parser = argparse.ArgumentParser(description="Summarise what drives the live patients' risk.")
+    parser.add_argument("--data", help="live patient table (CSV/Parquet); default: the patient store")
+    parser.add_argument("--store", default=PATIENT_STORE_DIR)
+    parser.add_argument("--cache-dir", default=CONTRIBUTION_CACHE_DIR)
+    parser.add_argument("--report", default=DRIVER_REPORT_PATH)
+    parser.add_argument("--stale-only", action="store_true", help="skip if the report is already current")
+    args = parser.parse_args(argv)
+
+    fingerprint = drivers_fingerprint(live_data_version(args.data, args.store))
+    if args.stale_only and is_current(args.report, fingerprint):
+        return
+
+    cache = ContributionCache(args.cache_dir)
+    pipeline = load_feature_pipeline(FEATURE_PIPELINE_PATH)
+    feature_columns = load_feature_columns(MODEL_MANIFEST_PATH, TRAIN_PATH)
+    accumulator = DriverAccumulator(len(feature_columns))
+    booster = None
+
+    def booster_fn():
+        nonlocal booster
+        booster = booster or load_model(MODEL_PATH).booster_
+        return booster
+
+    started = time.perf_counter()
+    # Store segments are explained (and cached) one at a time, so memory stays at one segment.
+    for raw in iter_live_chunks(args.data, args.store):
+        accumulator.update(cache.matrix(raw, lambda rows: pipeline.transform(rows, feature_columns), booster_fn))
+    report = {
+        "fingerprint": fingerprint, "created_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "live_data": args.data or args.store, "rows": accumulator.rows, "high_risk_rows": accumulator.high_risk_rows,
+        "drivers": accumulator.summary(feature_columns).to_dict("records"),
+        "seconds": round(time.perf_counter() - started, 3),
+    }
+    write_report(report, args.report)
+    print(f"✅ Drivers of {accumulator.rows:,} patients -> {args.report} "
+          f"({cache.misses} batches explained, {cache.hits} cached) in {report['seconds']:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,253 @@
+"""On-demand CSV and PDF exports of patient risk data and diet plans.
+
+Nothing here is built until an export is actually requested.  CSV output is
+produced in fixed-size row chunks, single patient reports are rendered as
+PDF with reportlab, and cohort exports render PDFs in a process pool and
+write them into a zip archive as they complete, so memory stays bounded by
+the number of documents in flight rather than the cohort size.  That bound
+holds end to end for the CLI, which writes the archive straight to disk; the
+app spools it to a temporary file, but Streamlit reads a finished download
+into memory before serving it.
+
+    python export.py diet_app/final_unique_range_valid_medical_data.csv plans.zip --workers 8
+"""
+
+import argparse
+import html
+import io
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from contextlib import nullcontext
+from datetime import datetime
+
+from config import HIGH_RISK_LABEL
+
+CSV_CHUNK_ROWS = 50_000
+PDF_BATCH_SIZE = 200
+
+# ================= CSV =================
+def iter_csv_chunks(df, chunk_rows=CSV_CHUNK_ROWS):
+    """Encoded CSV of ``df`` in chunks of ``chunk_rows`` rows, header first."""
+    for start in range(0, max(len(df), 1), chunk_rows):
+        chunk = df.iloc[start:start + chunk_rows]
+        yield chunk.to_csv(index=False, header=(start == 0)).encode("utf-8")
+
+
+class ChunkStream(io.RawIOBase):
+    """Read-only file object over a generator of byte chunks."""
+
+    def __init__(self, chunks):
+        self._chunks = iter(chunks)
+        self._pending = b""
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        while not self._pending:
+            self._pending = next(self._chunks, None)
+            if self._pending is None:
+                self._pending = b""
+                return 0
+        n = min(len(buffer), len(self._pending))
+        buffer[:n] = self._pending[:n]
+        self._pending = self._pending[n:]
+        return n
+
+
+def csv_stream(df, chunk_rows=CSV_CHUNK_ROWS):
+    return io.BufferedReader(ChunkStream(iter_csv_chunks(df, chunk_rows)))
+
+
+def write_csv(df, path, chunk_rows=CSV_CHUNK_ROWS):
+    with open(path, "wb") as f:
+        for chunk in iter_csv_chunks(df, chunk_rows):
+            f.write(chunk)
+
+
+# ================= PDF =================
+def plan_markup(plan):
+    """(style, paragraph markup) of every line of a plan; the same for all patients sharing the plan."""
+    markup = []
+    for day, meals in plan.items():
+        markup.append(("Heading3", html.escape(day)))
+        if isinstance(meals, dict):
+            markup.extend(("Normal", f"<b>{html.escape(meal)}:</b> {html.escape(value)}")
+                          for meal, value in meals.items())
+        elif isinstance(meals, list):
+            markup.extend(("Normal", f"&bull; {html.escape(item)}") for item in meals)
+        else:
+            markup.append(("Normal", html.escape(str(meals))))
+    return markup
+
+
+def patient_plan_pdf(patient_no, risk_label, labs, plan, markup=None, basis=None):
+    """One printable diet plan report; ``labs`` maps lab names to values.
+
+    ``markup`` is ``plan_markup(plan)`` when the caller already has it; ``basis``
+    is the ``plan_basis`` line explaining why this plan was chosen.
+    """
+    from reportlab.lib import colors
+    from reportlab.lib.pagesizes import A4
+    from reportlab.lib.styles import getSampleStyleSheet
+    from reportlab.lib.units import cm
+    from reportlab.platypus import Paragraph, SimpleDocTemplate, Spacer, Table, TableStyle
+
+    styles = getSampleStyleSheet()
+    risk_color = "#ee5a52" if risk_label == HIGH_RISK_LABEL else "#40c057"
+    story = [
+        Paragraph("AI Diet Planner - Personalized Diet Plan", styles["Title"]),
+        Paragraph(f"Patient {patient_no}", styles["Heading2"]),
+        Paragraph(f'Risk assessment: <font color="{risk_color}"><b>{risk_label}</b></font>', styles["Normal"]),
+        Paragraph(f"Generated {datetime.now():%Y-%m-%d %H:%M}", styles["Normal"]),
+        Spacer(1, 0.4 * cm),
+    ]
+    if labs:
+        rows = [[name.replace("_", " ").title(), f"{value:g}" if isinstance(value, float) else str(value)]
+                for name, value in labs.items()]
+        lab_table = Table([["Lab value", "Result"]] + rows, colWidths=[7 * cm, 4 * cm])
+        lab_table.setStyle(TableStyle([
+            ("BACKGROUND", (0, 0), (-1, 0), colors.HexColor("#4a90e2")),
+            ("TEXTCOLOR", (0, 0), (-1, 0), colors.white),
+            ("GRID", (0, 0), (-1, -1), 0.25, colors.HexColor("#dee2e6")),
+            ("FONTSIZE", (0, 0), (-1, -1), 9),
+        ]))
+        story += [lab_table, Spacer(1, 0.4 * cm)]
+
+    story.append(Paragraph("Recommended Diet Plan", styles["Heading2"]))
+    if basis:
+        story.append(Paragraph(f"<i>{html.escape(basis)}</i>", styles["Normal"]))
+    story.extend(Paragraph(text, styles[style]) for style, text in (markup or plan_markup(plan)))
+
+    buffer = io.BytesIO()
+    SimpleDocTemplate(buffer, pagesize=A4, title=f"Diet plan - patient {patient_no}").build(story)
+    return buffer.getvalue()
+
+
+_plans = None
+_plan_markup = {}  # plan id -> plan_markup, built once per template in each worker
+
+
+def _init_pdf_worker(plans):
+    global _plans
+    _plans = plans
+    _plan_markup.clear()
+
+
+def _render_batch(records):
+    rendered = []
+    for patient_no, risk_label, plan_id, basis, labs in records:
+        if plan_id not in _plan_markup:
+            _plan_markup[plan_id] = plan_markup(_plans[plan_id])
+        rendered.append((f"patient_{patient_no:07d}.pdf",
+                         patient_plan_pdf(patient_no, risk_label, labs, _plans[plan_id], _plan_markup[plan_id],
+                                          basis)))
+    return rendered
+
+
+def _iter_records(df, lab_columns, batch_size):
+    from diet_matching import plan_basis
+
+    labs = df[lab_columns].to_dict("records") if lab_columns else [{}] * len(df)
+    batch = []
+    for patient_no, risk_label, plan_id, condition, row in zip(
+        df["patient_no"].tolist(), df["risk_label"].tolist(), df["plan_id"].tolist(), df["condition"].tolist(), labs
+    ):
+        batch.append((patient_no, risk_label, plan_id, plan_basis(condition), row))
+        if len(batch) == batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def pdf_worker_pool(plans, workers=None):
+    """Process pool whose workers hold ``plans``; pass it to ``write_cohort_pdfs`` to reuse it across exports."""
+    return ProcessPoolExecutor(max_workers=workers or os.cpu_count() or 1, initializer=_init_pdf_worker,
+                               initargs=(plans,), mp_context=multiprocessing.get_context("spawn"))
+
+
+def write_cohort_pdfs(df, plans, out, lab_columns=(), workers=None, batch_size=PDF_BATCH_SIZE, pool=None):
+    """Render one PDF per row of ``df`` into the zip file ``out`` (path or file object).
+
+    ``df`` needs ``patient_no``, ``risk_label``, ``plan_id`` and ``condition`` columns;
+    ``plans`` maps plan ids to plans and is sent to each worker only once.  Without
+    a ``pool`` from ``pdf_worker_pool`` one is started for this export and shut down after it.
+    """
+    workers = workers or os.cpu_count() or 1
+    lab_columns = list(lab_columns)
+    written = 0
+    with zipfile.ZipFile(out, "w", compression=zipfile.ZIP_DEFLATED) as archive, \
+            (nullcontext(pool) if pool is not None else pdf_worker_pool(plans, workers)) as pool:
+        pending = set()
+
+        def drain(block):
+            nonlocal written
+            done, _ = wait(pending, return_when=FIRST_COMPLETED) if block else (
+                {f for f in pending if f.done()}, None)
+            for future in done:
+                pending.discard(future)
+                for name, pdf in future.result():
+                    archive.writestr(name, pdf)
+                    written += 1
+
+        for batch in _iter_records(df, lab_columns, batch_size):
+            while len(pending) >= 2 * workers:
+                drain(block=True)
+            pending.add(pool.submit(_render_batch, batch))
+            drain(block=False)
+        while pending:
+            drain(block=True)
+    return written
+
+
+def cohort_zip_stream(df, plans, lab_columns=(), workers=None, pool=None):
+    """Build the cohort zip in a temporary file and return it opened for reading."""
+    spool = tempfile.TemporaryFile()
+    write_cohort_pdfs(df, plans, spool, lab_columns, workers, pool=pool)
+    spool.seek(0)
+    return spool
+
+
+# ================= CLI =================
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export printable diet plans for a patient cohort.")
+    parser.add_argument("input", help="raw patient table (CSV, Parquet or Feather)")
+    parser.add_argument("output", help="zip archive of per-patient PDFs, or a .csv for a risk table")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--limit", type=int, help="only export the first N patients")
+    args = parser.parse_args(argv)
+
+    from config import PLAN_TXT_PATH, PLAN_STORE_PATH
+    from diet_matching import DietMatcher
+    from features import RAW_COLUMNS
+    from patient_table import downcast, read_patient_table
+    from plan_store import load_plan_store
+    from scoring import load_model, load_feature_pipeline, predict_classes, scored_frame
+
+    started = time.perf_counter()
+    df = downcast(read_patient_table(args.input, columns=RAW_COLUMNS))
+    if args.limit:
+        df = df.head(args.limit)
+    preds = predict_classes(load_model(), load_feature_pipeline(), df)
+    matcher = DietMatcher(load_plan_store(PLAN_TXT_PATH, PLAN_STORE_PATH))
+    df = df.join(scored_frame(preds, index=df.index)).join(matcher.match(df, preds))
+    df.insert(0, "patient_no", range(1, len(df) + 1))
+
+    if args.output.endswith(".csv"):
+        write_csv(df, args.output)
+        print(f"✅ Wrote {len(df):,} rows -> {args.output} ({time.perf_counter() - started:.1f}s)")
+        return
+
+    written = write_cohort_pdfs(df, matcher.plans, args.output, RAW_COLUMNS, args.workers)
+    elapsed = time.perf_counter() - started
+    print(f"✅ Wrote {written:,} PDF plans -> {args.output} ({elapsed:.1f}s, {written / elapsed:,.0f} plans/s)")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
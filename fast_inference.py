@@ -0,0 +1,158 @@
+"""Low-overhead inference for the LightGBM diet risk model.
+
+``model.predict`` on the sklearn wrapper validates and converts its input on
+every call, which dominates the cost of scoring a single patient.
+``InferenceEngine`` feeds contiguous float32 arrays straight to the
+underlying booster, or to ``CompiledForest``: the trees flattened into
+NumPy node arrays and evaluated for all rows and trees at once.
+"""
+
+import json
+import os
+
+import numpy as np
+
+ENGINES = ("sklearn", "booster", "compiled")
+
+
+def as_matrix(X):
+    """Contiguous float32 feature matrix from a DataFrame or array."""
+    values = X.to_numpy(dtype=np.float32) if hasattr(X, "to_numpy") else X
+    return np.ascontiguousarray(values, dtype=np.float32)
+
+
+# ================= COMPILED FOREST =================
+class CompiledForest:
+    """All trees of a binary LightGBM model as flat node arrays.
+
+    Leaves point back at themselves, so ``max_depth`` rounds of
+    ``node = left if x[feature] <= threshold else right`` land every
+    (row, tree) pair on its leaf without per-row branching.
+    """
+
+    ARRAYS = ("feature", "threshold", "left", "right", "value", "roots")
+
+    def __init__(self, feature, threshold, left, right, value, roots, max_depth, feature_names):
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        self.value = value
+        self.roots = roots
+        self.max_depth = int(max_depth)
+        self.feature_names = list(feature_names)
+
+    @classmethod
+    def from_booster(cls, booster):
+        dump = booster.dump_model()
+        if dump["objective"].split()[0] != "binary" or dump["num_tree_per_iteration"] != 1:
+            raise ValueError("CompiledForest only supports binary LightGBM models")
+
+        feature, threshold, left, right, value, roots = [], [], [], [], [], []
+        max_depth = 0
+
+        def add(node, depth):
+            nonlocal max_depth
+            idx = len(feature)
+            feature.append(0)
+            threshold.append(0.0)
+            left.append(idx)
+            right.append(idx)
+            value.append(0.0)
+            if "split_index" not in node:
+                max_depth = max(max_depth, depth)
+                value[idx] = node["leaf_value"]
+                return idx
+            if node["decision_type"] != "<=" or node["missing_type"] != "None":
+                raise ValueError("CompiledForest only supports numerical splits without missing-value handling")
+            feature[idx] = node["split_feature"]
+            threshold[idx] = node["threshold"]
+            left[idx] = add(node["left_child"], depth + 1)
+            right[idx] = add(node["right_child"], depth + 1)
+            return idx
+
+        for tree in dump["tree_info"]:
+            roots.append(add(tree["tree_structure"], 0))
+
+        return cls(
+            np.array(feature, dtype=np.int32), np.array(threshold, dtype=np.float64),
+            np.array(left, dtype=np.int32), np.array(right, dtype=np.int32),
+            np.array(value, dtype=np.float64), np.array(roots, dtype=np.int32),
+            max_depth, dump["feature_names"],
+        )
+
+    def predict_raw(self, X, chunk_rows=512):
+        X = as_matrix(X)
+        # LightGBM maps NaN to 0.0 for splits with missing_type "None".
+        if np.isnan(X).any():
+            X = np.nan_to_num(X, nan=0.0)
+        n_features = X.shape[1]
+        raw = np.empty(len(X))
+        # Chunks keep the (rows x trees) node matrix cache-sized.
+        for start in range(0, len(X), chunk_rows):
+            flat = X[start:start + chunk_rows].astype(np.float64).ravel()
+            n = len(flat) // n_features
+            row_base = (np.arange(n) * n_features)[:, None]
+            node = np.broadcast_to(self.roots, (n, len(self.roots)))
+            for _ in range(self.max_depth):
+                go_left = flat.take(row_base + self.feature.take(node)) <= self.threshold.take(node)
+                node = np.where(go_left, self.left.take(node), self.right.take(node))
+            raw[start:start + n] = self.value.take(node).sum(axis=1)
+        return raw
+
+    def predict_proba(self, X):
+        return 1.0 / (1.0 + np.exp(-self.predict_raw(X)))
+
+    def predict(self, X):
+        return (self.predict_raw(X) > 0).astype(np.int64)
+
+    def save(self, directory):
+        os.makedirs(directory, exist_ok=True)
+        for name in self.ARRAYS:
+            np.save(os.path.join(directory, f"{name}.npy"), getattr(self, name))
+        with open(os.path.join(directory, "forest.json"), "w") as f:
+            json.dump({"max_depth": self.max_depth, "feature_names": self.feature_names}, f)
+
+    @classmethod
+    def load(cls, directory, mmap_mode=None):
+        arrays = {name: np.load(os.path.join(directory, f"{name}.npy"), mmap_mode=mmap_mode)
+                  for name in cls.ARRAYS}
+        with open(os.path.join(directory, "forest.json")) as f:
+            meta = json.load(f)
+        return cls(**arrays, **meta)
+
+
+# ================= ENGINE =================
+class InferenceEngine:
+    def __init__(self, model, engine="booster", forest=None):
+        """``model`` may be None for the compiled engine when ``forest`` is given."""
+        if engine not in ENGINES:
+            raise ValueError(f"Unknown inference engine {engine!r}; expected one of {ENGINES}")
+        if model is None and not (engine == "compiled" and forest is not None):
+            raise ValueError(f"The {engine!r} engine needs the LightGBM model")
+        self.model = model
+        self.engine = engine
+        self.booster = model.booster_ if model is not None else None
+        self.forest = forest
+        if engine == "compiled" and forest is None:
+            self.forest = CompiledForest.from_booster(self.booster)
+
+    def predict_proba(self, X, **kwargs):
+        if self.engine == "compiled":
+            return self.forest.predict_proba(X)
+        if self.engine == "sklearn":
+            return self.model.predict_proba(X, **kwargs)[:, 1]
+        return self.booster.predict(as_matrix(X), validate_features=False, **kwargs)
+
+    def predict(self, X, **kwargs):
+        """Class predictions, identical to ``model.predict``.
+
+        Extra keyword arguments (e.g. ``num_threads``) go to LightGBM and are
+        ignored by the compiled forest.
+        """
+        if self.engine == "sklearn":
+            return self.model.predict(X, **kwargs)
+        if self.engine == "compiled":
+            return self.forest.predict(X)
+        raw = self.booster.predict(as_matrix(X), raw_score=True, validate_features=False, **kwargs)
+        return (raw > 0).astype(np.int64)
@@ -0,0 +1,107 @@
+"""Feature engineering for the LightGBM diet risk model.
+
+The model was trained on engineered, standard-scaled features while the
+inference CSV only carries the 15 raw lab columns.  ``FeaturePipeline``
+reproduces the training transformation with whole-column NumPy operations
+and is stored as a small JSON file next to the model.
+"""
+
+import json
+import sys
+
+import numpy as np
+import pandas as pd
+
+from config import FEATURE_PIPELINE_PATH, INFER_PATH, LEAKAGE_COLUMNS, TARGET_COLUMN, TRAIN_PATH
+
+# ================= FEATURE DEFINITIONS =================
+RAW_COLUMNS = [
+    "age", "bmi", "cholesterol", "blood_sugar", "hemoglobin", "rbc_count",
+    "platelet_count", "wbc_count", "alkaline_phosphatase", "total_protein",
+    "glucose", "tumor_size", "tumor_grade", "lymph_nodes", "stage"
+]
+SCALED_COLUMNS = RAW_COLUMNS[:12]
+LOG_COLUMNS = ["cholesterol", "blood_sugar", "platelet_count", "wbc_count", "alkaline_phosphatase"]
+
+BMI_CATEGORY_BINS = [18.5, 24.9, 29.9]   # underweight | normal | overweight | obese
+ANEMIA_HEMOGLOBIN = 12.0                 # g/dL, flag when below
+HIGH_CHOLESTEROL = 200.0                 # mg/dL, flag when above
+HIGH_BLOOD_SUGAR = 140.0                 # mg/dL, flag when above
+
+
+def derived_columns(df):
+    """Flags and log transforms computed from raw (unscaled) lab values."""
+    bmi = df["bmi"].to_numpy(dtype=np.float64)
+    derived = {
+        "bmi_category": np.searchsorted(BMI_CATEGORY_BINS, bmi, side="left"),
+        "anemia_flag": df["hemoglobin"].to_numpy() < ANEMIA_HEMOGLOBIN,
+        "high_cholesterol_flag": df["cholesterol"].to_numpy() > HIGH_CHOLESTEROL,
+        "high_blood_sugar_flag": df["blood_sugar"].to_numpy() > HIGH_BLOOD_SUGAR,
+    }
+    for col in LOG_COLUMNS:
+        derived[f"{col}_log"] = np.log1p(df[col].to_numpy(dtype=np.float64))
+    return derived
+
+
+# ================= PIPELINE =================
+class FeaturePipeline:
+    def __init__(self, feature_columns, means, stds):
+        self.feature_columns = list(feature_columns)
+        self.means = {col: float(means[col]) for col in SCALED_COLUMNS}
+        self.stds = {col: float(stds[col]) for col in SCALED_COLUMNS}
+
+    @classmethod
+    def fit(cls, raw_df, feature_columns):
+        missing = [col for col in RAW_COLUMNS if col not in raw_df.columns]
+        if missing:
+            raise ValueError(f"Missing raw columns for fitting: {missing}")
+        values = raw_df[SCALED_COLUMNS].to_numpy(dtype=np.float64)
+        means = dict(zip(SCALED_COLUMNS, values.mean(axis=0)))
+        stds = dict(zip(SCALED_COLUMNS, values.std(axis=0)))
+        return cls(feature_columns, means, stds)
+
+    def transform(self, raw_df, feature_columns=None):
+        columns = list(feature_columns) if feature_columns is not None else self.feature_columns
+        missing = [col for col in RAW_COLUMNS if col not in raw_df.columns]
+        if missing:
+            raise ValueError(f"Missing raw columns: {missing}")
+
+        derived = derived_columns(raw_df)
+        X = np.empty((len(raw_df), len(columns)), dtype=np.float64)
+        for j, col in enumerate(columns):
+            if col in derived:
+                X[:, j] = derived[col]
+            elif col in self.means:
+                X[:, j] = (raw_df[col].to_numpy(dtype=np.float64) - self.means[col]) / self.stds[col]
+            elif col in raw_df.columns:
+                X[:, j] = raw_df[col].to_numpy(dtype=np.float64)
+            else:
+                raise ValueError(f"Feature pipeline cannot produce column {col!r}")
+        return pd.DataFrame(X, columns=columns, index=raw_df.index)
+
+    def to_json(self, path):
+        with open(path, "w") as f:
+            json.dump({
+                "feature_columns": self.feature_columns,
+                "means": self.means,
+                "stds": self.stds,
+            }, f, indent=2)
+
+    @classmethod
+    def from_json(cls, path):
+        with open(path) as f:
+            spec = json.load(f)
+        return cls(spec["feature_columns"], spec["means"], spec["stds"])
+
+
+if __name__ == "__main__":
+    # python features.py [raw_csv] [train_csv] [output_json]
+    raw_path = sys.argv[1] if len(sys.argv) > 1 else INFER_PATH
+    train_path = sys.argv[2] if len(sys.argv) > 2 else TRAIN_PATH
+    out_path = sys.argv[3] if len(sys.argv) > 3 else FEATURE_PIPELINE_PATH
+
+    header = pd.read_csv(train_path, nrows=0).columns
+    feature_columns = [c for c in header if c not in LEAKAGE_COLUMNS + [TARGET_COLUMN]]
+    pipeline = FeaturePipeline.fit(pd.read_csv(raw_path), feature_columns)
+    pipeline.to_json(out_path)
+    print(f"✅ Fitted {len(feature_columns)} features on {raw_path} -> {out_path}")
@@ -0,0 +1,108 @@
+"""Load test for the HTTP scoring service (serve.py).
+
+Replays raw patients from the inference CSV as ``POST /predict`` requests
+from an increasing number of concurrent keep-alive clients and reports
+throughput and p50/p95/p99 request latency at each level.
+
+    python serve.py --workers 4 &
+    python load_test.py --concurrency 1 4 16 64 --requests 2000 --json load.json
+"""
+
+import argparse
+import http.client
+import json
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from config import INFER_PATH, SERVICE_HOST, SERVICE_PORT
+from features import RAW_COLUMNS
+
+
+def request_bodies(data_path, rows_per_request, n):
+    records = pd.read_csv(data_path, usecols=RAW_COLUMNS)[RAW_COLUMNS].to_dict("records")
+    return [
+        json.dumps({"patients": [records[(i * rows_per_request + j) % len(records)]
+                                 for j in range(rows_per_request)]}).encode("utf-8")
+        for i in range(n)
+    ]
+
+
+def run_level(host, port, bodies, concurrency):
+    latencies = np.zeros(len(bodies))
+    errors = []
+    next_request = iter(range(len(bodies)))
+    lock = threading.Lock()
+
+    def client():
+        conn = http.client.HTTPConnection(host, port)
+        while True:
+            with lock:
+                i = next(next_request, None)
+            if i is None:
+                break
+            started = time.perf_counter()
+            try:
+                conn.request("POST", "/predict", bodies[i], {"Content-Type": "application/json"})
+                response = conn.getresponse()
+                response.read()
+                if response.status != 200:
+                    errors.append(response.status)
+            except (OSError, http.client.HTTPException) as e:
+                errors.append(type(e).__name__)
+                conn.close()
+                conn = http.client.HTTPConnection(host, port)
+            latencies[i] = time.perf_counter() - started
+        conn.close()
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=client) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    latencies_ms = latencies * 1000
+    return {
+        "concurrency": concurrency,
+        "requests": len(bodies),
+        "errors": len(errors),
+        "requests_per_s": len(bodies) / elapsed,
+        "p50_ms": float(np.percentile(latencies_ms, 50)),
+        "p95_ms": float(np.percentile(latencies_ms, 95)),
+        "p99_ms": float(np.percentile(latencies_ms, 99)),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load test the diet risk scoring service.")
+    parser.add_argument("--host", default=SERVICE_HOST)
+    parser.add_argument("--port", type=int, default=SERVICE_PORT)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 2, 4, 8, 16, 32])
+    parser.add_argument("--requests", type=int, default=1000, help="requests per concurrency level")
+    parser.add_argument("--rows-per-request", type=int, default=1, help="patients in each request")
+    parser.add_argument("--data", default=INFER_PATH, help="raw patient CSV to replay")
+    parser.add_argument("--json", help="also write results to this JSON file")
+    args = parser.parse_args(argv)
+
+    bodies = request_bodies(args.data, args.rows_per_request, args.requests)
+    run_level(args.host, args.port, bodies[:min(50, len(bodies))], 1)  # warm-up
+
+    results = []
+    print(f"{'clients':>7} {'req/s':>10} {'rows/s':>10} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'errors':>7}")
+    for concurrency in args.concurrency:
+        r = run_level(args.host, args.port, bodies, concurrency)
+        r["rows_per_request"] = args.rows_per_request
+        results.append(r)
+        print(f"{concurrency:>7} {r['requests_per_s']:>10,.0f} {r['requests_per_s'] * args.rows_per_request:>10,.0f} "
+              f"{r['p50_ms']:>8.1f} {r['p95_ms']:>8.1f} {r['p99_ms']:>8.1f} {r['errors']:>7}")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
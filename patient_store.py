@@ -0,0 +1,359 @@
+"""Append-only store of scored patients.
+
+Patients are kept as immutable Parquet segments, one per ingested batch of
+lab reports, next to a small JSON manifest.  Every patient gets a row id
+from a counter that only grows; the manifest's ``next_id`` is the store's
+watermark.  Ingesting new reports validates and scores only those rows and
+appends them as a new segment, so a reader that has seen everything below
+a watermark catches up with ``read(since=watermark)`` alone.
+
+Scores are stored with a fingerprint of the model, feature pipeline and
+plan file that produced them.  After one of those changes,
+``rescore_stale`` rewrites the affected segments and bumps the store's
+``generation`` so readers know to reload from the start.
+
+    python patient_store.py ingest new_reports.csv
+    python patient_store.py info
+"""
+
+import argparse
+import fcntl
+import hashlib
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+
+from config import (
+    MODEL_PATH, FEATURE_PIPELINE_PATH, MODEL_MANIFEST_PATH, TRAIN_PATH, PLAN_TXT_PATH, PLAN_STORE_PATH,
+    INFERENCE_ENGINE, PATIENT_STORE_DIR, RISK_PLAN_CONDITIONS, PREDICTION_CACHE_PATH, PREDICTION_CACHE_MAX_ENTRIES,
+    HIGH_RISK_LABEL, LOW_RISK_LABEL
+)
+from aggregates import RiskAggregates
+from diet_matching import CONDITION_RULES, NO_CONDITION
+from features import RAW_COLUMNS
+from patient_table import downcast, read_patient_table
+from prediction_cache import artifact_fingerprint
+from scoring_jobs import validate_chunk
+
+STORE_VERSION = 1
+SCORE_COLUMNS = ["risk_label", "condition", "plan_id"]
+# Fixed categories, so segments written at different times concatenate as categoricals.
+RISK_CATEGORIES = [LOW_RISK_LABEL, HIGH_RISK_LABEL]
+CONDITION_CATEGORIES = [condition for condition, _, _ in CONDITION_RULES] + [NO_CONDITION]
+
+
+def scoring_fingerprint(model_path=MODEL_PATH, pipeline_path=FEATURE_PIPELINE_PATH, plan_txt_path=PLAN_TXT_PATH):
+    """Identifies everything a stored score depends on: the artifacts and the condition-matching rules."""
+    rules = json.dumps([CONDITION_RULES, RISK_PLAN_CONDITIONS], sort_keys=True)
+    digest = hashlib.sha256(artifact_fingerprint(model_path, pipeline_path, plan_txt_path).encode() + rules.encode())
+    return digest.hexdigest()[:32]
+
+
+def _timed_score(score_fn, raw):
+    started = time.perf_counter()
+    scored = raw.join(score_fn(raw))
+    return scored, round(time.perf_counter() - started, 6)
+
+
+class PatientStore:
+    def __init__(self, path=PATIENT_STORE_DIR):
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+        self.manifest = {"version": STORE_VERSION, "next_id": 0, "generation": 0, "segments": []}
+        self._manifest_key = None
+        self.refresh()
+
+    @property
+    def watermark(self):
+        """Row id the next ingested patient will get; every id below it is stored."""
+        return self.manifest["next_id"]
+
+    @property
+    def generation(self):
+        return self.manifest["generation"]
+
+    @property
+    def segments(self):
+        return self.manifest["segments"]
+
+    def refresh(self):
+        """Re-read the manifest if another process has written it; True when it changed."""
+        path = os.path.join(self.path, "manifest.json")
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return False
+        key = (stat.st_ino, stat.st_mtime_ns)
+        if key == self._manifest_key:
+            return False
+        with open(path) as f:
+            self.manifest = json.load(f)
+        self._manifest_key = key
+        return True
+
+    @contextmanager
+    def _locked(self, shared=False):
+        # Writers (the app, the CLI, other replicas) hold the lock file exclusively; readers share
+        # it, so a re-score never deletes a segment that is being read.
+        with open(os.path.join(self.path, ".lock"), "w") as lock:
+            fcntl.flock(lock, fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+            try:
+                self.refresh()
+                yield
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def _write_manifest(self, manifest):
+        path = os.path.join(self.path, "manifest.json")
+        with open(f"{path}.tmp", "w") as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(f"{path}.tmp", path)
+        self.manifest = manifest
+        stat = os.stat(path)
+        self._manifest_key = (stat.st_ino, stat.st_mtime_ns)
+
+    @staticmethod
+    def _segment_frame(scored, first_id):
+        segment = downcast(scored[RAW_COLUMNS + SCORE_COLUMNS].reset_index(drop=True)).astype({
+            "risk_label": pd.CategoricalDtype(RISK_CATEGORIES),
+            "condition": pd.CategoricalDtype(CONDITION_CATEGORIES),
+            "plan_id": "int16",
+        })
+        segment.index = pd.RangeIndex(first_id, first_id + len(segment), name="patient_id")
+        return segment
+
+    def _write_segment(self, scored, first_id, generation):
+        segment = self._segment_frame(scored, first_id)
+        name = f"segment-{first_id:012d}-g{generation}.parquet"
+        segment.to_parquet(os.path.join(self.path, f"{name}.tmp"))
+        os.replace(os.path.join(self.path, f"{name}.tmp"), os.path.join(self.path, name))
+        return name, segment
+
+    def append(self, scored, fingerprint, source=None, score_seconds=None):
+        """Append scored patients (raw lab columns plus ``SCORE_COLUMNS``) as one segment.
+
+        ``score_seconds``, how long scoring them took, is kept with the
+        segment for ``scoring_rate``.  Returns the stored rows indexed by
+        their new row ids.
+        """
+        missing = [col for col in RAW_COLUMNS + SCORE_COLUMNS if col not in scored.columns]
+        if missing:
+            raise ValueError(f"missing columns: {', '.join(missing)}")
+        with self._locked():
+            return self._append(scored, fingerprint, source, score_seconds)
+
+    def _append(self, scored, fingerprint, source, score_seconds=None):
+        first_id = self.watermark
+        if scored.empty:
+            return self._segment_frame(scored, first_id)
+        name, segment = self._write_segment(scored, first_id, self.generation)
+        entry = {"file": name, "first_id": first_id, "rows": len(segment), "fingerprint": fingerprint,
+                 "source": source, "ingested_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+                 "score_seconds": score_seconds}
+        self._write_manifest(dict(self.manifest, next_id=first_id + len(segment),
+                                  segments=self.segments + [entry]))
+        return segment
+
+    def ingest(self, raw, score_fn, fingerprint, source=None):
+        """Validate and score new lab reports, then append them.
+
+        ``score_fn(raw_df)`` returns ``SCORE_COLUMNS`` for the valid rows; only
+        these rows are scored.  Returns the stored rows and the number of
+        rejected rows (missing or non-numeric lab values).
+        """
+        raw, valid = validate_chunk(raw)
+        raw = raw[valid]
+        rejected = int((~valid).sum())
+        if raw.empty:
+            return self.read(since=self.watermark), rejected
+        scored, seconds = _timed_score(score_fn, raw)
+        return self.append(scored, fingerprint, source, seconds), rejected
+
+    def seed(self, load_fn, score_fn, fingerprint, source=None):
+        """Ingest ``load_fn()`` if the store is still empty (first start); True if it was."""
+        with self._locked():
+            if self.watermark:
+                return False
+            raw, valid = validate_chunk(load_fn())
+            raw = raw[valid]
+            scored, seconds = _timed_score(score_fn, raw)
+            self._append(scored, fingerprint, source, seconds)
+            return True
+
+    def read(self, since=0):
+        """Stored patients with row id ``>= since``, indexed by row id."""
+        with self._locked(shared=True):
+            return self._read(since)
+
+    def _read(self, since):
+        frames = []
+        for entry in self.segments:
+            if entry["first_id"] + entry["rows"] <= since:
+                continue
+            segment = pd.read_parquet(os.path.join(self.path, entry["file"]))
+            frames.append(segment[segment.index >= since] if entry["first_id"] < since else segment)
+        if not frames:
+            return self._segment_frame(pd.DataFrame(columns=RAW_COLUMNS + SCORE_COLUMNS), since)
+        return pd.concat(frames) if len(frames) > 1 else frames[0]
+
+    def scoring_rate(self):
+        """Patients scored per second for the latest timed segment, or None if none was timed."""
+        for entry in reversed(self.segments):
+            if entry.get("score_seconds"):
+                return entry["rows"] / entry["score_seconds"]
+        return None
+
+    def iter_segments(self, columns=None):
+        """Each stored segment in turn, read under the shared lock.
+
+        Segments keep their row range when they are re-scored, so one that
+        was replaced since the iteration started is read from its new file.
+        """
+        for first_id in [entry["first_id"] for entry in self.segments]:
+            with self._locked(shared=True):
+                entry = next(entry for entry in self.segments if entry["first_id"] == first_id)
+                segment = pd.read_parquet(os.path.join(self.path, entry["file"]), columns=columns)
+            yield segment
+
+    def rescore_stale(self, score_fn, fingerprint):
+        """Re-score segments written with another fingerprint; returns the number of rows re-scored."""
+        with self._locked():
+            stale = [entry for entry in self.segments if entry["fingerprint"] != fingerprint]
+            if not stale:
+                return 0
+            generation = self.generation + 1
+            segments = []
+            for entry in self.segments:
+                if entry["fingerprint"] == fingerprint:
+                    segments.append(entry)
+                    continue
+                raw = pd.read_parquet(os.path.join(self.path, entry["file"]), columns=RAW_COLUMNS)
+                scored, seconds = _timed_score(score_fn, raw)
+                name, _ = self._write_segment(scored, entry["first_id"], generation)
+                segments.append(dict(entry, file=name, fingerprint=fingerprint, score_seconds=seconds))
+            self._write_manifest(dict(self.manifest, generation=generation, segments=segments))
+            # No reader holds the lock, and readers re-read the manifest once they take it.
+            for entry in stale:
+                os.remove(os.path.join(self.path, entry["file"]))
+            return sum(entry["rows"] for entry in stale)
+
+
+class ScoredCohort:
+    """In-memory copy of a store's patients and their aggregates, kept current from the delta.
+
+    ``sync`` reads only the segments appended since the previous call and
+    adds them to the frame and to the ``RiskAggregates`` in place; the whole
+    store is re-read only after a re-score (new generation).  New rows are
+    copied into per-column buffers that double when full, and ``frame`` is
+    a read-only view of their filled part, so a sync costs time in
+    proportion to the new rows, not to the whole cohort.
+    """
+
+    def __init__(self, store):
+        self.store = store
+        self.frame = self._empty = store.read(since=store.watermark)  # empty, with the store's column types
+        self.aggregates = RiskAggregates()
+        self.watermark = 0
+        self.generation = store.generation
+        self._buffers = {}
+        self._lock = threading.Lock()
+
+    @property
+    def version(self):
+        return f"{self.store.path}:g{self.generation}:{self.watermark}"
+
+    def sync(self):
+        """Pull patients appended since the last sync; returns the number of new rows."""
+        with self._lock, self.store._locked(shared=True):
+            if self.store.generation != self.generation:
+                self.frame = self._empty
+                self.aggregates = RiskAggregates()
+                self.watermark = 0
+                self.generation = self.store.generation
+                self._buffers = {}
+            if self.store.watermark == self.watermark:
+                return 0
+            delta = self.store._read(self.watermark)
+            if delta.empty:
+                return 0
+            self._extend(delta)
+            self.aggregates.update(delta, self.version)
+            return len(delta)
+
+    def _extend(self, delta):
+        # Row ids are contiguous from 0, so the delta fills the buffers from the current watermark.
+        start, stop = self.watermark, self.watermark + len(delta)
+        columns = {}
+        for col, dtype in self._empty.dtypes.items():
+            categorical = isinstance(dtype, pd.CategoricalDtype)
+            # Parquet may hand categories back in another order; codes must follow the buffer's.
+            values = delta[col].array.set_categories(dtype.categories).codes if categorical else delta[col].to_numpy()
+            buffer = self._buffers.get(col)
+            if buffer is None or len(buffer) < stop:
+                grown = np.empty(max(stop, 2 * len(buffer) if buffer is not None else 0), dtype=values.dtype)
+                grown[:start] = buffer[:start] if buffer is not None else grown[:0]
+                self._buffers[col] = buffer = grown
+            buffer[start:stop] = values
+            view = buffer[:stop]
+            view.flags.writeable = False
+            columns[col] = pd.Categorical.from_codes(view, dtype=dtype, validate=False) if categorical else view
+        self.frame = pd.DataFrame(columns, index=pd.RangeIndex(stop, name="patient_id"), copy=False)
+        self.watermark = stop
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Ingest lab reports into the append-only patient store.")
+    parser.add_argument("--store", default=PATIENT_STORE_DIR)
+    commands = parser.add_subparsers(dest="command", required=True)
+    ingest = commands.add_parser("ingest", help="score new lab reports (CSV, Parquet or Feather) and append them")
+    ingest.add_argument("paths", nargs="+")
+    commands.add_parser("info", help="show the store's watermark and segments")
+    args = parser.parse_args(argv)
+
+    store = PatientStore(args.store)
+    if args.command == "info":
+        print(f"📦 {args.store}: {store.watermark:,} patients in {len(store.segments)} segments "
+              f"(generation {store.generation})")
+        for entry in store.segments:
+            first, last = entry["first_id"] + 1, entry["first_id"] + entry["rows"]
+            print(f"  #{first:,}–#{last:,}  {entry['ingested_at']}  {entry['source']}")
+        return
+
+    from diet_matching import DietMatcher
+    from fast_inference import InferenceEngine
+    from plan_store import load_plan_store
+    from prediction_cache import PredictionCache
+    from scoring import load_model, load_feature_pipeline, load_feature_columns, score_frame
+
+    model = InferenceEngine(load_model(MODEL_PATH), INFERENCE_ENGINE)
+    pipeline = load_feature_pipeline(FEATURE_PIPELINE_PATH)
+    feature_columns = load_feature_columns(MODEL_MANIFEST_PATH, TRAIN_PATH)
+    matcher = DietMatcher(load_plan_store(PLAN_TXT_PATH, PLAN_STORE_PATH))
+    cache = PredictionCache(PREDICTION_CACHE_PATH, PREDICTION_CACHE_MAX_ENTRIES)
+    model_fingerprint = artifact_fingerprint(MODEL_PATH, FEATURE_PIPELINE_PATH)
+
+    def score_fn(raw):
+        return score_frame(model, raw, pipeline, feature_columns, matcher, cache, model_fingerprint)
+
+    fingerprint = scoring_fingerprint()
+    rescored = store.rescore_stale(score_fn, fingerprint)
+    if rescored:
+        print(f"♻️  Re-scored {rescored:,} stored patients for the current model")
+    for path in args.paths:
+        started = time.perf_counter()
+        stored, rejected = store.ingest(read_patient_table(path, columns=RAW_COLUMNS), score_fn, fingerprint,
+                                        source=os.path.basename(path))
+        note = f", {rejected:,} rejected (missing or non-numeric values)" if rejected else ""
+        # Numbered from 1, as the app shows them.
+        ids = f"#{stored.index[0] + 1:,}–#{stored.index[-1] + 1:,}" if len(stored) else "no rows"
+        print(f"✅ {path}: {len(stored):,} patients stored as {ids}{note} "
+              f"in {time.perf_counter() - started:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
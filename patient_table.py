@@ -0,0 +1,127 @@
+"""Typed columnar storage for patient tables.
+
+Patient extracts can be kept as Parquet or Feather (Arrow IPC) files with
+compact column types instead of CSV text.  ``read_patient_table`` reads only
+the requested columns and pushes risk-label and age/BMI range filters down
+to the Arrow reader, so filtered rows are never materialised.  CSV input is
+still accepted and filtered after parsing.
+
+Tables shown in the app are paged on the server: ``sort_positions`` orders
+the rows once per data version and ``page_positions`` picks the rows of
+one page out of that order, so only a page of rows is ever rendered.
+
+    python patient_table.py diet_app/final_unique_range_valid_medical_data.csv patients.parquet
+"""
+
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+from features import RAW_COLUMNS
+
+INT8_COLUMNS = ["tumor_grade", "lymph_nodes", "stage"]
+FLOAT32_COLUMNS = [col for col in RAW_COLUMNS if col not in INT8_COLUMNS]
+COLUMNAR_FORMATS = {".parquet": "parquet", ".feather": "feather", ".arrow": "feather"}
+
+
+def table_format(path):
+    return COLUMNAR_FORMATS.get(os.path.splitext(path)[1].lower(), "csv")
+
+
+def downcast(df):
+    """float32 lab values, int8 grades/counts, categorical risk labels."""
+    types = {col: np.float32 for col in FLOAT32_COLUMNS if col in df.columns}
+    types.update({col: np.int8 for col in INT8_COLUMNS if col in df.columns})
+    if "risk_label" in df.columns:
+        types["risk_label"] = "category"
+    return df.astype(types)
+
+
+def write_patient_table(df, path):
+    fmt = table_format(path)
+    compact = downcast(df)
+    if fmt == "parquet":
+        compact.to_parquet(path, index=False)
+    elif fmt == "feather":
+        compact.reset_index(drop=True).to_feather(path)
+    else:
+        compact.to_csv(path, index=False)
+    return path
+
+
+def filter_mask(df, risk_labels=None, age_range=None, bmi_range=None, conditions=None):
+    mask = np.ones(len(df), dtype=bool)
+    if risk_labels is not None:
+        mask &= df["risk_label"].isin(risk_labels).to_numpy()
+    if conditions is not None:
+        mask &= df["condition"].isin(conditions).to_numpy()
+    for col, bounds in (("age", age_range), ("bmi", bmi_range)):
+        if bounds is not None:
+            values = df[col].to_numpy()
+            mask &= (values >= bounds[0]) & (values <= bounds[1])
+    return mask
+
+
+def sort_positions(values, descending=False):
+    """Row positions of ``values`` (a Series) in sorted order; categories sort by their text."""
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        ranks = np.argsort(np.argsort(values.cat.categories.astype(str)))
+        keys = ranks[values.cat.codes.to_numpy()]
+    else:
+        keys = values.to_numpy()
+    order = np.argsort(keys, kind="stable")
+    return order[::-1] if descending else order
+
+
+def page_positions(order, mask, page, page_size):
+    """Positions on ``page`` (1-based) of the rows selected by ``mask``, kept in ``order``.
+
+    Returns the positions, the number of selected rows and the number of pages.
+    """
+    selected = order if mask is None else order[mask[order]]
+    pages = max(1, -(-len(selected) // page_size))
+    page = min(max(1, page), pages)
+    return selected[(page - 1) * page_size:page * page_size], len(selected), pages
+
+
+def _arrow_filter(risk_labels, age_range, bmi_range):
+    import pyarrow.dataset as ds
+    expr = None
+    terms = []
+    if risk_labels is not None:
+        terms.append(ds.field("risk_label").isin(list(risk_labels)))
+    for col, bounds in (("age", age_range), ("bmi", bmi_range)):
+        if bounds is not None:
+            terms.append((ds.field(col) >= bounds[0]) & (ds.field(col) <= bounds[1]))
+    for term in terms:
+        expr = term if expr is None else expr & term
+    return expr
+
+
+def read_patient_table(path, columns=None, risk_labels=None, age_range=None, bmi_range=None):
+    """Load a patient table, reading only ``columns`` and rows matching the filters."""
+    fmt = table_format(path)
+    if fmt == "csv":
+        filter_columns = [col for col, active in (("risk_label", risk_labels), ("age", age_range),
+                                                  ("bmi", bmi_range)) if active is not None]
+        usecols = None if columns is None else list(dict.fromkeys(list(columns) + filter_columns))
+        df = pd.read_csv(path, usecols=usecols)
+        if filter_columns:
+            df = df[filter_mask(df, risk_labels, age_range, bmi_range)].reset_index(drop=True)
+        return df if columns is None else df[list(columns)]
+
+    import pyarrow.dataset as ds
+    dataset = ds.dataset(path, format="ipc" if fmt == "feather" else "parquet")
+    table = dataset.to_table(columns=None if columns is None else list(columns),
+                             filter=_arrow_filter(risk_labels, age_range, bmi_range))
+    return table.to_pandas()
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3:
+        sys.exit("usage: python patient_table.py <input.csv|.parquet|.feather> <output.parquet|.feather>")
+    src, dst = sys.argv[1:]
+    write_patient_table(read_patient_table(src), dst)
+    print(f"✅ {src} ({os.path.getsize(src) / 1e6:.1f} MB) -> {dst} ({os.path.getsize(dst) / 1e6:.1f} MB)")
@@ -0,0 +1,290 @@
+"""Compact, memory-mapped store for the rule based diet plans.
+
+``RuleBased_Diet_Plans.txt`` is a long sequence of ``Patient:`` /
+``Medical Condition:`` / ``Day N:`` blocks that reuse a handful of meal
+lines, days and whole plans.  ``compile_plan_store`` turns it into a binary
+file in a single streaming pass, interning every string and hashing
+identical day schedules and identical plans into shared templates, so each
+patient record is just a name, a condition and a template id.
+``PlanStore`` reads templates back straight from the mapped file and
+decodes each one once, however many patients share it.
+
+Layout (all integers little-endian uint32)::
+
+    header
+    string offsets[n_strings + 1] + utf-8 blob      deduplicated strings
+    day index[n_days] + day records                 (label, n_meals, (meal, text)*)
+    template index[n_templates] + template records  (n_days, day id*)
+    patients[n_patients]                            (name, condition, template id)
+    condition table[n_conditions] (id, start, count) slices of the member list
+    condition members[n_patients]                    patient ids grouped by condition
+"""
+
+import mmap
+import os
+import re
+import struct
+import sys
+import tempfile
+from array import array
+
+import numpy as np
+
+# ================= FORMAT =================
+MAGIC = b"DPLS"
+VERSION = 2
+HEADER = struct.Struct("<4sHH11I")
+SEPARATOR = re.compile(r"^-{3,}$")
+DAY_LINE = re.compile(r"^(Day \d+):$")
+
+
+def _u32(values):
+    buf = array("I", values)
+    if sys.byteorder != "little":
+        buf.byteswap()
+    return buf.tobytes()
+
+
+# ================= COMPILER =================
+def _records(items):
+    """Index (absolute offsets filled in later) and flat records of variable-length items."""
+    starts, records = array("I"), array("I")
+    for item in items:
+        starts.append(len(records))
+        records.extend(item)
+    return starts, records
+
+
+def compile_plan_store(txt_path, store_path):
+    strings = {}
+    days = {}        # (label, meal, text, ...) -> day id
+    templates = {}   # (day id, ...) -> template id
+    patients = array("I")
+    by_condition = {}
+
+    def intern(table, key):
+        value = table.get(key)
+        if value is None:
+            value = table[key] = len(table)
+        return value
+
+    patient = None
+
+    def flush():
+        if patient is None:
+            return
+        name, condition, plan_days = patient
+        if condition is None or not plan_days:
+            raise ValueError(f"{txt_path}: incomplete plan for patient {name!r}")
+        day_ids = tuple(intern(days, tuple(day)) for day in plan_days)
+        by_condition.setdefault(condition, []).append(len(patients) // 3)
+        patients.extend((intern(strings, name), intern(strings, condition), intern(templates, day_ids)))
+
+    with open(txt_path, encoding="utf-8") as f:
+        for lineno, raw in enumerate(f, 1):
+            line = raw.strip()
+            if not line:
+                continue
+            if SEPARATOR.match(line):
+                flush()
+                patient = None
+                continue
+            if line.startswith("Patient:"):
+                flush()
+                patient = (line[len("Patient:"):].strip(), None, [])
+                continue
+            if patient is None:
+                raise ValueError(f"{txt_path}:{lineno}: expected 'Patient:' line, got {line!r}")
+            if line.startswith("Medical Condition:"):
+                patient = (patient[0], line[len("Medical Condition:"):].strip(), patient[2])
+                continue
+            day = DAY_LINE.match(line)
+            if day:
+                patient[2].append([intern(strings, day.group(1))])
+                continue
+            label, sep, text = line.partition(":")
+            if not sep or not patient[2]:
+                raise ValueError(f"{txt_path}:{lineno}: unexpected line {line!r}")
+            patient[2][-1].extend((intern(strings, label.strip()), intern(strings, text.strip())))
+        flush()
+
+    encoded = [s.encode("utf-8") for s in strings]
+    string_offsets = [0]
+    for blob in encoded:
+        string_offsets.append(string_offsets[-1] + len(blob))
+    string_section = _u32(string_offsets) + b"".join(encoded)
+    string_section += b"\0" * (-len(string_section) % 4)
+
+    day_starts, day_records = _records((day[0], (len(day) - 1) // 2, *day[1:]) for day in days)
+    template_starts, template_records = _records((len(day_ids), *day_ids) for day_ids in templates)
+
+    n_patients = len(patients) // 3
+    string_off = HEADER.size
+    day_index_off = string_off + len(string_section)
+    day_records_off = day_index_off + 4 * len(days)
+    template_index_off = day_records_off + 4 * len(day_records)
+    template_records_off = template_index_off + 4 * len(templates)
+    patients_off = template_records_off + 4 * len(template_records)
+    table_off = patients_off + 4 * len(patients)
+    members_off = table_off + 12 * len(by_condition)
+
+    table, members = [], []
+    for condition, ids in by_condition.items():
+        table.extend((strings[condition], len(members), len(ids)))
+        members.extend(ids)
+
+    header = HEADER.pack(MAGIC, VERSION, 0, len(strings), n_patients, len(by_condition), len(days), len(templates),
+                         string_off, day_index_off, template_index_off, patients_off, table_off, members_off)
+
+    directory = os.path.dirname(os.path.abspath(store_path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as out:
+            out.write(header)
+            out.write(string_section)
+            out.write(_u32(day_records_off + 4 * o for o in day_starts))
+            out.write(_u32(day_records))
+            out.write(_u32(template_records_off + 4 * o for o in template_starts))
+            out.write(_u32(template_records))
+            out.write(_u32(patients))
+            out.write(_u32(table))
+            out.write(_u32(members))
+        os.replace(tmp_path, store_path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+    return store_path
+
+
+# ================= READER =================
+class PlanStore:
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as f:
+            self._buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        (magic, version, _, n_strings, n_patients, n_conditions, n_days, n_templates, string_off,
+         day_index_off, template_index_off, patients_off, table_off, members_off) = HEADER.unpack_from(self._buf, 0)
+        if magic != MAGIC or version != VERSION:
+            self._buf.close()
+            raise ValueError(f"{path} is not a version {VERSION} plan store")
+
+        self._string_offsets = np.frombuffer(self._buf, dtype="<u4", count=n_strings + 1, offset=string_off)
+        self._blob_off = string_off + 4 * (n_strings + 1)
+        self._day_index = np.frombuffer(self._buf, dtype="<u4", count=n_days, offset=day_index_off)
+        self._template_index = np.frombuffer(self._buf, dtype="<u4", count=n_templates, offset=template_index_off)
+        self._patients = np.frombuffer(self._buf, dtype="<u4", count=3 * n_patients,
+                                       offset=patients_off).reshape(-1, 3)
+        self._members = np.frombuffer(self._buf, dtype="<u4", count=n_patients, offset=members_off)
+        self._strings = {}
+        self._days = {}
+        self._templates = {}
+        table = np.frombuffer(self._buf, dtype="<u4", count=3 * n_conditions, offset=table_off).reshape(-1, 3)
+        self._conditions = {self.string(int(sid)): (int(start), int(count)) for sid, start, count in table}
+
+    def __len__(self):
+        return len(self._patients)
+
+    @property
+    def n_templates(self):
+        return len(self._template_index)
+
+    @property
+    def n_days(self):
+        return len(self._day_index)
+
+    @property
+    def template_ids(self):
+        """Template id of every patient.
+
+        A copy: views into the mapped file would make ``close`` fail for as long as a caller holds one.
+        """
+        return self._patients[:, 2].copy()
+
+    def string(self, sid):
+        text = self._strings.get(sid)
+        if text is None:
+            start = self._blob_off + int(self._string_offsets[sid])
+            end = self._blob_off + int(self._string_offsets[sid + 1])
+            text = self._strings[sid] = self._buf[start:end].decode("utf-8")
+        return text
+
+    def _day(self, did):
+        day = self._days.get(did)
+        if day is None:
+            pos = int(self._day_index[did])
+            label, n_meals = struct.unpack_from("<2I", self._buf, pos)
+            pairs = struct.unpack_from(f"<{2 * n_meals}I", self._buf, pos + 8)
+            meals = {self.string(pairs[i]): self.string(pairs[i + 1]) for i in range(0, len(pairs), 2)}
+            day = self._days[did] = (self.string(label), meals)
+        return day
+
+    def template(self, tid):
+        """Plan of template ``tid``: decoded once and shared by every caller, so treat it as read-only."""
+        plan = self._templates.get(tid)
+        if plan is None:
+            pos = int(self._template_index[tid])
+            (n_days,) = struct.unpack_from("<I", self._buf, pos)
+            plan = self._templates[tid] = dict(
+                self._day(did) for did in struct.unpack_from(f"<{n_days}I", self._buf, pos + 4)
+            )
+        return plan
+
+    @property
+    def conditions(self):
+        return list(self._conditions)
+
+    def patients_for_condition(self, condition):
+        start, count = self._conditions.get(condition, (0, 0))
+        return self._members[start:start + count].copy()
+
+    def template_id(self, pid):
+        return int(self._patients[pid, 2])
+
+    def patient(self, pid):
+        name, condition, tid = (int(v) for v in self._patients[pid])
+        return {"name": self.string(name), "condition": self.string(condition), "plan": self.template(tid)}
+
+    def plan(self, pid):
+        return self.template(self.template_id(pid))
+
+    def condition_template(self, condition):
+        """Template id of the first plan written for ``condition``."""
+        members = self.patients_for_condition(condition)
+        if len(members) == 0:
+            raise KeyError(f"no diet plans for condition {condition!r}")
+        return self.template_id(int(members[0]))
+
+    def condition_plan(self, condition):
+        return self.template(self.condition_template(condition))
+
+    def close(self):
+        self._string_offsets = self._day_index = self._template_index = self._patients = self._members = None
+        self._buf.close()
+
+
+def load_plan_store(txt_path, store_path):
+    """Open the compiled store, rebuilding it first if the text is newer."""
+    if not os.path.exists(store_path) or os.path.getmtime(store_path) < os.path.getmtime(txt_path):
+        compile_plan_store(txt_path, store_path)
+    try:
+        return PlanStore(store_path)
+    except ValueError:
+        # Compiled by an older version of this module.
+        return PlanStore(compile_plan_store(txt_path, store_path))
+
+
+def ensure_compiled(txt_path, store_path):
+    """Compile the store if it is missing or stale; call before forking workers that open it.
+
+    The workers then only map the finished file instead of racing each other to rebuild it.
+    """
+    load_plan_store(txt_path, store_path).close()
+    return store_path
+
+
+if __name__ == "__main__":
+    src = sys.argv[1] if len(sys.argv) > 1 else "diets/RuleBased_Diet_Plans.txt"
+    dst = sys.argv[2] if len(sys.argv) > 2 else os.path.splitext(src)[0] + ".planstore"
+    store = PlanStore(compile_plan_store(src, dst))
+    print(f"✅ {len(store):,} plans ({store.n_templates} distinct, {store.n_days} distinct days), "
+          f"{len(store.conditions)} conditions -> {dst} ({os.path.getsize(dst) / 1024:.0f} KiB)")
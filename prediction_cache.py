@@ -0,0 +1,149 @@
+"""Persistent per-row prediction cache.
+
+Each patient row is keyed by a 64-bit hash of its raw lab values together
+with a fingerprint of the model and feature pipeline files, so re-scoring a
+mostly unchanged upload only runs the model on new or modified rows.  The
+values are hashed in the compact types the patient store keeps them in
+(float32 lab values, int8 grades), so a row parsed from CSV and the same
+row read back from the store or the shared artifacts share one entry.
+Entries live in a small SQLite file and the least recently used ones are
+evicted once the cache grows past ``max_entries``.
+"""
+
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+
+from features import RAW_COLUMNS
+from patient_table import downcast
+
+_fingerprints = {}
+
+
+def artifact_fingerprint(*paths):
+    """Content hash of the given files, recomputed only when one changes on disk."""
+    digest = hashlib.sha256()
+    for path in paths:
+        stat = os.stat(path)
+        key = (os.path.abspath(path), stat.st_size, stat.st_mtime_ns)
+        if key not in _fingerprints:
+            with open(path, "rb") as f:
+                _fingerprints[key] = hashlib.file_digest(f, "sha256").hexdigest()
+        digest.update(_fingerprints[key].encode())
+    return digest.hexdigest()[:32]
+
+
+def row_hashes(df, columns=RAW_COLUMNS):
+    return pd.util.hash_pandas_object(downcast(df[columns]), index=False).to_numpy(dtype=np.uint64)
+
+
+class PredictionCache:
+    def __init__(self, path, max_entries=1_000_000):
+        self.path = path
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._last = (None, None)
+        # Content version of the most recent batch: changes whenever any row or the model does.
+        self.last_version = None
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.executescript("""
+            PRAGMA journal_mode=WAL;
+            PRAGMA synchronous=NORMAL;
+            CREATE TABLE IF NOT EXISTS predictions (
+                model TEXT NOT NULL,
+                row_hash INTEGER NOT NULL,
+                pred INTEGER NOT NULL,
+                used REAL NOT NULL,
+                PRIMARY KEY (model, row_hash)
+            ) WITHOUT ROWID;
+            CREATE INDEX IF NOT EXISTS predictions_used ON predictions (used);
+        """)
+
+    def predict(self, df, fingerprint, score_fn):
+        """Predictions for every row of ``df``; ``score_fn`` only sees rows not in the cache."""
+        hashes = row_hashes(df)
+        batch_key = hashlib.sha1(fingerprint.encode() + hashes.tobytes()).digest()
+        # Scoring-queue and service threads share the cache: counters and the last batch change under the lock.
+        with self._lock:
+            self.last_version = batch_key.hex()
+            last_key, last_preds = self._last
+            if batch_key == last_key:
+                self.hits += len(hashes)
+                return last_preds.copy()
+
+        unique, first_rows, inverse = np.unique(hashes, return_index=True, return_inverse=True)
+        preds = self._lookup(fingerprint, unique)
+        missing = preds < 0
+        n_missing = int(missing.sum())
+        if n_missing:
+            rows = df.iloc[first_rows[missing]]
+            preds[missing] = np.asarray(score_fn(rows), dtype=np.int64)
+            self._store(fingerprint, unique[missing], preds[missing])
+
+        result = preds[inverse]
+        with self._lock:
+            self.hits += len(hashes) - n_missing
+            self.misses += n_missing
+            self._last = (batch_key, result.copy())
+        return result
+
+    @contextmanager
+    def _transaction(self):
+        # Autocommit connection: an explicit transaction, rolled back on any error so the next BEGIN works.
+        self._db.execute("BEGIN")
+        try:
+            yield self._db
+        except BaseException:
+            self._db.execute("ROLLBACK")
+            raise
+        self._db.execute("COMMIT")
+
+    def _lookup(self, fingerprint, hashes):
+        # hashes: sorted, unique uint64 (SQLite stores them as signed 64-bit)
+        preds = np.full(len(hashes), -1, dtype=np.int64)
+        if len(hashes) == 0:
+            return preds
+        keys = hashes.view(np.int64)
+        with self._lock, self._transaction() as db:
+            db.execute("CREATE TEMP TABLE IF NOT EXISTS lookup (h INTEGER PRIMARY KEY)")
+            db.execute("DELETE FROM lookup")
+            db.executemany("INSERT INTO lookup VALUES (?)", ((int(k),) for k in keys))
+            found = db.execute(
+                "SELECT p.row_hash, p.pred FROM lookup l JOIN predictions p "
+                "ON p.model = ? AND p.row_hash = l.h", (fingerprint,)).fetchall()
+            db.execute(
+                "UPDATE predictions SET used = ? WHERE model = ? AND row_hash IN (SELECT h FROM lookup)",
+                (time.time(), fingerprint))
+        if found:
+            found = np.array(found, dtype=np.int64)
+            preds[np.searchsorted(hashes, found[:, 0].view(np.uint64))] = found[:, 1]
+        return preds
+
+    def _store(self, fingerprint, hashes, preds):
+        now = time.time()
+        with self._lock, self._transaction() as db:
+            db.executemany(
+                "INSERT OR REPLACE INTO predictions VALUES (?, ?, ?, ?)",
+                ((fingerprint, int(h), int(p), now) for h, p in zip(hashes.view(np.int64), preds)))
+            excess = db.execute("SELECT COUNT(*) FROM predictions").fetchone()[0] - self.max_entries
+            if excess > 0:
+                db.execute(
+                    "DELETE FROM predictions WHERE (model, row_hash) IN "
+                    "(SELECT model, row_hash FROM predictions ORDER BY used LIMIT ?)", (excess,))
+
+    @property
+    def hit_rate(self):
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def close(self):
+        self._db.close()
@@ -0,0 +1,171 @@
+"""Headless batch scoring for large patient exports.
+
+Reads raw patient lab data (CSV or Parquet) in bounded-memory chunks, scores
+each chunk with the LightGBM model in a process pool and writes the risk
+label, diet key and condition-matched plan for every row.
+
+    python score_batch.py patients.csv scored.parquet --chunksize 200000 --workers 8
+"""
+
+import argparse
+import os
+import resource
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+
+import pandas as pd
+
+from config import MODEL_PATH, FEATURE_PIPELINE_PATH, INFERENCE_ENGINE, PLAN_TXT_PATH, PLAN_STORE_PATH
+from diet_matching import DietMatcher
+from fast_inference import ENGINES, InferenceEngine
+from plan_store import ensure_compiled, load_plan_store
+from scoring import load_model, load_feature_pipeline, predict_classes, scored_frame
+
+# ================= WORKER =================
+_model = None
+_pipeline = None
+_matcher = None
+
+
+def _init_worker(model_path, pipeline_path, engine):
+    global _model, _pipeline, _matcher
+    _model = InferenceEngine(load_model(model_path), engine)
+    _pipeline = load_feature_pipeline(pipeline_path)
+    _matcher = DietMatcher(load_plan_store(PLAN_TXT_PATH, PLAN_STORE_PATH))
+
+
+def _score_chunk(chunk_no, first_row, chunk, passthrough):
+    preds = predict_classes(_model, _pipeline, chunk, num_threads=1)
+    out = scored_frame(preds, index=chunk.index).join(_matcher.match(chunk, preds))
+    out.insert(0, "row_number", range(first_row, first_row + len(chunk)))
+    for col in reversed(passthrough):
+        out.insert(1, col, chunk[col].to_numpy())
+    return chunk_no, out
+
+
+# ================= INPUT / OUTPUT =================
+def iter_chunks(path, chunksize):
+    if path.endswith(".parquet"):
+        import pyarrow.parquet as pq
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunksize):
+            yield batch.to_pandas()
+    else:
+        yield from pd.read_csv(path, chunksize=chunksize)
+
+
+def input_columns(path):
+    """Column names from the CSV header or Parquet schema, without reading any rows."""
+    if path.endswith(".parquet"):
+        import pyarrow.parquet as pq
+        return pq.read_schema(path).names
+    return pd.read_csv(path, nrows=0).columns.tolist()
+
+
+class ChunkWriter:
+    def __init__(self, path, fmt):
+        self.path = path
+        self.fmt = fmt
+        self._parquet = None
+        self._wrote_header = False
+
+    def write(self, df):
+        if self.fmt == "parquet":
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+            table = pa.Table.from_pandas(df, preserve_index=False)
+            if self._parquet is None:
+                self._parquet = pq.ParquetWriter(self.path, table.schema)
+            self._parquet.write_table(table)
+        else:
+            df.to_csv(self.path, mode="a" if self._wrote_header else "w",
+                      header=not self._wrote_header, index=False)
+            self._wrote_header = True
+
+    def close(self):
+        if self._parquet is not None:
+            self._parquet.close()
+        elif not self._wrote_header:
+            pd.DataFrame(columns=["row_number", "risk_label", "diet_key", "condition", "plan_id"]).to_csv(self.path, index=False)
+
+
+def peak_rss_mb():
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    scale = 1 if sys.platform == "darwin" else 1024
+    self_peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale / 1e6
+    child_peak = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss * scale / 1e6
+    return self_peak, child_peak
+
+
+# ================= MAIN =================
+def run(input_path, output_path, fmt, chunksize, workers, passthrough,
+        model_path=MODEL_PATH, pipeline_path=FEATURE_PIPELINE_PATH, engine=INFERENCE_ENGINE):
+    # Checked before any worker loads the model or the output file is created.
+    columns = input_columns(input_path)
+    missing = [col for col in passthrough if col not in columns]
+    if missing:
+        raise ValueError(f"Passthrough columns not in input: {missing}")
+
+    writer = ChunkWriter(output_path, fmt)
+    pending, ready = set(), {}
+    next_to_write = 0
+    total_rows = 0
+    started = time.perf_counter()
+
+    def drain(block):
+        nonlocal next_to_write
+        done, _ = wait(pending, return_when=FIRST_COMPLETED) if block else (
+            {f for f in pending if f.done()}, None)
+        for future in done:
+            pending.discard(future)
+            chunk_no, scored = future.result()
+            ready[chunk_no] = scored
+        while next_to_write in ready:
+            writer.write(ready.pop(next_to_write))
+            next_to_write += 1
+
+    ensure_compiled(PLAN_TXT_PATH, PLAN_STORE_PATH)
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(model_path, pipeline_path, engine)) as pool:
+        for chunk_no, chunk in enumerate(iter_chunks(input_path, chunksize)):
+            # Bound memory: never hold more than two chunks per worker in flight.
+            while len(pending) + len(ready) >= 2 * workers:
+                drain(block=True)
+            pending.add(pool.submit(_score_chunk, chunk_no, total_rows, chunk, passthrough))
+            total_rows += len(chunk)
+            drain(block=False)
+        while pending:
+            drain(block=True)
+    writer.close()
+
+    elapsed = time.perf_counter() - started
+    return total_rows, elapsed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Score patient lab data with the diet risk model.")
+    parser.add_argument("input", help="raw patient CSV or Parquet file")
+    parser.add_argument("output", help="destination file for risk labels and diet keys")
+    parser.add_argument("--format", choices=["csv", "parquet"],
+                        help="output format (default: from the output file extension)")
+    parser.add_argument("--chunksize", type=int, default=100_000, help="rows per chunk (default: 100000)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="scoring processes")
+    parser.add_argument("--passthrough", nargs="*", default=[], metavar="COLUMN",
+                        help="input columns copied to the output, e.g. a patient id")
+    parser.add_argument("--model", default=MODEL_PATH)
+    parser.add_argument("--feature-pipeline", default=FEATURE_PIPELINE_PATH)
+    parser.add_argument("--engine", choices=ENGINES, default=INFERENCE_ENGINE, help="model scoring path")
+    args = parser.parse_args(argv)
+
+    fmt = args.format or ("parquet" if args.output.endswith(".parquet") else "csv")
+    workers = max(1, args.workers)
+    rows, elapsed = run(args.input, args.output, fmt, args.chunksize, workers,
+                        args.passthrough, args.model, args.feature_pipeline, args.engine)
+    self_peak, child_peak = peak_rss_mb()
+    print(f"✅ Scored {rows:,} rows -> {args.output}")
+    print(f"⏱️  {elapsed:.2f}s  ({rows / elapsed if elapsed else 0:,.0f} rows/s, {workers} workers)")
+    print(f"💾 Peak RSS: {self_peak:,.0f} MB main, {child_peak:,.0f} MB largest worker")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""Model loading and risk scoring shared by the app and the batch tools."""
+
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from config import (
+    MODEL_PATH, FEATURE_PIPELINE_PATH, MODEL_MANIFEST_PATH, TRAIN_PATH,
+    LEAKAGE_COLUMNS, TARGET_COLUMN, HIGH_RISK_LABEL, LOW_RISK_LABEL
+)
+from features import FeaturePipeline
+
+
+def feature_columns_from(columns):
+    """Model inputs are the training columns minus the target and leakage columns."""
+    excluded = set(LEAKAGE_COLUMNS + [TARGET_COLUMN])
+    return [col for col in columns if col not in excluded]
+
+
+def load_model(model_path=MODEL_PATH):
+    import joblib  # pulls in lightgbm; deferred until a prediction actually needs it
+    return joblib.load(model_path)
+
+
+def write_model_manifest(model_path=MODEL_PATH, manifest_path=MODEL_MANIFEST_PATH):
+    """Record the model's input schema so startup never has to read the training CSV."""
+    model = load_model(model_path)
+    manifest = {
+        "model": os.path.basename(model_path),
+        "model_type": type(model).__name__,
+        "model_bytes": os.path.getsize(model_path),
+        "feature_columns": list(model.feature_name_),
+        "classes": [int(c) for c in model.classes_],
+    }
+    with open(manifest_path, "w") as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+def load_feature_columns(manifest_path=MODEL_MANIFEST_PATH, train_path=TRAIN_PATH):
+    if os.path.exists(manifest_path):
+        with open(manifest_path) as f:
+            return json.load(f)["feature_columns"]
+    return feature_columns_from(pd.read_csv(train_path, nrows=0).columns)
+
+
+def load_feature_pipeline(pipeline_path=FEATURE_PIPELINE_PATH):
+    return FeaturePipeline.from_json(pipeline_path)
+
+
+def predict_classes(model, feature_pipeline, raw_df, feature_columns=None, **predict_kwargs):
+    X = feature_pipeline.transform(raw_df, feature_columns)
+    return model.predict(X, **predict_kwargs)
+
+
+# Class predictions are used directly as category codes: one byte per row instead of a string.
+def risk_labels(preds):
+    return pd.Categorical.from_codes(np.asarray(preds, dtype=np.int8), categories=[LOW_RISK_LABEL, HIGH_RISK_LABEL])
+
+
+def diet_keys(preds):
+    return pd.Categorical.from_codes(np.asarray(preds, dtype=np.int8), categories=["low_risk", "high_risk"])
+
+
+def scored_frame(preds, index=None):
+    return pd.DataFrame({"risk_label": risk_labels(preds), "diet_key": diet_keys(preds)}, index=index)
+
+
+def score_frame(engine, rows, feature_pipeline, feature_columns, diet_matcher, cache=None, fingerprint=None):
+    """Risk label, condition and plan id for the raw patient ``rows``.
+
+    With a ``PredictionCache`` (and the ``fingerprint`` of the model and
+    pipeline) only rows it has not seen before reach the model.
+    """
+    def predict(raw):
+        return predict_classes(engine, feature_pipeline, raw, feature_columns)
+
+    preds = predict(rows) if cache is None else cache.predict(rows, fingerprint, predict)
+    return pd.DataFrame({"risk_label": risk_labels(preds)}, index=rows.index).join(diet_matcher.match(rows, preds))
+
+
+if __name__ == "__main__":
+    manifest = write_model_manifest()
+    print(f"✅ Wrote {MODEL_MANIFEST_PATH} ({len(manifest['feature_columns'])} features)")
@@ -0,0 +1,137 @@
+"""Background scoring of uploaded patient files.
+
+``ScoringQueue`` validates and scores uploads in a small thread pool that is
+shared by every session of the app, so the Streamlit script thread only
+submits jobs and polls their status.  Each job scores one chunk per task
+and then queues its next chunk behind everybody else's, so a single large
+upload cannot hold the workers while other files wait.  Scored chunks are
+kept on the job as they finish and can be shown before the file is done.
+"""
+
+import io
+import itertools
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+from features import RAW_COLUMNS
+
+QUEUED, RUNNING, DONE, FAILED = "queued", "running", "done", "failed"
+
+
+class ScoringJob:
+    def __init__(self, job_id, name, data, chunk_rows):
+        self.id = job_id
+        self.name = name
+        self.status = QUEUED
+        self.error = None
+        self.rows_scored = 0
+        self.rows_rejected = 0
+        self.chunks = []
+        self._results = (0, pd.DataFrame())
+        self.total_bytes = len(data)
+        self.bytes_read = 0
+        self.submitted = time.time()
+        self.finished = None
+        self._buffer = io.BytesIO(data)
+        self._reader = None
+        self._chunk_rows = chunk_rows
+
+    @property
+    def active(self):
+        return self.status in (QUEUED, RUNNING)
+
+    @property
+    def progress(self):
+        if self.status == DONE:
+            return 1.0
+        return self.bytes_read / self.total_bytes if self.total_bytes else 0.0
+
+    def results(self):
+        """All rows scored so far, in file order.
+
+        The chunks are concatenated again only once another one has been
+        scored, so polling a job does not copy its rows every time.
+        """
+        n_chunks, results = self._results
+        if n_chunks != len(self.chunks):
+            chunks = self.chunks[:]
+            results = pd.concat(chunks, ignore_index=True) if chunks else pd.DataFrame()
+            self._results = (len(chunks), results)
+        return results
+
+
+def validate_chunk(chunk):
+    """Numeric copy of the raw lab columns and a mask of rows with usable values."""
+    raw = chunk[RAW_COLUMNS].apply(pd.to_numeric, errors="coerce")
+    return raw, raw.notna().all(axis=1).to_numpy()
+
+
+class ScoringQueue:
+    def __init__(self, score_fn, workers=2, chunk_rows=5_000, max_finished_jobs=50):
+        """``score_fn(raw_df)`` returns the columns to add to each valid chunk."""
+        self.score_fn = score_fn
+        self.chunk_rows = chunk_rows
+        self.max_finished_jobs = max_finished_jobs
+        self._jobs = {}
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="scoring")
+
+    def submit(self, name, data):
+        """Queue the CSV bytes ``data`` for scoring and return the job id."""
+        with self._lock:
+            job = ScoringJob(next(self._ids), name, data, self.chunk_rows)
+            self._jobs[job.id] = job
+            self._evict_finished()
+        self._pool.submit(self._run_chunk, job)
+        return job.id
+
+    def job(self, job_id):
+        return self._jobs.get(job_id)
+
+    def jobs(self, job_ids):
+        return [job for job in map(self._jobs.get, job_ids) if job is not None]
+
+    def _evict_finished(self):
+        finished = sorted((job for job in self._jobs.values() if not job.active), key=lambda job: job.finished)
+        for job in finished[:max(0, len(finished) - self.max_finished_jobs)]:
+            del self._jobs[job.id]
+
+    def _finish(self, job, status, error=None):
+        job._buffer = job._reader = None
+        job.error = error
+        job.finished = time.time()
+        job.status = status
+
+    def _run_chunk(self, job):
+        try:
+            if job._reader is None:
+                job.status = RUNNING
+                header = pd.read_csv(job._buffer, nrows=0).columns
+                missing = [col for col in RAW_COLUMNS if col not in header]
+                if missing:
+                    raise ValueError(f"missing columns: {', '.join(missing)}")
+                job._buffer.seek(0)
+                job._reader = pd.read_csv(job._buffer, chunksize=job._chunk_rows)
+            chunk = next(job._reader, None)
+            if chunk is None:
+                self._finish(job, DONE)
+                return
+            raw, valid = validate_chunk(chunk)
+            raw = raw[valid]
+            if len(raw):
+                job.chunks.append(raw.join(self.score_fn(raw)))
+            job.rows_scored += len(raw)
+            job.rows_rejected += int((~valid).sum())
+            job.bytes_read = job._buffer.tell()
+        except Exception as e:
+            self._finish(job, FAILED, str(e))
+            return
+        # Requeue behind the other jobs instead of looping over the whole file here.
+        self._pool.submit(self._run_chunk, job)
+
+    def shutdown(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,292 @@
+"""Local HTTP/JSON diet risk scoring service.
+
+Serves the same feature pipeline, model and condition-aware plan lookup as
+the app.  Each worker process loads the model once; concurrent requests that
+arrive within ``--max-wait-ms`` of each other are scored together in a
+single ``predict`` call by a ``MicroBatcher``.
+
+    python serve.py --port 8765 --workers 4
+
+    POST /predict   {"patients": [{"age": 54, "bmi": 27.1, ...}], "include_plan": false}
+    GET  /plans/<plan_id>
+    GET  /health
+"""
+
+import argparse
+import json
+import logging
+import os
+import queue
+import signal
+import threading
+import time
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+import pandas as pd
+
+from config import (
+    MODEL_PATH, FEATURE_PIPELINE_PATH, MODEL_MANIFEST_PATH, TRAIN_PATH, PLAN_TXT_PATH, PLAN_STORE_PATH,
+    INFERENCE_ENGINE, SERVICE_HOST, SERVICE_PORT, MICRO_BATCH_MAX_ROWS, MICRO_BATCH_MAX_WAIT_MS
+)
+from diet_matching import DietMatcher
+from features import RAW_COLUMNS
+from fast_inference import ENGINES, InferenceEngine
+from plan_store import ensure_compiled, load_plan_store
+from scoring import load_model, load_feature_pipeline, load_feature_columns, predict_classes, scored_frame
+from scoring_jobs import validate_chunk
+
+logger = logging.getLogger("diet_planner.service")
+
+
+class RequestError(ValueError):
+    """Invalid request payload; reported to the client as HTTP 400."""
+
+
+# ================= MICRO-BATCHING =================
+class MicroBatcher:
+    """Coalesces concurrent ``submit`` calls into one ``score_fn`` call.
+
+    The first waiting request opens a batch; requests arriving within
+    ``max_wait`` seconds join it until ``max_rows`` rows are collected.
+    """
+
+    def __init__(self, score_fn, max_rows=MICRO_BATCH_MAX_ROWS, max_wait=MICRO_BATCH_MAX_WAIT_MS / 1000):
+        self.score_fn = score_fn
+        self.max_rows = max_rows
+        self.max_wait = max_wait
+        self.batches = 0
+        self.rows = 0
+        self._queue = queue.Queue()
+        threading.Thread(target=self._run, name="micro-batcher", daemon=True).start()
+
+    def submit(self, values):
+        """Future for the scored rows of the 2-D array ``values``."""
+        future = Future()
+        self._queue.put((values, future))
+        return future
+
+    def _collect(self):
+        batch = [self._queue.get()]
+        rows = len(batch[0][0])
+        deadline = time.perf_counter() + self.max_wait
+        while rows < self.max_rows:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            batch.append(item)
+            rows += len(item[0])
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            try:
+                scored = self.score_fn(np.concatenate([values for values, _ in batch]))
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+            self.batches += 1
+            self.rows += len(scored)
+            start = 0
+            for values, future in batch:
+                future.set_result(scored.iloc[start:start + len(values)])
+                start += len(values)
+
+
+# ================= SCORING =================
+class DietRiskScorer:
+    def __init__(self, model_path=MODEL_PATH, pipeline_path=FEATURE_PIPELINE_PATH, engine=INFERENCE_ENGINE,
+                 max_rows=MICRO_BATCH_MAX_ROWS, max_wait_ms=MICRO_BATCH_MAX_WAIT_MS):
+        self.model = InferenceEngine(load_model(model_path), engine)
+        self.pipeline = load_feature_pipeline(pipeline_path)
+        self.feature_columns = load_feature_columns(MODEL_MANIFEST_PATH, TRAIN_PATH)
+        self.matcher = DietMatcher(load_plan_store(PLAN_TXT_PATH, PLAN_STORE_PATH))
+        self.batcher = MicroBatcher(self.score_rows, max_rows, max_wait_ms / 1000)
+
+    def score_rows(self, values):
+        raw_df = pd.DataFrame(values, columns=RAW_COLUMNS)
+        preds = predict_classes(self.model, self.pipeline, raw_df, self.feature_columns)
+        return scored_frame(preds, index=raw_df.index).join(self.matcher.match(raw_df, preds))
+
+    @staticmethod
+    def raw_values(patients):
+        """Float matrix of the raw lab columns; ``RequestError`` names the offending patients."""
+        try:
+            values = np.array([[patient[col] for col in RAW_COLUMNS] for patient in patients], dtype=np.float64)
+            if np.isfinite(values).all():
+                return values
+        except (KeyError, TypeError, ValueError):
+            pass
+        if not all(isinstance(patient, dict) for patient in patients):
+            raise RequestError("every patient must be a JSON object")
+        raw = pd.DataFrame.from_records(patients)
+        missing = [col for col in RAW_COLUMNS if col not in raw.columns]
+        if missing:
+            raise RequestError(f"missing columns: {', '.join(missing)}")
+        try:
+            _, valid = validate_chunk(raw)
+        except (TypeError, ValueError):
+            # Nested lists or objects that pandas refuses to coerce; blame every patient.
+            valid = np.zeros(len(patients), dtype=bool)
+        invalid = (~valid).nonzero()[0].tolist() or list(range(len(patients)))
+        raise RequestError(f"missing or non-numeric lab values in patients {invalid}")
+
+    def predict(self, patients, include_plan=False):
+        if isinstance(patients, dict):
+            patients = [patients]
+        if not isinstance(patients, list) or not patients:
+            raise RequestError("'patients' must be a patient object or a non-empty list of them")
+        scored = self.batcher.submit(self.raw_values(patients)).result()
+        predictions = [
+            {"risk_label": risk_label, "diet_key": diet_key, "condition": condition, "plan_id": int(plan_id)}
+            for risk_label, diet_key, condition, plan_id in zip(
+                scored["risk_label"], scored["diet_key"], scored["condition"], scored["plan_id"])
+        ]
+        if include_plan:
+            for prediction in predictions:
+                prediction["plan"] = self.matcher.plan(prediction["plan_id"])
+        return predictions
+
+
+# ================= HTTP =================
+class ScoringServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 128  # the default backlog of 5 refuses connections under load
+
+
+class ScoringHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, so load tests measure scoring rather than connects
+    disable_nagle_algorithm = True  # headers and body go out as separate writes
+
+    def _send(self, status, payload):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _read_json(self):
+        try:
+            length = int(self.headers["Content-Length"])
+        except (TypeError, ValueError):
+            # Without a usable length the rest of the stream cannot be framed; drop the connection.
+            self.close_connection = True
+            raise RequestError("Content-Length must be given as a byte count") from None
+        if length <= 0:
+            self.close_connection = True
+            raise RequestError("request body is empty")
+        return json.loads(self.rfile.read(length))
+
+    def do_GET(self):
+        scorer = self.server.scorer
+        if self.path == "/health":
+            batcher = scorer.batcher
+            self._send(200, {"status": "ok", "pid": os.getpid(), "engine": scorer.model.engine,
+                             "batches": batcher.batches, "rows": batcher.rows})
+        elif self.path.startswith("/plans/"):
+            try:
+                plan_id = int(self.path[len("/plans/"):])
+                if plan_id < 0:
+                    raise IndexError(plan_id)
+                plan = scorer.matcher.plan(plan_id)
+            except (ValueError, IndexError):
+                self._send(404, {"error": f"unknown plan {self.path[len('/plans/'):]!r}"})
+                return
+            self._send(200, {"plan_id": plan_id, "condition": scorer.matcher.template_conditions[plan_id],
+                             "plan": plan})
+        else:
+            self._send(404, {"error": f"unknown path {self.path}"})
+
+    def do_POST(self):
+        if self.path != "/predict":
+            self._send(404, {"error": f"unknown path {self.path}"})
+            return
+        try:
+            payload = self._read_json()
+            if not isinstance(payload, dict):
+                raise RequestError("request body must be a JSON object")
+            predictions = self.server.scorer.predict(payload.get("patients"), bool(payload.get("include_plan")))
+        except (RequestError, UnicodeDecodeError, json.JSONDecodeError) as e:
+            self._send(400, {"error": str(e)})
+            return
+        except Exception:
+            logger.exception("Scoring failed")
+            self._send(500, {"error": "internal scoring error"})
+            return
+        self._send(200, {"predictions": predictions})
+
+    def log_message(self, format, *args):
+        logger.debug("%s - " + format, self.address_string(), *args)
+
+
+def _serve_worker(server, scorer_kwargs):
+    server.scorer = DietRiskScorer(**scorer_kwargs)
+    logger.info("Worker %d ready", os.getpid())
+    server.serve_forever()
+
+
+def serve(host=SERVICE_HOST, port=SERVICE_PORT, workers=1, **scorer_kwargs):
+    """Bind once, then fork ``workers`` processes that each load the model and accept on the shared socket."""
+    server = ScoringServer((host, port), ScoringHandler)
+    print(f"🩺 Diet risk service on http://{host}:{server.server_address[1]} ({workers} workers)")
+    if workers == 1:
+        try:
+            _serve_worker(server, scorer_kwargs)
+        except KeyboardInterrupt:
+            pass
+        return
+
+    children = []
+    for _ in range(workers):
+        pid = os.fork()
+        if pid == 0:
+            signal.signal(signal.SIGINT, signal.SIG_DFL)
+            try:
+                _serve_worker(server, scorer_kwargs)
+            finally:
+                os._exit(1)
+        children.append(pid)
+    try:
+        for _ in children:
+            os.wait()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for pid in children:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+        server.server_close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve diet risk predictions over HTTP/JSON.")
+    parser.add_argument("--host", default=SERVICE_HOST)
+    parser.add_argument("--port", type=int, default=SERVICE_PORT)
+    parser.add_argument("--workers", type=int, default=1, help="processes, each with its own model copy")
+    parser.add_argument("--engine", choices=ENGINES, default=INFERENCE_ENGINE, help="model scoring path")
+    parser.add_argument("--max-batch-rows", type=int, default=MICRO_BATCH_MAX_ROWS)
+    parser.add_argument("--max-wait-ms", type=float, default=MICRO_BATCH_MAX_WAIT_MS,
+                        help="how long a batch stays open for more requests")
+    parser.add_argument("--model", default=MODEL_PATH)
+    parser.add_argument("--feature-pipeline", default=FEATURE_PIPELINE_PATH)
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(name)s %(message)s")
+    ensure_compiled(PLAN_TXT_PATH, PLAN_STORE_PATH)
+    serve(args.host, args.port, max(1, args.workers), model_path=args.model,
+          pipeline_path=args.feature_pipeline, engine=args.engine,
+          max_rows=args.max_batch_rows, max_wait_ms=args.max_wait_ms)
+
+
+if __name__ == "__main__":
+    main()
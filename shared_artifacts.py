@@ -0,0 +1,127 @@
+"""Read-only artifacts shared between app replicas through memory-mapped files.
+
+When several Streamlit processes run on one host, each would otherwise load
+its own copy of the patient table, engineered features, plans and model.
+``publish_shared_artifacts`` writes them once as flat files: raw patient
+columns and the float32 feature matrix as ``.npy`` arrays, the compiled plan
+store, and the model as a ``CompiledForest``.  ``attach_shared_artifacts``
+maps those files read-only, so every replica shares the same physical pages
+through the OS page cache and starts without parsing CSV or unpickling the
+model.  Point ``SHARED_ARTIFACTS_DIR`` at ``/dev/shm`` to keep them in RAM.
+
+Artifacts live in a subdirectory named after a fingerprint of their
+sources, so a changed model or patient file is published next to the old
+version instead of over files that running replicas still have mapped.
+
+    python shared_artifacts.py --dir /dev/shm/diet_planner
+"""
+
+import argparse
+import json
+import os
+import shutil
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+from config import (
+    MODEL_PATH, FEATURE_PIPELINE_PATH, MODEL_MANIFEST_PATH, TRAIN_PATH, INFER_PATH, PLAN_TXT_PATH,
+    SHARED_ARTIFACTS_DIR
+)
+from fast_inference import CompiledForest
+from features import RAW_COLUMNS
+from patient_table import downcast, read_patient_table
+from plan_store import PlanStore, compile_plan_store
+from prediction_cache import artifact_fingerprint
+from scoring import load_model, load_feature_pipeline, load_feature_columns
+
+ARTIFACT_VERSION = 2  # 2: plan store with shared day and plan templates
+
+
+def source_fingerprint(infer_path=INFER_PATH, model_path=MODEL_PATH, pipeline_path=FEATURE_PIPELINE_PATH,
+                       plan_txt_path=PLAN_TXT_PATH):
+    return artifact_fingerprint(infer_path, model_path, pipeline_path, plan_txt_path)[:16] + f"-v{ARTIFACT_VERSION}"
+
+
+class SharedArtifacts:
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, "manifest.json")) as f:
+            self.manifest = json.load(f)
+        self.feature_columns = self.manifest["feature_columns"]
+        self.features = np.load(os.path.join(path, "features.npy"), mmap_mode="r")
+        self.columns = {col: np.load(os.path.join(path, "raw", f"{col}.npy"), mmap_mode="r")
+                        for col in self.manifest["raw_columns"]}
+        self.forest = CompiledForest.load(os.path.join(path, "forest"), mmap_mode="r")
+        self.plan_store = PlanStore(os.path.join(path, "plans.planstore"))
+
+    def raw_frame(self):
+        """Patient table backed directly by the mapped column files (read-only)."""
+        return pd.DataFrame(self.columns, copy=False)
+
+    def close(self):
+        self.plan_store.close()
+
+
+def publish_shared_artifacts(directory=SHARED_ARTIFACTS_DIR, infer_path=INFER_PATH, model_path=MODEL_PATH,
+                             pipeline_path=FEATURE_PIPELINE_PATH, plan_txt_path=PLAN_TXT_PATH):
+    """Write the artifacts for the current sources (if not already there) and return their path."""
+    fingerprint = source_fingerprint(infer_path, model_path, pipeline_path, plan_txt_path)
+    target = os.path.join(directory, fingerprint)
+    if os.path.exists(target):
+        return target
+
+    os.makedirs(directory, exist_ok=True)
+    staging = tempfile.mkdtemp(prefix=".publish-", dir=directory)
+    try:
+        raw = downcast(read_patient_table(infer_path, columns=RAW_COLUMNS))
+        os.makedirs(os.path.join(staging, "raw"))
+        for col in RAW_COLUMNS:
+            np.save(os.path.join(staging, "raw", f"{col}.npy"), raw[col].to_numpy())
+
+        feature_columns = load_feature_columns(MODEL_MANIFEST_PATH, TRAIN_PATH)
+        X = load_feature_pipeline(pipeline_path).transform(raw, feature_columns)
+        np.save(os.path.join(staging, "features.npy"), X.to_numpy(dtype=np.float32))
+
+        CompiledForest.from_booster(load_model(model_path).booster_).save(os.path.join(staging, "forest"))
+        compile_plan_store(plan_txt_path, os.path.join(staging, "plans.planstore"))
+
+        with open(os.path.join(staging, "manifest.json"), "w") as f:
+            json.dump({"fingerprint": fingerprint, "rows": len(raw), "raw_columns": RAW_COLUMNS,
+                       "feature_columns": feature_columns}, f, indent=2)
+        os.chmod(staging, 0o755)
+        os.chmod(os.path.join(staging, "plans.planstore"), 0o644)
+        os.rename(staging, target)
+    except OSError:
+        # Another replica published the same fingerprint first.
+        if not os.path.exists(target):
+            raise
+    finally:
+        shutil.rmtree(staging, ignore_errors=True)
+    return target
+
+
+def attach_shared_artifacts(directory=SHARED_ARTIFACTS_DIR, **sources):
+    """Map the artifacts for the current sources, publishing them first if no replica has yet."""
+    return SharedArtifacts(publish_shared_artifacts(directory, **sources))
+
+
+def prune_shared_artifacts(directory=SHARED_ARTIFACTS_DIR, keep=None):
+    """Delete published versions other than ``keep``; replicas that still map them are unaffected."""
+    for name in os.listdir(directory):
+        if name != keep:
+            shutil.rmtree(os.path.join(directory, name), ignore_errors=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Publish memory-mapped artifacts for app replicas.")
+    parser.add_argument("--dir", default=SHARED_ARTIFACTS_DIR)
+    parser.add_argument("--prune", action="store_true", help="remove previously published versions")
+    args = parser.parse_args()
+
+    path = publish_shared_artifacts(args.dir)
+    if args.prune:
+        prune_shared_artifacts(args.dir, keep=os.path.basename(path))
+    size = sum(os.path.getsize(os.path.join(root, name)) for root, _, names in os.walk(path) for name in names)
+    print(f"✅ Shared artifacts at {path} ({size / 1e6:.1f} MB)")
@@ -0,0 +1,60 @@
+"""Dashboard aggregates against the same statistics computed from the frame."""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from aggregates import HISTOGRAM_EDGES, RISK_LABELS, RiskAggregates
+from config import HIGH_RISK_LABEL, LOW_RISK_LABEL
+
+
+@pytest.fixture
+def cohort():
+    rng = np.random.default_rng(3)
+    n = 500
+    return pd.DataFrame({
+        "risk_label": rng.choice(RISK_LABELS, n, p=[0.3, 0.7]),
+        "age": rng.uniform(-5, 95, n),      # outside the edges on both sides
+        "bmi": rng.uniform(10, 50, n),
+        "stage": rng.integers(1, 5, n),
+    })
+
+
+def test_counts_and_histograms_match_frame(cohort):
+    agg = RiskAggregates.from_frame(cohort, version="v1")
+    counts = cohort["risk_label"].value_counts()
+
+    assert agg.version == "v1" and agg.total == len(cohort)
+    assert agg.count(HIGH_RISK_LABEL) == counts[HIGH_RISK_LABEL]
+    assert agg.pct(LOW_RISK_LABEL) == pytest.approx(counts[LOW_RISK_LABEL] / len(cohort) * 100)
+    assert agg.counts_frame()["Risk Level"].tolist() == counts.index.tolist()
+
+    edges = HISTOGRAM_EDGES["bmi"]
+    for i, label in enumerate(RISK_LABELS):
+        expected, _ = np.histogram(cohort.loc[cohort["risk_label"] == label, "bmi"], bins=edges)
+        np.testing.assert_array_equal(agg.histograms["bmi"][i], expected)
+    # Out-of-range values are clipped into the end bins rather than dropped.
+    assert agg.histograms["age"].sum() == len(cohort)
+    # Columns missing from the frame keep empty histograms.
+    assert agg.histograms["cholesterol"].sum() == 0
+
+
+def test_incremental_update_matches_full_recount(cohort):
+    agg = RiskAggregates.from_frame(cohort.iloc[:320], version="v1").update(cohort.iloc[320:], version="v2")
+    full = RiskAggregates.from_frame(cohort)
+
+    assert agg.version == "v2"
+    np.testing.assert_array_equal(agg.label_counts, full.label_counts)
+    for col in HISTOGRAM_EDGES:
+        np.testing.assert_array_equal(agg.histograms[col], full.histograms[col])
+
+
+def test_unknown_risk_label_is_rejected(cohort):
+    with pytest.raises(ValueError, match="risk_label"):
+        RiskAggregates.from_frame(cohort.assign(risk_label="MEDIUM"))
+
+
+def test_empty_aggregates():
+    agg = RiskAggregates()
+    assert agg.total == 0 and agg.pct(HIGH_RISK_LABEL) == 0.0
+    assert agg.counts_frame().empty
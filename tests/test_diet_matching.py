@@ -0,0 +1,64 @@
+"""Plan assignment from lab flags and predicted risk."""
+
+import pandas as pd
+import pytest
+
+from diet_matching import NO_CONDITION, DietMatcher, plan_basis
+from features import RAW_COLUMNS
+from plan_store import PlanStore, compile_plan_store
+
+STORE_CONDITIONS = ["hypertension", "thyroid", "vitamin deficiency", "diabetes"]
+
+
+@pytest.fixture
+def matcher(tmp_path):
+    blocks = []
+    for i, condition in enumerate(STORE_CONDITIONS):
+        blocks.append(f"Patient: P{i}\nMedical Condition: {condition}\n\nDay 1:\nBreakfast: {condition} breakfast\n")
+    txt = tmp_path / "plans.txt"
+    txt.write_text(("\n" + "-" * 50 + "\n\n").join(blocks))
+    store = PlanStore(compile_plan_store(txt, tmp_path / "plans.planstore"))
+    yield DietMatcher(store)
+    store.close()
+
+
+def labs(**overrides):
+    # Healthy values: no lab flag fires.
+    row = dict.fromkeys(RAW_COLUMNS, 1.0) | {"bmi": 22.0, "hemoglobin": 14.0, "cholesterol": 150.0,
+                                               "blood_sugar": 90.0}
+    return row | overrides
+
+
+def served(matcher, plan_id):
+    return matcher.plan(plan_id)["Day 1"]["Breakfast"]
+
+
+def test_flags_pick_plans_regardless_of_risk(matcher):
+    raw = pd.DataFrame([
+        labs(blood_sugar=200.0, cholesterol=250.0),   # diabetes outranks high cholesterol
+        labs(cholesterol=250.0),
+        labs(hemoglobin=9.0),
+    ], index=[10, 11, 12])
+    for preds in ([0, 0, 0], [1, 1, 1]):
+        matched = matcher.match(raw, preds)
+        assert matched.index.tolist() == [10, 11, 12]
+        assert matched["condition"].tolist() == ["diabetes", "high cholesterol", "vitamin deficiency"]
+        assert [served(matcher, p) for p in matched["plan_id"]] == [
+            "diabetes breakfast", "hypertension breakfast", "vitamin deficiency breakfast"]
+
+
+def test_unflagged_patients_get_the_risk_plan(matcher):
+    matched = matcher.match(pd.DataFrame([labs(), labs()]), [1, 0])
+    assert matched["condition"].tolist() == [NO_CONDITION, NO_CONDITION]
+    assert [served(matcher, p) for p in matched["plan_id"]] == ["diabetes breakfast", "hypertension breakfast"]
+
+
+def test_each_template_gets_one_plan_id(matcher):
+    assert sorted(matcher.template_conditions) == ["diabetes", "hypertension", "vitamin deficiency"]
+    assert len(matcher.plans) == len(set(matcher.store_templates)) == 3
+    assert matcher.conditions[-1] == NO_CONDITION
+
+
+def test_plan_basis():
+    assert "risk" in plan_basis(NO_CONDITION)
+    assert "high cholesterol" in plan_basis("high cholesterol")
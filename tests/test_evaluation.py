@@ -0,0 +1,95 @@
+"""Streaming evaluation and drift statistics against their in-memory counterparts."""
+
+import numpy as np
+import pandas as pd
+import pytest
+from scipy.stats import ks_2samp
+from sklearn.metrics import accuracy_score, brier_score_loss, log_loss, precision_score, recall_score, roc_auc_score
+
+from evaluation import AUC_BINS, PSI_BINS, DriftAccumulator, EvaluationAccumulator
+
+
+def scores(n=5_000, seed=0):
+    rng = np.random.default_rng(seed)
+    y = rng.integers(0, 2, n)
+    proba = np.clip(rng.normal(0.35 + 0.3 * y, 0.2), 0, 1)
+    return y, proba
+
+
+def accumulate(y, proba, chunk=777):
+    acc = EvaluationAccumulator()
+    for start in range(0, len(y), chunk):
+        acc.update(y[start:start + chunk], proba[start:start + chunk])
+    return acc
+
+
+def test_chunked_metrics_match_sklearn():
+    y, proba = scores()
+    report = accumulate(y, proba).report()
+    preds = (proba > 0.5).astype(int)
+
+    assert report["rows"] == len(y)
+    assert report["accuracy"] == pytest.approx(accuracy_score(y, preds))
+    assert report["precision"] == pytest.approx(precision_score(y, preds))
+    assert report["recall"] == pytest.approx(recall_score(y, preds))
+    assert report["brier"] == pytest.approx(brier_score_loss(y, proba))
+    assert report["log_loss"] == pytest.approx(log_loss(y, np.clip(proba, 1e-15, 1 - 1e-15)))
+    assert report["confusion_matrix"]["rows_actual_columns_predicted"] == pd.crosstab(y, preds).to_numpy().tolist()
+    assert sum(b["count"] for b in report["calibration"]) == len(y)
+
+
+def test_auc_matches_sklearn():
+    y, proba = scores()
+    # Continuous scores: the histogram only loses ordering within a bin.
+    assert accumulate(y, proba).auc() == pytest.approx(roc_auc_score(y, proba), abs=1e-3)
+    # Scores on the bin grid, with many ties: exact, since ties count half in both.
+    gridded = (np.floor(proba * 50) + 0.5) / 50
+    assert accumulate(y, gridded).auc() == pytest.approx(roc_auc_score(y, gridded), abs=1e-12)
+    assert AUC_BINS % 50 == 0
+
+
+def test_auc_needs_both_classes():
+    assert accumulate(np.ones(10, dtype=int), np.linspace(0, 1, 10)).auc() is None
+
+
+@pytest.fixture
+def reference():
+    rng = np.random.default_rng(1)
+    return pd.DataFrame({"x": rng.normal(0, 1, 800), "grade": rng.integers(1, 5, 800).astype(float)})
+
+
+def drift(reference, live, chunk=250):
+    acc = DriftAccumulator(reference, ["x", "grade"])
+    for start in range(0, len(live), chunk):
+        acc.update(live.iloc[start:start + chunk])
+    return {f["feature"]: f for f in acc.report()["features"]}
+
+
+def test_psi_and_ks_match_direct_computation(reference):
+    rng = np.random.default_rng(2)
+    live = pd.DataFrame({"x": rng.normal(0.5, 1.2, 1_500), "grade": rng.integers(2, 5, 1_500).astype(float)})
+    report = drift(reference, live)
+
+    for col in ("x", "grade"):
+        edges = np.unique(np.quantile(reference[col], np.linspace(0, 1, PSI_BINS + 1)[1:-1]))
+        bins = np.concatenate([[-np.inf], edges, [np.inf]])
+        expected = np.maximum(np.histogram(reference[col], bins)[0] / len(reference), 1e-6)
+        actual = np.maximum(np.histogram(live[col], bins)[0] / len(live), 1e-6)
+        assert report[col]["psi"] == pytest.approx(((actual - expected) * np.log(actual / expected)).sum())
+        assert report[col]["live_mean"] == pytest.approx(live[col].mean())
+
+    # The reference has fewer values than KS grid points, so the grid holds every reference value and the
+    # statistic can only miss the live ECDF just below one of them: by at most one reference step.
+    ks = ks_2samp(live["x"], reference["x"]).statistic
+    assert report["x"]["ks"] == pytest.approx(ks, abs=1 / len(reference))
+    # Discrete values: every jump of either ECDF is on the grid, so KS is exact.
+    assert report["grade"]["ks"] == pytest.approx(ks_2samp(live["grade"], reference["grade"]).statistic)
+    assert report["x"]["status"] != "stable"
+
+
+def test_no_drift_against_itself(reference):
+    report = drift(reference, reference)
+    for feature in report.values():
+        assert feature["psi"] == pytest.approx(0, abs=1e-12)
+        assert feature["ks"] == pytest.approx(0, abs=1e-12)
+        assert feature["status"] == "stable"
@@ -0,0 +1,48 @@
+"""Parity of the feature pipeline with the features the model was trained on."""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from config import FEATURE_PIPELINE_PATH, INFER_PATH, TRAIN_PATH
+from features import FeaturePipeline
+
+KEY = ["age", "bmi", "glucose"]  # scaled, distinct enough to pair each training row with its raw row
+
+
+@pytest.fixture(scope="module")
+def raw():
+    return pd.read_csv(INFER_PATH)
+
+
+@pytest.fixture(scope="module")
+def pipeline():
+    return FeaturePipeline.from_json(FEATURE_PIPELINE_PATH)
+
+
+def test_pipeline_reproduces_training_features(raw, pipeline):
+    train = pd.read_csv(TRAIN_PATH)
+    features = pipeline.transform(raw)
+
+    positions = pd.Series(np.arange(len(features)), index=pd.MultiIndex.from_frame(features[KEY].round(9)))
+    assert positions.index.is_unique
+    rows = positions.reindex(pd.MultiIndex.from_frame(train[KEY].round(9)))
+    assert not rows.isna().any()
+
+    columns = pipeline.feature_columns
+    np.testing.assert_allclose(features.iloc[rows.to_numpy()][columns].to_numpy(), train[columns].to_numpy(),
+                               rtol=0, atol=1e-12)
+
+
+def test_fit_recovers_stored_pipeline(raw, pipeline, tmp_path):
+    refit = FeaturePipeline.fit(raw, pipeline.feature_columns)
+    assert refit.means == pytest.approx(pipeline.means) and refit.stds == pytest.approx(pipeline.stds)
+
+    refit.to_json(tmp_path / "pipeline.json")
+    loaded = FeaturePipeline.from_json(tmp_path / "pipeline.json")
+    pd.testing.assert_frame_equal(loaded.transform(raw.head(50)), refit.transform(raw.head(50)))
+
+
+def test_transform_rejects_missing_raw_columns(raw, pipeline):
+    with pytest.raises(ValueError, match="glucose"):
+        pipeline.transform(raw.drop(columns="glucose"))
@@ -0,0 +1,68 @@
+"""Appends, incremental syncs and re-scores of the append-only patient store."""
+
+import numpy as np
+import pandas as pd
+
+from config import HIGH_RISK_LABEL, LOW_RISK_LABEL
+from features import RAW_COLUMNS
+from patient_store import PatientStore, ScoredCohort
+
+
+def lab_reports(n, seed):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({col: rng.integers(1, 5, n) if col in ("tumor_grade", "lymph_nodes", "stage")
+                         else rng.uniform(20, 80, n).round(2) for col in RAW_COLUMNS})
+
+
+def scorer(threshold):
+    """Stand-in model: high risk above an age threshold, so a new "model" changes the labels."""
+    def score(raw):
+        high = raw["age"].to_numpy() > threshold
+        return pd.DataFrame({
+            "risk_label": np.where(high, HIGH_RISK_LABEL, LOW_RISK_LABEL),
+            "condition": np.where(high, "diabetes", "general"),
+            "plan_id": high.astype(np.int16),
+        }, index=raw.index)
+    return score
+
+
+def labels(frame):
+    return frame["risk_label"].astype(str).tolist()
+
+
+def test_patient_store_append_sync_rescore(tmp_path):
+    store = PatientStore(str(tmp_path / "store"))
+    cohort = ScoredCohort(store)
+    first, second = lab_reports(40, seed=1), lab_reports(25, seed=2)
+
+    stored, rejected = store.ingest(first, scorer(50), "model-a", source="first.csv")
+    assert (rejected, store.watermark, store.generation) == (0, 40, 0)
+    assert list(stored.index) == list(range(40))
+    assert cohort.sync() == 40
+    assert cohort.sync() == 0
+
+    invalid = second.astype({"age": object})
+    invalid.loc[3, "age"] = "n/a"
+    stored, rejected = store.ingest(invalid, scorer(50), "model-a", source="second.csv")
+    assert rejected == 1 and list(stored.index) == list(range(40, 64))
+    # A second handle on the same directory (another process) sees the appended rows.
+    assert PatientStore(store.path).watermark == 64
+    assert cohort.sync() == 24
+    assert len(cohort.frame) == cohort.aggregates.total == 64
+    assert labels(cohort.frame) == labels(store.read())
+    np.testing.assert_allclose(cohort.frame["age"].iloc[40:].to_numpy(),
+                               second.drop(index=3)["age"].to_numpy(), rtol=1e-6)
+    assert len(store.read(since=50)) == 14
+
+    assert store.rescore_stale(scorer(50), "model-a") == 0
+    assert store.rescore_stale(scorer(30), "model-b") == 64
+    assert (store.generation, store.watermark) == (1, 64)
+    assert {entry["fingerprint"] for entry in store.segments} == {"model-b"}
+
+    # The new generation makes the cohort reload everything with the new scores.
+    assert cohort.sync() == 64
+    expected = np.where(cohort.frame["age"].to_numpy() > 30, HIGH_RISK_LABEL, LOW_RISK_LABEL)
+    assert labels(cohort.frame) == list(expected) == labels(store.read())
+    assert cohort.aggregates.count(HIGH_RISK_LABEL) == int((expected == HIGH_RISK_LABEL).sum())
+    assert sorted(p.name for p in (tmp_path / "store").glob("*.parquet")) == \
+        sorted(entry["file"] for entry in store.segments)
@@ -0,0 +1,55 @@
+"""Server-side filtering, sorting and paging of patient tables, and risk-rate bins."""
+
+import numpy as np
+import pandas as pd
+
+from aggregates import RiskAggregates
+from config import HIGH_RISK_LABEL, LOW_RISK_LABEL
+from patient_table import filter_mask, page_positions, sort_positions
+
+
+def table():
+    return pd.DataFrame({
+        "risk_label": [HIGH_RISK_LABEL, LOW_RISK_LABEL, HIGH_RISK_LABEL, LOW_RISK_LABEL, LOW_RISK_LABEL],
+        "age": [70.0, 25.0, 50.0, 40.0, 61.0],
+        "bmi": [31.0, 22.0, 27.5, 19.0, 35.0],
+        "condition": pd.Categorical(["general", "diabetes", "high cholesterol", "diabetes", "general"],
+                                    categories=["high cholesterol", "general", "diabetes"]),
+    })
+
+
+def test_pages_match_pandas_filter_and_sort():
+    df = table()
+    mask = filter_mask(df, risk_labels=[LOW_RISK_LABEL], age_range=(30, 80))
+    order = sort_positions(df["age"], descending=True)
+    positions, selected, pages = page_positions(order, mask, page=1, page_size=1)
+
+    expected = df[(df["risk_label"] == LOW_RISK_LABEL) & df["age"].between(30, 80)].sort_values("age", ascending=False)
+    assert selected == len(expected) == 2 and pages == 2
+    assert df.index[positions].tolist() == expected.index[:1].tolist()
+    # Out-of-range page numbers are clamped to the last (or first) page.
+    assert df.index[page_positions(order, mask, 9, 1)[0]].tolist() == expected.index[1:].tolist()
+    positions, selected, pages = page_positions(order, np.zeros(len(df), dtype=bool), page=0, page_size=10)
+    assert (len(positions), selected, pages) == (0, 0, 1)
+
+
+def test_categories_sort_by_text_and_filter_by_condition():
+    df = table()
+    order = sort_positions(df["condition"])
+    assert df["condition"].iloc[order].astype(str).tolist() == sorted(df["condition"].astype(str))
+
+    mask = filter_mask(df, conditions=["diabetes"], bmi_range=(20, 40))
+    assert np.flatnonzero(mask).tolist() == [1]
+
+
+def test_risk_rate_frame():
+    df = table()
+    rates = RiskAggregates.from_frame(df).risk_rate_frame("age")
+    assert rates["patients"].sum() == len(df)
+    row = rates[rates["bin"] == "50–55"].iloc[0]
+    assert (row["patients"], row["high_risk"], row["risk_rate"]) == (1, 1, 1.0)
+    assert rates.loc[rates["patients"] == 0, "risk_rate"].isna().all()
+
+    stage = RiskAggregates.from_frame(df.assign(stage=[1, 2, 2, 4, 3])).risk_rate_frame("stage")
+    assert stage["bin"].tolist() == ["1", "2", "3", "4"]
+    assert stage["risk_rate"].tolist() == [1.0, 0.5, 0.0, 0.0]
@@ -0,0 +1,76 @@
+"""Round trips of the compiled plan store."""
+
+import struct
+
+import pytest
+
+from plan_store import HEADER, PlanStore, compile_plan_store, load_plan_store
+
+# Two patients share a whole plan and a third reuses one of its days, so every
+# level of interning (strings, days, templates) is exercised.
+MORNING = {"Breakfast": "Oatmeal with fruits", "Lunch": "Steamed vegetables with brown rice"}
+EVENING = {"Breakfast": "Smoothie with oats", "Dinner": "Vegetable soup: no salt"}
+PATIENTS = [
+    ("Manoj", "hypertension", {"Day 1": MORNING, "Day 2": EVENING}),
+    ("Asha", "diabetes", {"Day 1": {"Breakfast": "Whole grain toast with egg"}, "Day 2": EVENING}),
+    ("Ravi", "hypertension", {"Day 1": MORNING, "Day 2": EVENING}),
+]
+
+
+def plan_text(patients):
+    blocks = []
+    for name, condition, plan in patients:
+        lines = [f"Patient: {name}", f"Medical Condition: {condition}", ""]
+        for day, meals in plan.items():
+            lines += [f"{day}:", *(f"{meal}: {text}" for meal, text in meals.items()), ""]
+        blocks.append("\n".join(lines))
+    return ("\n" + "-" * 50 + "\n\n").join(blocks)
+
+
+@pytest.fixture
+def plan_files(tmp_path):
+    txt_path = tmp_path / "plans.txt"
+    txt_path.write_text(plan_text(PATIENTS), encoding="utf-8")
+    return str(txt_path), str(tmp_path / "plans.planstore")
+
+
+def test_plan_store_round_trip(plan_files):
+    store = PlanStore(compile_plan_store(*plan_files))
+    try:
+        assert len(store) == len(PATIENTS)
+        for pid, (name, condition, plan) in enumerate(PATIENTS):
+            assert store.patient(pid) == {"name": name, "condition": condition, "plan": plan}
+        assert (store.n_templates, store.n_days) == (2, 3)
+        assert store.template_id(0) == store.template_id(2) != store.template_id(1)
+        assert list(store.patients_for_condition("hypertension")) == [0, 2]
+        assert store.condition_plan("diabetes") == PATIENTS[1][2]
+        with pytest.raises(KeyError):
+            store.condition_template("thyroid")
+    finally:
+        store.close()
+
+
+def test_plan_store_rejects_another_version(plan_files):
+    txt_path, store_path = plan_files
+    compile_plan_store(txt_path, store_path)
+    with open(store_path, "r+b") as f:
+        magic, version = struct.unpack_from("<4sH", f.read(HEADER.size))
+        f.seek(0)
+        f.write(struct.pack("<4sH", magic, version - 1))
+
+    with pytest.raises(ValueError, match="plan store"):
+        PlanStore(store_path)
+    # load_plan_store rebuilds a store left behind by an older version.
+    store = load_plan_store(txt_path, store_path)
+    try:
+        assert store.patient(1)["plan"] == PATIENTS[1][2]
+    finally:
+        store.close()
+
+
+def test_plan_store_closes_while_arrays_are_held(plan_files):
+    store = PlanStore(compile_plan_store(*plan_files))
+    template_ids = store.template_ids
+    members = store.patients_for_condition("hypertension")
+    store.close()
+    assert template_ids.tolist() == [0, 1, 0] and members.tolist() == [0, 2]
@@ -0,0 +1,86 @@
+"""Row hashing, hits, misses and eviction of the persistent prediction cache."""
+
+import numpy as np
+import pandas as pd
+
+from features import RAW_COLUMNS
+from patient_table import downcast
+from prediction_cache import PredictionCache, row_hashes
+
+INT_COLUMNS = ["tumor_grade", "lymph_nodes", "stage"]
+
+
+def lab_reports(n, seed=0):
+    """Lab values as read from CSV: float64 with two decimals, int64 grades and counts."""
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({col: rng.integers(0, 5, n) if col in INT_COLUMNS else rng.uniform(1, 400, n).round(2)
+                         for col in RAW_COLUMNS})
+
+
+def test_csv_and_store_types_hash_alike(tmp_path):
+    csv_rows = lab_reports(200)
+    # How uploads arrive (validate_chunk makes every column float64) and how the store keeps them.
+    validated = csv_rows.astype(np.float64)
+    path = tmp_path / "patients.parquet"
+    downcast(csv_rows).to_parquet(path)
+    stored = pd.read_parquet(path)
+
+    assert stored["age"].dtype == np.float32
+    expected = row_hashes(csv_rows)
+    np.testing.assert_array_equal(row_hashes(validated), expected)
+    np.testing.assert_array_equal(row_hashes(stored), expected)
+    assert len(np.unique(expected)) == len(csv_rows)
+
+
+def test_rows_scored_from_csv_hit_when_read_back_from_the_store(tmp_path):
+    cache = PredictionCache(str(tmp_path / "cache.sqlite"))
+    rows = lab_reports(50)
+    cache.predict(rows, "model", lambda missing: np.ones(len(missing)))
+    preds = cache.predict(downcast(rows).iloc[::-1], "model", lambda missing: 1 / 0)
+    assert (cache.hits, cache.misses) == (50, 50)
+    assert preds.tolist() == [1] * 50
+
+
+def test_only_new_rows_reach_the_model(tmp_path):
+    cache = PredictionCache(str(tmp_path / "cache.sqlite"))
+    rows = lab_reports(30, seed=1)
+    scored = []
+
+    def score(missing):
+        scored.append(len(missing))
+        return (missing["age"].to_numpy() > 200).astype(int)
+
+    first = cache.predict(rows, "model", score)
+    edited = rows.copy()
+    edited.loc[:4, "age"] += 1
+    second = cache.predict(edited, "model", score)
+    cache.predict(edited, "model", score)          # the same batch again: served from memory
+    cache.predict(rows, "another model", score)    # a new model misses everything
+    assert scored == [30, 5, 30]
+    assert (cache.hits, cache.misses) == (25 + 30, 65)
+    np.testing.assert_array_equal(second[5:], first[5:])
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    cache = PredictionCache(str(tmp_path / "cache.sqlite"), max_entries=20)
+    rows = lab_reports(30, seed=2)
+    cache.predict(rows.iloc[:15], "model", lambda missing: np.zeros(len(missing)))
+    cache.predict(rows.iloc[15:], "model", lambda missing: np.zeros(len(missing)))
+    assert cache._db.execute("SELECT COUNT(*) FROM predictions").fetchone()[0] == 20
+    # Ten rows of the older batch were evicted; the newer batch is kept whole.
+    cache.predict(rows.iloc[:14:-1], "model", lambda missing: 1 / 0)
+    rescored = []
+    cache.predict(rows.iloc[:15], "model", lambda missing: rescored.append(len(missing)) or np.zeros(len(missing)))
+    assert rescored == [10]
+
+
+def test_a_failed_transaction_is_rolled_back(tmp_path):
+    cache = PredictionCache(str(tmp_path / "cache.sqlite"))
+    rows = lab_reports(10, seed=3)
+    try:
+        cache._store("model", row_hashes(rows), [0] * 9 + ["not a prediction"])
+    except Exception:
+        pass
+    assert not cache._db.in_transaction
+    assert cache.predict(rows, "model", lambda missing: np.ones(len(missing))).tolist() == [1] * 10
+    assert cache.misses == 10
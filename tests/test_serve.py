@@ -0,0 +1,107 @@
+"""Micro-batching and request validation of the scoring service."""
+
+import http.client
+import json
+import socket
+import threading
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from features import RAW_COLUMNS
+from serve import DietRiskScorer, MicroBatcher, RequestError, ScoringHandler, ScoringServer
+
+PATIENT = {"age": 54, "bmi": 27.1, "cholesterol": 210, "blood_sugar": 95, "hemoglobin": 13.2, "rbc_count": 4.8,
+           "platelet_count": 2.5, "wbc_count": 7.1, "alkaline_phosphatase": 110, "total_protein": 7.0,
+           "glucose": 100, "tumor_size": 3.2, "tumor_grade": 2, "lymph_nodes": 4, "stage": 2}
+
+
+def test_micro_batcher_coalesces_and_splits_results():
+    gate, calls = threading.Event(), []
+
+    def score(values):
+        gate.wait(5)
+        calls.append(len(values))
+        return pd.DataFrame({"row_sum": values.sum(axis=1)})
+
+    batcher = MicroBatcher(score, max_rows=100, max_wait=0.05)
+    futures = [batcher.submit(np.full((n, 2), float(n))) for n in (1, 2, 3)]
+    gate.set()
+    assert [f.result(5)["row_sum"].tolist() for f in futures] == [[2.0], [4.0, 4.0], [6.0, 6.0, 6.0]]
+    assert calls == [6] and (batcher.batches, batcher.rows) == (1, 6)
+
+
+def test_micro_batcher_fails_every_request_of_a_failed_batch():
+    def score(values):
+        raise RuntimeError("model exploded")
+
+    batcher = MicroBatcher(score, max_rows=100, max_wait=0.05)
+    futures = [batcher.submit(np.zeros((1, 2))) for _ in range(2)]
+    for future in futures:
+        with pytest.raises(RuntimeError, match="exploded"):
+            future.result(5)
+    assert batcher.batches == 0
+
+
+@pytest.mark.parametrize("patients, message", [
+    ([PATIENT, ["not", "an", "object"]], "JSON object"),
+    ([{k: v for k, v in PATIENT.items() if k != "glucose"}], "missing columns: glucose"),
+    ([PATIENT, PATIENT | {"age": "old"}], r"patients \[1\]"),
+    ([PATIENT | {"bmi": [27.1]}, PATIENT | {"stage": {"n": 2}}], r"patients \[0, 1\]"),
+    ([PATIENT | {"age": float("nan")}], r"patients \[0\]"),
+])
+def test_raw_values_rejects_bad_patients(patients, message):
+    with pytest.raises(RequestError, match=message):
+        DietRiskScorer.raw_values(patients)
+
+
+def test_raw_values_keeps_column_order():
+    values = DietRiskScorer.raw_values([PATIENT])
+    assert values.tolist() == [[float(PATIENT[col]) for col in RAW_COLUMNS]]
+
+
+@pytest.fixture(scope="module")
+def server():
+    server = ScoringServer(("127.0.0.1", 0), ScoringHandler)
+    server.scorer = DietRiskScorer(max_wait_ms=1)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def post(server, body, headers):
+    conn = http.client.HTTPConnection(*server.server_address, timeout=10)
+    conn.request("POST", "/predict", body=body, headers=headers)
+    response = conn.getresponse()
+    return response.status, json.loads(response.read())
+
+
+def test_predict_round_trip(server):
+    body = json.dumps({"patients": [PATIENT, PATIENT], "include_plan": True})
+    status, payload = post(server, body, {"Content-Type": "application/json"})
+    assert status == 200
+    first, second = payload["predictions"]
+    assert first == second and first["condition"] == "high cholesterol" and first["plan"]
+
+
+@pytest.mark.parametrize("body, headers", [
+    ("{}", {"Content-Length": "abc"}),
+    ("", {"Content-Length": "0"}),
+    ("[1, 2]", {}),
+    ("{not json", {}),
+    (b"\xff\xfe", {}),
+    (json.dumps({"patients": []}), {}),
+])
+def test_bad_requests_get_400(server, body, headers):
+    status, payload = post(server, body, headers)
+    assert status == 400 and payload["error"]
+
+
+def test_missing_content_length_gets_400(server):
+    with socket.create_connection(server.server_address, timeout=10) as sock:
+        sock.sendall(b"POST /predict HTTP/1.1\r\nHost: test\r\n\r\n")
+        status_line = sock.makefile("rb").readline()
+    assert status_line.split()[1] == b"400"
@@ -0,0 +1,38 @@
+"""Phase timing shared across sessions."""
+
+import threading
+import time
+
+import pytest
+
+from timings import PhaseTimer
+
+
+def test_nested_phases_add_up_to_the_total():
+    timer = PhaseTimer()
+    with timer.phase("outer"):
+        with timer.phase("inner"):
+            time.sleep(0.05)
+    assert timer.phases["inner"] >= 0.05 > timer.phases["outer"]
+
+
+def test_phases_of_other_threads_are_not_nested():
+    timer = PhaseTimer()
+    barrier = threading.Barrier(2)
+
+    def outer():
+        with timer.phase("outer"):
+            barrier.wait()
+            time.sleep(0.2)
+
+    def other_session():
+        barrier.wait()
+        with timer.phase("other"):
+            time.sleep(0.1)
+
+    threads = [threading.Thread(target=outer), threading.Thread(target=other_session)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert timer.phases["outer"] == pytest.approx(0.2, abs=0.05)
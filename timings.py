@@ -0,0 +1,187 @@
+"""Wall-clock timings: the app's cold start and its per-rerun hot path.
+
+``PhaseTimer`` keeps the first (cold) duration of each startup phase.
+``StageMetrics`` records every run of the hot-path stages (scoring, plan
+rendering, charts, exports) with rows processed and process RSS, plus hit
+counts for the app's caches, and can append each record to a JSON-lines log.
+"""
+
+import collections
+import json
+import logging
+import os
+import resource
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+import numpy as np
+
+logger = logging.getLogger("diet_planner.startup")
+
+
+class PhaseTimer:
+    def __init__(self, budget_seconds=None):
+        self.budget_seconds = budget_seconds
+        self.phases = {}
+        self._local = threading.local()  # the timer is shared by every session; each thread nests its own phases
+        self._logged = False
+
+    @contextmanager
+    def phase(self, name):
+        """Time a block; only the first (cold) run of each phase is kept.
+
+        Time spent in phases nested inside this one is attributed to them only,
+        so the phase timings add up to the total.
+        """
+        nested = self._nested()
+        nested.append(0.0)
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - started
+            self.record(name, elapsed - nested.pop())
+            if nested:
+                nested[-1] += elapsed
+
+    def _nested(self):
+        """Time spent in child phases, one entry per open phase of the calling thread."""
+        if not hasattr(self._local, "nested"):
+            self._local.nested = []
+        return self._local.nested
+
+    def record(self, name, seconds):
+        self.phases.setdefault(name, seconds)
+
+    @property
+    def total_seconds(self):
+        return sum(self.phases.values())
+
+    @property
+    def over_budget(self):
+        return self.budget_seconds is not None and self.total_seconds > self.budget_seconds
+
+    def rows(self):
+        return [{"phase": name, "ms": round(seconds * 1000, 1)} for name, seconds in self.phases.items()]
+
+    def log_once(self):
+        if self._logged:
+            return
+        self._logged = True
+        summary = ", ".join(f"{row['phase']}={row['ms']}ms" for row in self.rows())
+        level = logging.WARNING if self.over_budget else logging.INFO
+        logger.log(level, "startup %.0f ms (budget %s s): %s",
+                   self.total_seconds * 1000, self.budget_seconds, summary)
+
+
+def rss_mb():
+    """Current resident set size of this process (peak RSS where /proc is unavailable)."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1e6
+    except OSError:
+        scale = 1 if sys.platform == "darwin" else 1024  # ru_maxrss is KiB on Linux, bytes on macOS
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale / 1e6
+
+
+class StageMetrics:
+    """Latency, throughput and memory of repeated pipeline stages.
+
+    Stages may nest (e.g. ``predict`` inside ``risk scoring``); each reports
+    its own inclusive time.  Only the last ``window`` runs of a stage are
+    kept for the percentiles.
+    """
+
+    def __init__(self, window=200, log_path=None):
+        self.window = window
+        self.log_path = log_path
+        self._runs = {}
+        self._calls = collections.Counter()
+        self._caches = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def stage(self, name, rows=None):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - started, rows)
+
+    def record(self, name, seconds, rows=None):
+        run = (seconds, rows, rss_mb())
+        with self._lock:
+            self._runs.setdefault(name, collections.deque(maxlen=self.window)).append(run)
+            self._calls[name] += 1
+        if self.log_path:
+            entry = {"ts": round(time.time(), 3), "stage": name, "ms": round(seconds * 1000, 3),
+                     "rows": rows, "rss_mb": round(run[2], 1)}
+            with self._lock, open(self.log_path, "a") as f:
+                f.write(json.dumps(entry) + "\n")
+
+    def timed_chunks(self, name, chunks, rows=None):
+        """Pass ``chunks`` through, recording the time spent producing them once exhausted."""
+        elapsed = 0.0
+        iterator = iter(chunks)
+        while True:
+            started = time.perf_counter()
+            chunk = next(iterator, None)
+            elapsed += time.perf_counter() - started
+            if chunk is None:
+                break
+            yield chunk
+        self.record(name, elapsed, rows)
+
+    # Caches are counted as [requests, misses]: call sites count requests and the
+    # cached function bodies count misses, since only those bodies see a miss.
+    def cache_request(self, name, n=1):
+        with self._lock:
+            self._caches.setdefault(name, [0, 0])[0] += n
+
+    def cache_miss(self, name):
+        with self._lock:
+            self._caches.setdefault(name, [0, 0])[1] += 1
+
+    def set_cache_counts(self, name, hits, misses):
+        with self._lock:
+            self._caches[name] = [hits + misses, misses]
+
+    def stage_rows(self):
+        with self._lock:
+            runs = {name: list(values) for name, values in self._runs.items()}
+            calls = dict(self._calls)
+        rows = []
+        for name, values in runs.items():
+            ms = np.array([seconds for seconds, _, _ in values]) * 1000
+            seconds = sum(s for s, r, _ in values if r)
+            n_rows = sum(r for _, r, _ in values if r)
+            rows.append({
+                "stage": name,
+                "calls": calls[name],
+                "last_ms": round(float(ms[-1]), 2),
+                "p50_ms": round(float(np.percentile(ms, 50)), 2),
+                "p95_ms": round(float(np.percentile(ms, 95)), 2),
+                "rows_per_s": round(n_rows / seconds) if seconds else None,
+                "rss_mb": round(values[-1][2], 1),
+            })
+        return rows
+
+    def cache_rows(self):
+        with self._lock:
+            caches = {name: list(counts) for name, counts in self._caches.items()}
+        return [{"cache": name, "hits": requests - misses, "misses": misses,
+                 "hit_rate": round(1 - misses / requests, 4) if requests else None}
+                for name, (requests, misses) in caches.items()]
+
+    def last_rate(self, name):
+        """Rows per second of the most recent run of ``name`` (None if it had no rows)."""
+        with self._lock:
+            values = self._runs.get(name)
+            seconds, rows, _ = values[-1] if values else (0, None, None)
+        return rows / seconds if rows and seconds else None
+
+    def snapshot(self):
+        return {"ts": round(time.time(), 3), "rss_mb": round(rss_mb(), 1),
+                "stages": self.stage_rows(), "caches": self.cache_rows()}